@@ -66,3 +66,16 @@ if not CREDENTIALS.computer_name:
     CREDENTIALS.computer_name = COMPUTER_NAME
 
 ZIP_FILE_NAME = "emar_backups.zip"
+
+# Scheduled tasks repetition periods (see msi/PostInstallActions.ps1), seconds
+HEARTBEAT_PERIOD = 5 * 60
+DOWNLOAD_PERIOD = 60 * 60
+# Agent waits for its slot inside the scheduled task run, so the slot is scaled
+# to this share of the period to keep the task run well under the task interval
+SLOT_MAX_WAIT_SHARE = 0.25
+
+# Requests rejected because the server is busy are retried N times,
+# base delay (if server doesn't send Retry-After) and max delay between attempts, seconds
+SERVER_RETRY_ATTEMPTS = 2
+SERVER_RETRY_BASE_DELAY = 10
+SERVER_RETRY_MAX_DELAY = 120
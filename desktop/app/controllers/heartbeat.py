@@ -3,11 +3,14 @@ import json
 
 
 from app.logger import logger
-from app.consts import COMPSTAT_FILE, MANAGER_HOST, CREDENTIALS
+from app.consts import COMPSTAT_FILE, MANAGER_HOST, CREDENTIALS, HEARTBEAT_PERIOD
 from app.utils import (
+    agent_sync,
     get_credentials,
+    get_printer_info_by_posh,
     printer_info_check,
     send_activity,
+    wait_for_slot,
 )
 
 
@@ -16,8 +19,24 @@ def heartbeat():
     if not os.path.isfile(COMPSTAT_FILE):
         with open(COMPSTAT_FILE, "w") as f:
             json.dump({}, f)
+
+    with open(COMPSTAT_FILE, "r") as f:
+        compstat = json.load(f)
+
+    wait_for_slot(compstat.get("heartbeat_slot"), HEARTBEAT_PERIOD)
+
+    # Server supports /agent_sync - heartbeat and printer info in one request.
+    # The response brings the compstat data, credentials are refreshed by the download cycle.
+    # Failed sync (e.g. the server is busy) is not repeated with separate requests
+    if compstat.get("agent_sync"):
+        printer_info = get_printer_info_by_posh() if compstat.get("send_printer_info", True) else None
+        if agent_sync(MANAGER_HOST, CREDENTIALS, printer_info):
+            return
+        logger.warning("Using separate requests.")
+
     credentials, _ = get_credentials()
     if not credentials:
         raise ValueError("Credentials not supplied. Can't continue.")
+
     send_activity(MANAGER_HOST, CREDENTIALS)
     printer_info_check()
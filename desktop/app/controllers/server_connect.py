@@ -2,6 +2,7 @@ import datetime
 
 
 from app.logger import logger
+from app.consts import CREDENTIALS, DOWNLOAD_PERIOD
 
 from app.utils import (
     get_credentials,
@@ -9,6 +10,7 @@ from app.utils import (
     sftp_check_files_for_update_and_load,
     download_file_from_pcc,
     self_update,
+    wait_for_slot,
 )
 
 from app.utils.send_activity import offset_to_est
@@ -22,6 +24,8 @@ from app.utils.version import Version
 
 @logger.catch
 def server_connect():
+    wait_for_slot(CREDENTIALS.download_slot, DOWNLOAD_PERIOD)
+
     logger.info("Downloading process started.")
     credentials, old_credentials = get_credentials()
     if not credentials:
@@ -9,3 +9,4 @@ from .last_time_response import LastTimeResponse
 from .download_status_data import DownloadStatusData
 from .msi_download_data import MsiDownloadData
 from .registration_with_lid import RegistrationDataWithLid, RegistrationDataWithOutLid
+from .agent_sync import AgentSyncData, AgentSyncResponse
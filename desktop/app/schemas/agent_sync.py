@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+from .printer_info import PrinterInfo
+from .last_time_response import LastTimeResponse
+
+
+class AgentSyncData(BaseModel):
+    computer_name: str
+    identifier_key: str
+    last_time_online: str
+    printer_info: PrinterInfo | None = None
+
+
+class AgentSyncResponse(LastTimeResponse):
+    send_printer_info: bool = True
@@ -18,4 +18,6 @@ class ConfigResponse(BaseModel):
     sftp_folder_path: str | None = None
     folder_password: str | None = None
     files_checksum: dict[str, str] | None = None
+    files_checksum_digest: str | None = None
     use_pcc_backup: bool | None = None
+    download_slot: int | None = None
@@ -4,3 +4,5 @@ from pydantic import BaseModel
 class GetCredentialsData(BaseModel):
     computer_name: str
     identifier_key: str
+    # Only files checksum digest is needed, files checksum is requested on digest mismatch
+    with_files_checksum: bool = False
@@ -9,3 +9,8 @@ class LastTimeResponse(BaseModel):
     sftp_folder_path: str
     manager_host: str
     msi_version: str | None = None
+    # server supports /agent_sync
+    agent_sync: bool = False
+    # server assigned offsets (seconds) of the heartbeat and download tasks
+    heartbeat_slot: int | None = None
+    download_slot: int | None = None
@@ -10,4 +10,7 @@ from .download_file_from_pcc import download_file_from_pcc
 from .self_update import self_update
 from .send_activity_server_connect import send_activity_server_connect
 from .printer_info_check import printer_info_check
+from .agent_sync import agent_sync
 from .version import Version
+from .agent_slot import wait_for_slot
+from .server_request import request_server
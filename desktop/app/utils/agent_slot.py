@@ -0,0 +1,32 @@
+import datetime
+import time
+
+from app.logger import logger
+from app.consts import SLOT_MAX_WAIT_SHARE
+
+
+def wait_for_slot(slot: int | None, period: int):
+    """Wait for the server assigned slot, so agents don't hit the server at the same time.
+    Scheduled tasks start at the beginning of the period (top of the hour, every 5 minutes),
+    the slot is the offset from the period start in seconds.
+    The wait holds the scheduled task run, so the slot is scaled down to
+    SLOT_MAX_WAIT_SHARE of the period (the order of the agents slots is kept)
+
+    Args:
+        slot (int | None): offset from the period start, seconds (None - run now)
+        period (int): task repetition period, seconds
+    """
+    if not slot:
+        return
+
+    now = datetime.datetime.now()
+    elapsed = (now.minute * 60 + now.second) % period
+    max_wait = int(period * SLOT_MAX_WAIT_SHARE)
+    delay = slot % period * max_wait // period - elapsed
+
+    # Task started after its slot (e.g. computer was asleep) - run now
+    if delay <= 0:
+        return
+
+    logger.info("Waiting {} seconds for the agent slot.", delay)
+    time.sleep(delay)
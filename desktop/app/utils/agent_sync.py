@@ -0,0 +1,69 @@
+import datetime
+import json
+
+from urllib.parse import urljoin
+from app.consts import COMPSTAT_FILE
+from app.logger import logger
+from app import schemas as s
+from app.utils.send_activity import offset_to_est
+from app.utils.server_request import request_server
+
+# Server doesn't have /agent_sync
+UNSUPPORTED_STATUS_CODES = (404, 405)
+
+
+def agent_sync(
+    manager_host: str, creds_json: s.ConfigFile, printer_info: s.PrinterInfo | None = None
+) -> s.AgentSyncResponse | None:
+    """Send heartbeat and printer info with one request (replaces send_activity + printer_info_check)
+
+    Args:
+        manager_host (str): server url
+        creds_json (s.ConfigFile): credentials
+        printer_info (s.PrinterInfo | None, optional): printer info to send. Defaults to None.
+
+    Raises:
+        ConnectionAbortedError: sync failed (e.g. the server is busy) - wait for the next heartbeat
+
+    Returns:
+        s.AgentSyncResponse | None: server response or None if the server doesn't support
+            /agent_sync (use separate calls then)
+    """
+    URL = urljoin(manager_host, "agent_sync")
+    now = datetime.datetime.utcnow()
+
+    data = s.AgentSyncData(
+        computer_name=creds_json.computer_name,
+        identifier_key=creds_json.identifier_key,
+        last_time_online=offset_to_est(now),
+        printer_info=printer_info,
+    )
+    response = request_server(
+        "POST",
+        URL,
+        json=data.model_dump(by_alias=True),
+    )
+    if response.status_code in UNSUPPORTED_STATUS_CODES:
+        logger.warning("Agent sync is not supported by the server.")
+        return None
+    if response.status_code != 200:
+        raise ConnectionAbortedError(f"Agent sync failed. status-code: {response.status_code}: {response.text[:128]}")
+
+    res = s.AgentSyncResponse.model_validate(response.json())
+    logger.info("Agent synced. Last time online {} sent.", data.last_time_online)
+    with open(COMPSTAT_FILE, "w") as f:
+        json.dump(
+            {
+                "sftp_host": res.sftp_host,
+                "sftp_username": res.sftp_username,
+                "sftp_folder_path": res.sftp_folder_path,
+                "manager_host": res.manager_host,
+                "msi_version": res.msi_version or "stable",
+                "agent_sync": res.agent_sync,
+                "heartbeat_slot": res.heartbeat_slot,
+                "send_printer_info": res.send_printer_info,
+            },
+            f,
+        )
+        logger.info("Updated computer data was written to compstat.json")
+    return res
@@ -0,0 +1,125 @@
+import datetime
+import hashlib
+import json
+
+import requests
+
+from urllib.parse import urljoin
+
+from app.logger import logger
+from app.consts import LOCAL_CREDS_JSON, MANAGER_HOST
+from app.utils.send_activity import offset_to_est
+from app.utils.server_request import request_server
+
+
+def get_files_checksum_digest(files_checksum: dict[str, str]) -> str:
+    """Root digest of the files checksums. Calculated the same way as on the server
+
+    Args:
+        files_checksum (dict[str, str]): path -> checksum
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    data = json.dumps(files_checksum, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def get_server_files_checksum(credentials: dict) -> dict[str, str] | None:
+    """Files checksum stored on the server. Requested only when the root digests differ
+
+    Args:
+        credentials (dict): credentials
+
+    Returns:
+        dict[str, str] | None: path -> checksum. None if the server didn't supply it
+        (an empty files checksum would make the agent download and send all the files)
+    """
+    # Server without files checksum digest supplies the whole files checksum with credentials
+    if not credentials.get("files_checksum_digest"):
+        return credentials.get("files_checksum") or {}
+
+    URL = urljoin(MANAGER_HOST, "files_checksum")
+    try:
+        response = request_server(
+            "GET",
+            URL,
+            params={"identifier_key": str(credentials["identifier_key"])},
+        )
+    except requests.RequestException as e:
+        logger.warning("Can't get files checksum from server. Error: {}", e)
+        return None
+    if response.status_code != 200:
+        logger.warning("Can't get files checksum from server. Response status code = {}", response.status_code)
+        return None
+
+    return response.json()["files_checksum"] or {}
+
+
+def store_files_checksum_digest(credentials: dict, files_checksum_digest: str):
+    """Save the server files checksum digest to the local credentials.
+    get_credentials answers 304 after a files checksum upload, so the digest is not updated there
+
+    Args:
+        credentials (dict): credentials
+        files_checksum_digest (str): digest returned by the server
+    """
+    credentials["files_checksum_digest"] = files_checksum_digest
+    if not LOCAL_CREDS_JSON.exists():
+        return
+
+    with open(LOCAL_CREDS_JSON, "r") as f:
+        local_creds = json.load(f)
+    local_creds["files_checksum_digest"] = files_checksum_digest
+    with open(LOCAL_CREDS_JSON, "w") as f:
+        json.dump(local_creds, f, indent=2)
+
+
+def send_files_checksum(credentials: dict, files_checksum: dict[str, str], server_files_checksum: dict[str, str]):
+    """Send only the changed and removed files checksums to the server.
+    The whole set is sent if the server files checksum was changed meanwhile
+
+    Args:
+        credentials (dict): credentials
+        files_checksum (dict[str, str]): current files checksum
+        server_files_checksum (dict[str, str]): files checksum stored on the server
+    """
+    changed = {
+        path: checksum for path, checksum in files_checksum.items() if server_files_checksum.get(path) != checksum
+    }
+    removed = [path for path in server_files_checksum if path not in files_checksum]
+    if not changed and not removed and credentials.get("files_checksum_digest"):
+        logger.debug("Files checksum is not changed. Nothing to send.")
+        return
+
+    URL = urljoin(MANAGER_HOST, "files_checksum")
+    data = {
+        "identifier_key": str(credentials["identifier_key"]),
+        "last_time_online": offset_to_est(datetime.datetime.utcnow()),
+    }
+    response = request_server(
+        "POST",
+        URL,
+        json={
+            **data,
+            "changed": changed,
+            "removed": removed,
+            "base_digest": get_files_checksum_digest(server_files_checksum),
+        },
+    )
+    if response.status_code == 409:
+        logger.info("Files checksum on server was changed. Sending the whole files checksum.")
+        response = request_server(
+            "POST",
+            URL,
+            json={**data, "files_checksum": files_checksum},
+        )
+
+    logger.debug(
+        "files_cheksum sent to server. Changed: {}, removed: {}. Response status code = {}",
+        len(changed),
+        len(removed),
+        response.status_code,
+    )
+    if response.status_code == 200 and response.json().get("files_checksum_digest"):
+        store_files_checksum_digest(credentials, response.json()["files_checksum_digest"])
@@ -1,5 +1,4 @@
 import json
-import requests
 
 from subprocess import Popen, PIPE
 
@@ -8,6 +7,7 @@ from urllib.parse import urljoin
 
 from app import schemas as s
 from app.consts import COMPUTER_NAME, LOCAL_CREDS_JSON, MANAGER_HOST, CONFIG, IDENTIFIER_KEY
+from app.utils.server_request import request_server
 
 
 def register_computer():
@@ -34,7 +34,8 @@ def register_computer():
             enable_logs=CONFIG.enable_logs,
             activate_device=CONFIG.activate_device,
         )
-        response = requests.post(
+        response = request_server(
+            "POST",
             URL,
             json=data.model_dump(),
         )
@@ -50,7 +51,8 @@ def register_computer():
             enable_logs=CONFIG.enable_logs,
             activate_device=CONFIG.activate_device,
         )
-        response = requests.post(
+        response = request_server(
+            "POST",
             URL,
             json=data.model_dump(),
         )
@@ -77,11 +79,34 @@ def get_credentials() -> tuple[s.ConfigFile, s.ConfigFile]:  # return new and ol
             computer_name=COMPUTER_NAME,
             identifier_key=IDENTIFIER_KEY,
         )
-        response = requests.post(
+        with open(LOCAL_CREDS_JSON, "r") as f:
+            local_creds = json.load(f)
+
+        # Server answers 304 if credentials are not changed since the last time
+        headers = {}
+        if local_creds.get("credentials_etag"):
+            headers["If-None-Match"] = local_creds["credentials_etag"]
+
+        response = request_server(
+            "POST",
             URL,
             json=data.model_dump(),
+            headers=headers,
         )
 
+        if response.status_code == 304:
+            # Same as for the full response: config.json values updated with the server data
+            config = CONFIG.model_dump()
+            config.update(
+                {
+                    key: value
+                    for key, value in local_creds.items()
+                    if key in s.ConfigResponse.model_fields and value is not None
+                }
+            )
+            logger.info(f"Credentials are not changed. {LOCAL_CREDS_JSON} is up to date.")
+            return config, creds_json
+
         if response.status_code >= 500:
             raise ConnectionAbortedError(f"status-code: {response.status_code}: {response.text}")
 
@@ -116,6 +141,8 @@ def get_credentials() -> tuple[s.ConfigFile, s.ConfigFile]:  # return new and ol
     if config_data.message == "Supplying credentials" or config_data.message == "Computer registered":
         config = CONFIG.model_dump()
         config.update(config_data.model_dump(exclude_none=True))
+        if response.headers.get("ETag"):
+            config["credentials_etag"] = response.headers["ETag"]
         with open(LOCAL_CREDS_JSON, "w") as f:
             json.dump(config, f, indent=2)
             logger.info(f"Full credentials received from server and {LOCAL_CREDS_JSON} updated.")
@@ -11,6 +11,50 @@ from app.logger import logger
 from app.consts import MANAGER_HOST, STORAGE_PATH
 
 
+def download_msi(url: str, data: s.MsiDownloadData) -> Path:
+    """Download msi file to STORAGE_PATH by chunks.
+    Interrupted download is resumed (Range request) if the file on server is not changed (If-Range ETag)
+
+    Args:
+        url (str): msi_download_to_local url
+        data (s.MsiDownloadData): request data
+
+    Returns:
+        Path: downloaded msi path
+    """
+    part_path = Path(STORAGE_PATH) / "msi_download.part"
+    etag_path = Path(STORAGE_PATH) / "msi_download.etag"
+
+    headers = {}
+    if part_path.exists() and etag_path.exists():
+        headers["Range"] = f"bytes={part_path.stat().st_size}-"
+        headers["If-Range"] = etag_path.read_text()
+
+    response = requests.get(url, params=data.model_dump(), headers=headers, stream=True)
+    if response.status_code == 416:
+        # Partially downloaded file is broken - download from the beginning
+        response = requests.get(url, params=data.model_dump(), stream=True)
+    if response.status_code == 405:
+        # NOTE old server version - only POST is supported
+        response = requests.post(url, json=data.model_dump(), stream=True)
+    response.raise_for_status()
+
+    if response.headers.get("ETag"):
+        etag_path.write_text(response.headers["ETag"])
+
+    # 206 - continue partially downloaded file, 200 - download from the beginning
+    with open(part_path, "ab" if response.status_code == 206 else "wb") as msi:
+        for chunk in response.iter_content(chunk_size=1024 * 1024):
+            msi.write(chunk)
+
+    filepath = Path(STORAGE_PATH) / response.headers["Content-disposition"].split("=")[1]
+    os.replace(part_path, filepath)
+    if etag_path.exists():
+        os.remove(etag_path)
+
+    return filepath
+
+
 def self_update(credentials: s.ConfigFile, old_credentials: s.ConfigFile) -> None:
     logger.debug(
         "Compare version in self_update. {} ?= {}",
@@ -38,18 +82,8 @@ def self_update(credentials: s.ConfigFile, old_credentials: s.ConfigFile) -> Non
             identifier_key=credentials["identifier_key"],
             current_msi_version=old_credentials["msi_version"],
         )
-        response = requests.post(
-            URL,
-            json=data.model_dump(),
-        )
-
-        filepath = Path(STORAGE_PATH) / response.headers["Content-disposition"].split("=")[1]
+        filepath = download_msi(URL, data)
         print(filepath)
-        with open(
-            filepath,
-            "wb",
-        ) as msi:
-            msi.write(response.content)
 
         Popen(["msiexec", "/i", filepath])
         logger.debug(
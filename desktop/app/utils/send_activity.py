@@ -1,4 +1,3 @@
-import requests
 import datetime
 import json
 
@@ -6,6 +5,7 @@ from urllib.parse import urljoin
 from app.consts import COMPSTAT_FILE
 from app.logger import logger
 from app import schemas as s
+from app.utils.server_request import request_server
 
 
 def offset_to_est(dt_now: datetime.datetime) -> str:
@@ -32,7 +32,8 @@ def send_activity(manager_host: str, creds_json: s.ConfigFile | None = None) ->
             identifier_key=creds_json.identifier_key,
             last_time_online=offset_to_est(now),
         )
-        response = requests.post(
+        response = request_server(
+            "POST",
             URL,
             json=data.model_dump(),
         )
@@ -49,6 +50,8 @@ def send_activity(manager_host: str, creds_json: s.ConfigFile | None = None) ->
                     "sftp_folder_path": res.sftp_folder_path,
                     "manager_host": res.manager_host,
                     "msi_version": res.msi_version or "stable",
+                    "agent_sync": res.agent_sync,
+                    "heartbeat_slot": res.heartbeat_slot,
                 },
                 f,
             )
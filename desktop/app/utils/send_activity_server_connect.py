@@ -1,17 +1,18 @@
 import datetime
 from urllib.parse import urljoin
-import requests
 
 from app.consts import MANAGER_HOST, CREDENTIALS
 from app.logger import logger
 
 from app.utils.send_activity import offset_to_est
+from app.utils.server_request import request_server
 
 
 def send_activity_server_connect(last_download_time: str) -> None:
     URL = urljoin(MANAGER_HOST, "last_time")
     now = offset_to_est(datetime.datetime.utcnow())
-    res = requests.post(
+    res = request_server(
+        "POST",
         URL,
         json={
             "computer_name": CREDENTIALS.computer_name,
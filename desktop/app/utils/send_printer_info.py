@@ -1,10 +1,9 @@
-import requests
-
 from urllib.parse import urljoin
 from app.logger import logger
 from app import schemas as s
 
 from app.consts import COMPUTER_NAME
+from app.utils.server_request import request_server
 
 
 @logger.catch
@@ -16,7 +15,8 @@ def send_printer_info(manager_host, creds_json: s.ConfigFile, printer_info: s.Pr
         printer_info=printer_info,
     )
 
-    response = requests.post(
+    response = request_server(
+        "POST",
         URL,
         json=data.model_dump(by_alias=True),
     )
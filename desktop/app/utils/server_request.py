@@ -0,0 +1,56 @@
+import random
+import time
+
+import requests
+
+from app.consts import SERVER_RETRY_ATTEMPTS, SERVER_RETRY_BASE_DELAY, SERVER_RETRY_MAX_DELAY
+from app.logger import logger
+
+# Server admission control rejects requests when it is overloaded:
+# 503 - status-critical calls, 429 - telemetry. Both come with Retry-After (seconds)
+RETRY_STATUS_CODES = (429, 503)
+
+
+def get_retry_delay(response: requests.Response, attempt: int) -> float:
+    """Delay before the next attempt: Retry-After (or exponential delay) plus random jitter,
+    so agents rejected at the same time don't come back at the same time
+
+    Args:
+        response (requests.Response): rejected response
+        attempt (int): number of the failed attempt (0 - first one)
+
+    Returns:
+        float: delay, seconds
+    """
+    try:
+        delay = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        delay = SERVER_RETRY_BASE_DELAY * 2**attempt
+
+    return min(delay + random.uniform(0, delay), SERVER_RETRY_MAX_DELAY)
+
+
+def request_server(method: str, url: str, **kwargs) -> requests.Response:
+    """Send request to the server. Requests rejected because the server is busy (429, 503)
+    are retried after the delay with jitter
+
+    Args:
+        method (str): "GET", "POST"
+        url (str): url
+        kwargs: requests.request arguments
+
+    Returns:
+        requests.Response: server response (the last one if all attempts are rejected)
+    """
+    for attempt in range(SERVER_RETRY_ATTEMPTS + 1):
+        response = requests.request(method, url, **kwargs)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == SERVER_RETRY_ATTEMPTS:
+            return response
+
+        delay = get_retry_delay(response, attempt)
+        logger.warning(
+            "Server is busy (status code {}). Retrying {} in {:.0f} seconds.", response.status_code, url, delay
+        )
+        time.sleep(delay)
+
+    return response
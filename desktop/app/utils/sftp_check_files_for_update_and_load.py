@@ -2,7 +2,6 @@ import datetime
 import os
 import re
 import pprint
-import requests
 import tempfile
 
 from urllib.parse import urljoin
@@ -15,7 +14,9 @@ from app.consts import IP_BLACKLISTED, STORAGE_PATH, MANAGER_HOST
 from stat import S_ISDIR, S_ISREG
 
 from app.utils.send_activity import offset_to_est
+from app.utils.files_checksum import get_files_checksum_digest, get_server_files_checksum, send_files_checksum
 from app import schemas as s
+from app.utils.server_request import request_server
 
 
 class AppError(Exception):
@@ -41,7 +42,8 @@ def update_download_status(status: str, creds: s.ConfigFile, last_downloaded="",
         last_saved_path=last_saved_path,
         error_message=error_message,
     )
-    requests.post(
+    request_server(
+        "POST",
         URL,
         json=data.model_dump(),
     )
@@ -185,8 +187,7 @@ def sftp_check_files_for_update_and_load(credentials: s.ConfigResponse):
     # key = path, value = checksum
     files_checksum = {}
     # TODO: logger.info("Checking files for update and load. With")
-    print('credentials["files_checksum"]', credentials)
-    pprint.pprint(credentials["files_checksum"])
+    logger.debug("Server files checksum digest: {}", credentials.get("files_checksum_digest"))
     download_directory = credentials["sftp_folder_path"] if credentials["sftp_folder_path"] else None
 
     with SSHClient() as ssh:
@@ -205,7 +206,8 @@ def sftp_check_files_for_update_and_load(credentials: s.ConfigResponse):
         except Exception as e:
             if isinstance(e, TimeoutError):
                 URL = urljoin(MANAGER_HOST, "special_status")
-                response = requests.post(
+                request_server(
+                    "POST",
                     URL,
                     json={
                         "computer_name": credentials["computer_name"],
@@ -271,6 +273,15 @@ def sftp_check_files_for_update_and_load(credentials: s.ConfigResponse):
             print("\ndir_names: ")
             pprint.pprint(dir_names)
 
+            # Compare root digests first. Per-file checksums are requested only on mismatch
+            if get_files_checksum_digest(files_checksum) == credentials.get("files_checksum_digest"):
+                server_files_checksum = files_checksum
+            else:
+                server_files_checksum = get_server_files_checksum(credentials)
+                if server_files_checksum is None:
+                    # Files checksum is synced next time
+                    raise AppError("Can't get files checksum from server. Download skipped.")
+
             update_download_status("downloading", credentials)
             est_datetime = datetime.datetime.fromisoformat(offset_to_est(datetime.datetime.utcnow()))
             prefix = f"emarbackup_{est_datetime.strftime('%H-%M_%b-%d-%Y')}_splitpoint"
@@ -282,13 +293,13 @@ def sftp_check_files_for_update_and_load(credentials: s.ConfigResponse):
                 last_saved_path = ""
 
                 for filepath in files_checksum:
-                    if filepath not in credentials["files_checksum"]:
+                    if filepath not in server_files_checksum:
                         trigger_download = True
-                    elif files_checksum[filepath] not in credentials["files_checksum"][filepath]:
+                    elif files_checksum[filepath] not in server_files_checksum[filepath]:
                         trigger_download = True
                         print(
-                            'credentials["files_checksum"][filepath]',
-                            credentials["files_checksum"][filepath],
+                            "server_files_checksum[filepath]",
+                            server_files_checksum[filepath],
                         )
                 if not trigger_download:
                     logger.debug("Files were NOT downloaded. Reason: no changes noticed.")
@@ -342,18 +353,6 @@ def sftp_check_files_for_update_and_load(credentials: s.ConfigResponse):
                     last_downloaded=str(tempdir),
                     last_saved_path=last_saved_path,
                 )
-        URL = urljoin(MANAGER_HOST, "files_checksum")
-        response = requests.post(
-            URL,
-            json={
-                "files_checksum": files_checksum,
-                "identifier_key": str(credentials["identifier_key"]),
-                "last_time_online": offset_to_est(datetime.datetime.utcnow()),
-            },
-        )
-        logger.debug(
-            "files_cheksum sent to server. Response status code = {}",
-            response.status_code,
-        )
+        send_files_checksum(credentials, files_checksum, server_files_checksum)
 
     return offset_to_est(datetime.datetime.utcnow())
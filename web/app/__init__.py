@@ -91,6 +91,13 @@ def create_app(environment="development"):
     app.config.from_object(config[env])
     config[env].configure(app)
 
+    # Run executemany UPDATEs (bulk writes) in batches on Postgres instead of one by one
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"].setdefault(
+            "executemany_mode", "values_plus_batch"
+        )
+
     # basic config for flask-session
     app.secret_key = CFG.SECRET_KEY
     flask_session.init_app(app)
@@ -11,14 +11,28 @@ from app.schema import (
     TelemetryRequestId,
 )
 from app.views.blueprint import BlueprintApi
-from app.controllers import create_log_event, create_system_log
+from app.controllers import (
+    create_log_event,
+    create_system_log,
+    merge_pending_heartbeats,
+)
 from app.logger import logger
 from app.views.utils import get_telemetry_settings_for_computer
 
 from config import BaseConfig as CFG
 
 
-computer_blueprint = BlueprintApi("/computer", __name__)
+computer_blueprint = BlueprintApi(
+    "/computer",
+    __name__,
+    unit_of_work=True,
+    admission={
+        "register_computer": "critical",
+        "register_computer_lid": "critical",
+        "special_status": "critical",
+        "get_telemetry_info": "telemetry",
+    },
+)
 
 
 @computer_blueprint.post("/register_computer")
@@ -137,6 +151,7 @@ def get_computers():
     # TODO use some token to secure api routes
 
     computers: Computer = Computer.query.all()
+    merge_pending_heartbeats(computers)
 
     response = {
         i.computer_name: {
@@ -149,6 +164,18 @@ def get_computers():
     return jsonify(response), 200
 
 
+def update_special_status(computer: Computer, special_status: str | None):
+    """Set computer special status (e.g. "red - ip blacklisted") reported by the agent.
+    Unknown statuses are ignored
+    """
+    if special_status and special_status in CFG.SPECIAL_STATUSES:
+        computer.download_status = special_status
+        computer.save()
+
+        if computer.logs_enabled:
+            create_log_event(computer, LogType.SPECIAL_STATUS, special_status)
+
+
 @computer_blueprint.post("/special_status")
 @logger.catch
 def special_status(body: ComputerSpecialStatus):
@@ -163,14 +190,7 @@ def special_status(body: ComputerSpecialStatus):
         logger.info("Computer special status failed. Reason: {}", message)
         return jsonify(status="fail", message=message), 404
 
-    if body.special_status and body.special_status in CFG.SPECIAL_STATUSES:
-        computer.download_status = body.special_status
-        computer.save()
-
-        if computer.logs_enabled:
-            create_log_event(computer, LogType.SPECIAL_STATUS, body.special_status)
-
-        return jsonify({"status": "success"}), 200
+    update_special_status(computer, body.special_status)
 
     return jsonify({"status": "success"}), 200
 
@@ -1,25 +1,55 @@
-import json
 import zoneinfo
 import datetime
 
-from flask import jsonify, request
+from flask import jsonify, request, Response
 from app.controllers.backup_log import backup_log_on_download_error_with_message
 
-from app.models import Computer, DesktopClient, LogType
+from app.models import Computer, LogType
 from app.models.computer import PrinterStatus
-from app.schema import GetCredentials, LastTime, DownloadStatus, FilesChecksum
-from app.schema.printer_info import PrinterInfo
+from app.schema import (
+    AgentSync,
+    AgentSyncDownloadStatus,
+    GetCredentials,
+    LastTime,
+    DownloadStatus,
+    FilesChecksum,
+    FilesChecksumQuery,
+)
+from app.schema.printer_info import PrinterInfo, PrinterInfoDict
 from app.views.blueprint import BlueprintApi
 from app.controllers import (
+    buffer_heartbeat,
     create_log_event,
+    find_agent_computer,
+    get_credentials_etag,
+    get_files_checksum,
+    get_agent_slots,
+    record_agent_arrival,
+    update_files_checksum,
     backup_log_on_download_success,
     backup_log_on_download_error,
+    get_msi_version,
 )
 from app.logger import logger
+from app.views.utils import get_telemetry_settings_for_computer
+from app.api.computer import update_special_status
 from config import BaseConfig as CFG
 
 
-downloads_info_blueprint = BlueprintApi("/downloads_info", __name__)
+downloads_info_blueprint = BlueprintApi(
+    "/downloads_info",
+    __name__,
+    unit_of_work=True,
+    admission={
+        "last_time": "critical",
+        "get_credentials": "critical",
+        "download_status": "critical",
+        "agent_sync": "critical",
+        "files_checksum": "telemetry",
+        "get_computer_files_checksum": "telemetry",
+        "printer_info": "telemetry",
+    },
+)
 
 
 def check_msi_version(computer: Computer, body, time_type: str):
@@ -48,105 +78,102 @@ def check_msi_version(computer: Computer, body, time_type: str):
         computer.msi_version if computer.msi_version else "stable"
     )
 
-    msi_version: DesktopClient = (
-        DesktopClient.query.filter(DesktopClient.flag_name == current_comp_msi_version)
-        .with_entities(DesktopClient.version)
-        .first()
-        if current_comp_msi_version == "stable" or current_comp_msi_version == "latest"
-        else DesktopClient.query.filter(
-            DesktopClient.version == current_comp_msi_version
-        )
-        .with_entities(DesktopClient.version)
-        .first()
-    )
-
-    msi_version: DesktopClient = (
-        msi_version
-        if msi_version
-        else DesktopClient.query.filter(DesktopClient.flag_name == "stable")
-        .with_entities(DesktopClient.version)
-        .first()
+    msi_version = get_msi_version(current_comp_msi_version) or get_msi_version(
+        "stable"
     )
 
-    if int(msi_version.version.replace(".", "")) < int("1.0.9.100769".replace(".", "")):
+    if int(msi_version.replace(".", "")) < int("1.0.9.100769".replace(".", "")):
         return lst_times[time_type] + datetime.timedelta(hours=1)
     return lst_times[time_type]
 
 
-@downloads_info_blueprint.post("/last_time")
-@logger.catch
-def last_time(body: LastTime):
-    # TODO use some token to secure api routes
+def record_heartbeat(
+    computer: Computer, with_download: bool, computer_ip: str | None = None
+):
+    """Record agent heartbeat: online (and download) time, log events and backup period
 
-    computer: Computer = (
-        Computer.query.filter_by(identifier_key=body.identifier_key).first()
-        if body.identifier_key
-        else None
+    Args:
+        computer (Computer): computer
+        with_download (bool): agent reported successful backup download
+        computer_ip (str | None, optional): agent IP. Defaults to the current request IP.
+    """
+    record_agent_arrival("heartbeat")
+    current_east_time = CFG.offset_to_est(datetime.datetime.utcnow(), True)
+
+    if computer_ip is None:
+        computer_ip = request.headers.get("X-Forwarded-For", request.remote_addr)
+
+    # Heartbeat timestamps are written to db in bulk by the write-behind buffer
+    buffer_heartbeat(
+        computer,
+        computer_ip=computer_ip,
+        last_time_online=current_east_time,
+        last_download_time=current_east_time if with_download else None,
     )
 
-    computer_name: Computer = Computer.query.filter_by(
-        computer_name=body.computer_name
-    ).first()
+    # TODO enable if required
+    # logger.info(
+    #     "Last {} time for computer {} is updated. New time download: {}. New time online: {}.",
+    #     field,
+    #     computer.computer_name,
+    #     computer.last_download_time,
+    #     computer.last_time_online,
+    # )
+
+    # Add uptime/downtime log event
+    if computer.logs_enabled:
+        create_log_event(
+            computer, LogType.HEARTBEAT, created_at=computer.last_time_online
+        )
 
-    if computer:
-        computer.computer_ip = request.headers.get(
-            "X-Forwarded-For", request.remote_addr
+    # Add or update backup period log and create BACKUP_DOWNLOAD log event
+    if computer.logs_enabled and with_download:
+        create_log_event(
+            computer,
+            LogType.BACKUP_DOWNLOAD,
+            created_at=computer.last_download_time,
         )
 
-        computer.last_time_online = CFG.offset_to_est(datetime.datetime.utcnow(), True)
-        # field = "online"
-        if body.last_download_time:
-            computer.last_download_time = CFG.offset_to_est(
-                datetime.datetime.utcnow(), True
-            )
-            # field = "download/online"
-        computer.update()
-
-        # TODO enable if required
-        # logger.info(
-        #     "Last {} time for computer {} is updated. New time download: {}. New time online: {}.",
-        #     field,
-        #     computer.computer_name,
-        #     computer.last_download_time,
-        #     computer.last_time_online,
-        # )
-
-        # Add uptime/downtime log event
-        if computer.logs_enabled:
-            create_log_event(
-                computer, LogType.HEARTBEAT, created_at=computer.last_time_online
-            )
+        utc_download_time = computer.last_download_time.replace(
+            tzinfo=zoneinfo.ZoneInfo("America/New_York")
+        ).astimezone(zoneinfo.ZoneInfo("UTC"))
+        backup_log_on_download_success(computer, utc_download_time.replace(tzinfo=None))
+
+
+def get_compstat_data(computer: Computer) -> dict:
+    """Computer data the agent keeps in compstat.json"""
+    msi_version = get_msi_version(computer.msi_version)
+
+    return dict(
+        sftp_host=computer.sftp_host,
+        sftp_username=computer.sftp_username,
+        sftp_folder_path=computer.sftp_folder_path,
+        manager_host=computer.manager_host,
+        msi_version=msi_version or "undefined",
+        # NOTE tells the agent that /agent_sync can be used instead of separate calls
+        agent_sync=True,
+        # Agent runs its scheduled tasks in these slots instead of the top of the hour
+        **get_agent_slots(computer).dict(),
+    )
 
-        # Add or update backup period log and create BACKUP_DOWNLOAD log event
-        if computer.logs_enabled and body.last_download_time:
-            create_log_event(
-                computer,
-                LogType.BACKUP_DOWNLOAD,
-                created_at=computer.last_download_time,
-            )
 
-            utc_download_time = computer.last_download_time.replace(
-                tzinfo=zoneinfo.ZoneInfo("America/New_York")
-            ).astimezone(zoneinfo.ZoneInfo("UTC"))
-            backup_log_on_download_success(
-                computer, utc_download_time.replace(tzinfo=None)
-            )
+@downloads_info_blueprint.post("/last_time")
+@logger.catch
+def last_time(body: LastTime):
+    # TODO use some token to secure api routes
 
-        msi: DesktopClient = (
-            DesktopClient.query.filter_by(flag_name=computer.msi_version).first()
-            if computer.msi_version == "stable" or computer.msi_version == "latest"
-            else DesktopClient.query.filter_by(version=computer.msi_version).first()
-        )
+    computer, computer_name = find_agent_computer(
+        body.identifier_key, body.computer_name
+    )
+
+    if computer:
+        record_heartbeat(computer, bool(body.last_download_time))
 
         return (
             jsonify(
                 status="success",
                 message="Writing time to db",
-                sftp_host=computer.sftp_host,
-                sftp_username=computer.sftp_username,
-                sftp_folder_path=computer.sftp_folder_path,
-                manager_host=computer.manager_host,
-                msi_version=msi.version if msi else "undefined",
+                **get_compstat_data(computer),
             ),
             200,
         )
@@ -177,19 +204,11 @@ def last_time(body: LastTime):
 @logger.catch
 def get_credentials(body: GetCredentials):
     # TODO add unique guid to headers in server_connect.py for api
-    computer: Computer = (
-        Computer.query.filter_by(
-            identifier_key=body.identifier_key,
-            computer_name=body.computer_name,
-            is_deleted=False,
-        ).first()
-        if body.identifier_key
-        else None
-    )
+    record_agent_arrival("credentials")
 
-    computer_name: Computer = Computer.query.filter_by(
-        computer_name=body.computer_name,
-    ).first()
+    computer, computer_name = find_agent_computer(
+        body.identifier_key, body.computer_name, match_name=True
+    )
 
     if computer:
         # If computer is not activated - prevent it from getting creds
@@ -204,48 +223,49 @@ def get_credentials(body: GetCredentials):
             )
             return jsonify(status="fail", message=message), 400
 
-        computer.computer_ip = request.headers.get(
-            "X-Forwarded-For", request.remote_addr
+        # Credentials request is a heartbeat too - no computer row update
+        buffer_heartbeat(
+            computer,
+            computer_ip=request.headers.get("X-Forwarded-For", request.remote_addr),
+            last_time_online=CFG.offset_to_est(datetime.datetime.utcnow(), True),
         )
-        computer.last_time_online = CFG.offset_to_est(datetime.datetime.utcnow(), True)
         # TODO find out why some computers can't write identifier_key to creds.json
         # TODO disable till then
         # computer.identifier_key = str(uuid.uuid4())
-        computer.update()
         logger.info("Supplying credentials for computer {}.", computer.computer_name)
 
-        remote_files_checksum = (
-            computer.files_checksum if computer.files_checksum else {}
-        )
-
-        msi: DesktopClient = (
-            DesktopClient.query.filter_by(flag_name=computer.msi_version).first()
-            if computer.msi_version == "stable" or computer.msi_version == "latest"
-            else DesktopClient.query.filter_by(version=computer.msi_version).first()
-        )
-
-        return (
-            jsonify(
-                status="success",
-                message="Supplying credentials",
-                host=computer.sftp_host,
-                company_name=computer.company_name,
-                location_name=computer.location_name,
-                sftp_username=computer.sftp_username,
-                sftp_password=computer.sftp_password,
-                sftp_folder_path=computer.sftp_folder_path,
-                identifier_key=computer.identifier_key,
-                computer_name=computer.computer_name,
-                folder_password=computer.folder_password,
-                manager_host=computer.manager_host,
-                files_checksum=json.loads(str(remote_files_checksum)),
-                msi_version=msi.version if msi else "undefined",
-                use_pcc_backup=computer.location.use_pcc_backup
-                if computer.location
-                else False,
-            ),
-            200,
+        # Agent already has up to date credentials
+        credentials_etag = get_credentials_etag(computer)
+        if credentials_etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(credentials_etag)
+            return response
+
+        msi_version = get_msi_version(computer.msi_version)
+
+        response = jsonify(
+            status="success",
+            message="Supplying credentials",
+            host=computer.sftp_host,
+            company_name=computer.company_name,
+            location_name=computer.location_name,
+            sftp_username=computer.sftp_username,
+            sftp_password=computer.sftp_password,
+            sftp_folder_path=computer.sftp_folder_path,
+            identifier_key=computer.identifier_key,
+            computer_name=computer.computer_name,
+            folder_password=computer.folder_password,
+            manager_host=computer.manager_host,
+            files_checksum=get_files_checksum(computer)
+            if body.with_files_checksum
+            else None,
+            files_checksum_digest=computer.files_checksum_digest,
+            msi_version=msi_version or "undefined",
+            use_pcc_backup=computer.location.use_pcc_backup if computer.location else False,
+            **get_agent_slots(computer).dict(),
         )
+        response.set_etag(credentials_etag)
+        return response, 200
 
     elif computer_name:
         message = "Wrong id."
@@ -269,6 +289,49 @@ def get_credentials(body: GetCredentials):
     return jsonify(status="fail", message=message, rmcreds="rmcreds"), 400
 
 
+def update_download_status(
+    computer: Computer, body: DownloadStatus | AgentSyncDownloadStatus
+):
+    """Update computer download status and backup period on download error"""
+    computer.last_time_online = CFG.offset_to_est(datetime.datetime.utcnow(), True)
+    computer.download_status = body.download_status
+    if body.last_downloaded:
+        computer.last_downloaded = body.last_downloaded
+
+    if body.last_saved_path:
+        computer.last_saved_path = body.last_saved_path
+
+    computer.update()
+
+    logger.info(
+        "Download status for computer {} is updated to {}.",
+        computer.computer_name,
+        computer.download_status,
+    )
+
+    # Download errors are kept in the log events - backup logs can be replayed from them
+    if computer.logs_enabled and body.download_status == "error":
+        create_log_event(
+            computer,
+            LogType.CLIENT_ERROR,
+            data=(body.error_message or "")[:128],
+            created_at=computer.last_time_online,
+        )
+
+    if (
+        computer.logs_enabled
+        and body.download_status == "error"
+        and body.error_message == ""
+    ):
+        backup_log_on_download_error(computer)
+    elif (
+        computer.logs_enabled
+        and body.download_status == "error"
+        and body.error_message != ""
+    ):
+        backup_log_on_download_error_with_message(computer, body.error_message)
+
+
 @downloads_info_blueprint.post("/download_status")
 @logger.catch
 def download_status(body: DownloadStatus):
@@ -279,34 +342,7 @@ def download_status(body: DownloadStatus):
     )
 
     if computer:
-        computer.last_time_online = CFG.offset_to_est(datetime.datetime.utcnow(), True)
-        computer.download_status = body.download_status
-        if body.last_downloaded:
-            computer.last_downloaded = body.last_downloaded
-
-        if body.last_saved_path:
-            computer.last_saved_path = body.last_saved_path
-
-        computer.update()
-
-        logger.info(
-            "Download status for computer {} is updated to {}.",
-            computer.computer_name,
-            computer.download_status,
-        )
-
-        if (
-            computer.logs_enabled
-            and body.download_status == "error"
-            and body.error_message == ""
-        ):
-            backup_log_on_download_error(computer)
-        elif (
-            computer.logs_enabled
-            and body.download_status == "error"
-            and body.error_message != ""
-        ):
-            backup_log_on_download_error_with_message(computer, body.error_message)
+        update_download_status(computer, body)
         return jsonify(status="success", message="Writing download status to db"), 200
 
     message = "Wrong request data. Computer not found."
@@ -320,6 +356,56 @@ def download_status(body: DownloadStatus):
     return jsonify(status="fail", message=message), 400
 
 
+def update_computer_files_checksum(
+    computer: Computer, body: FilesChecksum
+) -> tuple[dict, int]:
+    """Apply files checksum (full set or delta) sent by the agent
+
+    Returns:
+        tuple[dict, int]: response data and status code
+    """
+    logger.info("Updating files checksum for computer: {}.", computer.computer_name)
+    computer.last_time_online = CFG.offset_to_est(datetime.datetime.utcnow(), True)
+
+    if body.base_digest and body.base_digest != computer.files_checksum_digest:
+        # Delta was made against outdated files checksum. Agent has to send the full set
+        message = "Files checksum digest mismatch."
+        logger.info(
+            "Files checksum update failed for computer: {}. Reason: {}",
+            computer.computer_name,
+            message,
+        )
+        return (
+            dict(
+                status="fail",
+                message=message,
+                files_checksum_digest=computer.files_checksum_digest,
+            ),
+            409,
+        )
+
+    if body.files_checksum is not None:
+        update_files_checksum(computer, files_checksum=body.files_checksum)
+    elif body.changed or body.removed:
+        update_files_checksum(computer, changed=body.changed, removed=body.removed)
+    computer.update()
+    # TODO enable if required
+    # logger.debug(
+    #     "Files checksum for computer {} is updated to {}.",
+    #     computer.computer_name,
+    #     body.files_checksum,
+    # )
+
+    return (
+        dict(
+            status="success",
+            message="Writing files checksum to db",
+            files_checksum_digest=computer.files_checksum_digest,
+        ),
+        200,
+    )
+
+
 @downloads_info_blueprint.post("/files_checksum")
 @logger.catch
 def files_checksum(body: FilesChecksum):
@@ -330,24 +416,62 @@ def files_checksum(body: FilesChecksum):
     )
 
     if computer:
-        logger.info("Updating files checksum for computer: {}.", computer.computer_name)
-        computer.last_time_online = CFG.offset_to_est(datetime.datetime.utcnow(), True)
-        computer.files_checksum = json.dumps(body.files_checksum)
-        computer.update()
-        # TODO enable if required
-        # logger.debug(
-        #     "Files checksum for computer {} is updated to {}.",
-        #     computer.computer_name,
-        #     body.files_checksum,
-        # )
-
-        return jsonify(status="success", message="Writing files checksum to db"), 200
+        data, status_code = update_computer_files_checksum(computer, body)
+        return jsonify(data), status_code
 
     message = "Wrong request data. Computer not found."
     logger.info(f"Files checksum update failed. Reason: {message}")
     return jsonify(status="fail", message=message), 400
 
 
+@downloads_info_blueprint.get("/files_checksum")
+@logger.catch
+def get_computer_files_checksum(query: FilesChecksumQuery):
+    """Files checksum stored on the server. Agent requests it only
+    if its own root digest differs from files_checksum_digest
+    """
+    computer: Computer = Computer.query.filter_by(
+        identifier_key=query.identifier_key
+    ).first()
+
+    if not computer:
+        message = "Wrong request data. Computer not found."
+        logger.info(f"Files checksum request failed. Reason: {message}")
+        return jsonify(status="fail", message=message), 400
+
+    return (
+        jsonify(
+            status="success",
+            message="Supplying files checksum",
+            files_checksum=get_files_checksum(computer),
+            files_checksum_digest=computer.files_checksum_digest,
+        ),
+        200,
+    )
+
+
+def update_printer_info(computer: Computer, printer_info: PrinterInfoDict):
+    """Update computer printer name and status"""
+    print_status = PrinterStatus.UNKNOWN
+
+    # TODO: fill this match with gathered data from customers pc
+    match printer_info.PrinterStatus:
+        case 0:
+            print_status = PrinterStatus.NORMAL
+        case 128:
+            print_status = PrinterStatus.OFFLINE
+        case _:
+            print_status = PrinterStatus.UNKNOWN
+
+    computer.printer_name = printer_info.Name
+    computer.printer_status = print_status
+    computer.printer_status_timestamp = CFG.offset_to_est(
+        datetime.datetime.utcnow(), True
+    )
+
+    computer.update()
+
+
 @downloads_info_blueprint.post("/printer_info")
 @logger.catch
 def printer_info(body: PrinterInfo):
@@ -358,24 +482,7 @@ def printer_info(body: PrinterInfo):
     )
 
     if computer:
-        print_status = PrinterStatus.UNKNOWN
-
-        # TODO: fill this match with gathered data from customers pc
-        match body.printer_info.PrinterStatus:
-            case 0:
-                print_status = PrinterStatus.NORMAL
-            case 128:
-                print_status = PrinterStatus.OFFLINE
-            case _:
-                print_status = PrinterStatus.UNKNOWN
-
-        computer.printer_name = body.printer_info.Name
-        computer.printer_status = print_status
-        computer.printer_status_timestamp = CFG.offset_to_est(
-            datetime.datetime.utcnow(), True
-        )
-
-        computer.update()
+        update_printer_info(computer, body.printer_info)
 
         return (
             jsonify(
@@ -388,3 +495,57 @@ def printer_info(body: PrinterInfo):
         message = "Wrong request data. Computer not found."
         logger.info(f"Printer info update failed. Reason: {message}")
         return jsonify(status="fail", message=message), 400
+
+
+@downloads_info_blueprint.post("/agent_sync")
+@logger.catch
+def agent_sync(body: AgentSync):
+    """Heartbeat, printer info and status changes of the agent in one request.
+    Replaces /last_time + /get_telemetry_info + /printer_info calls of the heartbeat cycle
+    """
+    computer, computer_name = find_agent_computer(
+        body.identifier_key, body.computer_name
+    )
+
+    if computer:
+        record_heartbeat(computer, bool(body.last_download_time))
+
+        if body.printer_info:
+            update_printer_info(computer, body.printer_info)
+
+        if body.special_status:
+            update_special_status(computer, body.special_status)
+
+        if body.download_status:
+            update_download_status(computer, body.download_status)
+
+        telemetry_settings = get_telemetry_settings_for_computer(computer)
+
+        return (
+            jsonify(
+                status="success",
+                message="Agent data synced",
+                send_printer_info=telemetry_settings.send_printer_info,
+                **get_compstat_data(computer),
+            ),
+            200,
+        )
+
+    elif computer_name:
+        message = "Wrong id."
+        logger.info(
+            "Agent sync failed. computer: {}, id {}. Reason: {}",
+            body.computer_name,
+            body.identifier_key,
+            message,
+        )
+        return jsonify(status="fail", message=message), 400
+
+    message = "Wrong request data. Computer not found."
+    logger.info(
+        "Agent sync failed. computer: {}, id {}. Reason: {}. Removing local credentials.",
+        body.computer_name,
+        body.identifier_key,
+        message,
+    )
+    return jsonify(status="fail", message=message, rmcreds="rmcreds"), 400
@@ -1,64 +1,111 @@
 import io
 import os
-from flask import send_file, jsonify, Response, Blueprint
+from flask import request, send_file, jsonify, Response, Blueprint
 
 from app.views.blueprint import BlueprintApi
 from app.models import DesktopClient, Computer, LogType, Location
-from app.schema import LoadMSI, UpdateMSIVersion
-from app.controllers import create_log_event
+from app.schema import ComputerIdentity, LoadMSI, UpdateMSIVersion
+from app import db
+from app.controllers import (
+    create_log_event,
+    get_desktop_client_id,
+    get_computer_identity,
+    get_default_desktop_client_id,
+    get_msi_version,
+)
 
 from app.logger import logger
+from config import BaseConfig as CFG
 
 
-download_msi_blueprint = BlueprintApi("/download_msi", __name__)
+download_msi_blueprint = BlueprintApi(
+    "/download_msi", __name__, unit_of_work=True
+)
 download_msi_fblueprint = Blueprint("download_msi", __name__)
 # TODO split blueprints
 
 
+def send_msi(msi: DesktopClient, download_name: str, as_attachment: bool = False):
+    """Send MSI file from the blob store without reading it into memory.
+    Content hash is used as strong ETag, so GET requests support Range
+    (resumable downloads) and If-None-Match (304 Not Modified).
+    If CFG.MSI_X_ACCEL_REDIRECT_PREFIX is set - the file is served by nginx
+
+    Args:
+        msi (DesktopClient): desktop client
+        download_name (str): file name for Content-Disposition
+        as_attachment (bool, optional): Content-Disposition type. Defaults to False.
+
+    Returns:
+        Response: file response
+    """
+    if not msi.blob_sha256:
+        # NOTE file is not moved to the blob store yet
+        return send_file(
+            io.BytesIO(msi.blob),
+            download_name=download_name,
+            mimetype=msi.mimetype,
+            as_attachment=as_attachment,
+        )
+
+    if not CFG.MSI_X_ACCEL_REDIRECT_PREFIX:
+        return send_file(
+            msi.blob_path,
+            download_name=download_name,
+            mimetype=msi.mimetype,
+            as_attachment=as_attachment,
+            etag=msi.blob_sha256,
+            conditional=True,
+        )
+
+    if msi.blob_sha256 in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(msi.blob_sha256)
+        return response
+
+    response = Response(mimetype=msi.mimetype)
+    response.set_etag(msi.blob_sha256)
+    response.headers["X-Accel-Redirect"] = "{}/{}".format(
+        CFG.MSI_X_ACCEL_REDIRECT_PREFIX.rstrip("/"),
+        os.path.relpath(msi.blob_path, CFG.BLOB_STORE_DIR),
+    )
+    response.headers["Content-Disposition"] = "{}; filename={}".format(
+        "attachment" if as_attachment else "inline", download_name
+    )
+    return response
+
+
 @download_msi_fblueprint.route("/download/<int:id>", methods=["GET"])
 @logger.catch
 def download_msi(id):
     # TODO add guid, register to db, add to /download/23dc4cccccqd4443c
-    msi = DesktopClient.query.filter_by(id=id).first()
+    msi = db.session.get(DesktopClient, id)
 
     if msi:
-        return send_file(
-            io.BytesIO(msi.blob), download_name=msi.filename, mimetype=msi.mimetype
-        )
+        return send_msi(msi, msi.filename)
     else:
         return jsonify(status="fail", message="Wrong request data."), 400
 
 
-@download_msi_blueprint.post("/msi_download_to_local")
-@logger.catch
-def msi_download_to_local(body: LoadMSI):
-    computer: Computer = (
-        Computer.query.filter_by(identifier_key=body.identifier_key).first()
-        if body.identifier_key
-        else None
-    )
+def _msi_download_to_local(body: LoadMSI):
+    computer: ComputerIdentity | None = get_computer_identity(body.identifier_key)
 
     if computer:
-        msi: DesktopClient = (
-            DesktopClient.query.filter_by(flag_name=body.flag).first()
-            if body.flag == "stable" or body.flag == "latest"
-            else DesktopClient.query.filter_by(version=body.version).first()
+        msi_id = get_desktop_client_id(
+            body.flag if body.flag == "stable" or body.flag == "latest" else body.version
         )
+        msi: DesktopClient = db.session.get(DesktopClient, msi_id) if msi_id else None
 
         if msi:
             logger.info(
-                "Giving file {} to computer {}.", msi.name, computer.computer_name
-            )
-            return Response(
-                msi.blob,
-                mimetype=msi.mimetype,
-                headers={"Content-disposition": f"attachment; filename={msi.filename}"},
+                "Giving file {} to computer {}.", msi.name, body.identifier_key
             )
+            return send_msi(msi, msi.filename, as_attachment=True)
         else:
             message = "Wrong request data. Wrong or empty version."
             logger.info(
-                "MSI download failed. computer_name: {}. Reason: {}",
-                computer.computer_name,
+                "MSI download failed. identifier_key: {}. Reason: {}",
+                body.identifier_key,
                 message,
             )
             return jsonify(status="fail", message=message), 400
@@ -68,6 +115,19 @@ def msi_download_to_local(body: LoadMSI):
     return jsonify(status="fail", message=message), 400
 
 
+@download_msi_blueprint.post("/msi_download_to_local")
+@logger.catch
+def msi_download_to_local(body: LoadMSI):
+    return _msi_download_to_local(body)
+
+
+@download_msi_blueprint.get("/msi_download_to_local")
+@logger.catch
+def msi_download_to_local_resumable(query: LoadMSI):
+    """Same as POST /msi_download_to_local, but supports Range and If-None-Match"""
+    return _msi_download_to_local(query)
+
+
 @download_msi_blueprint.post("/update_current_msi_version")
 @logger.catch
 def update_current_msi_version(body: UpdateMSIVersion):
@@ -78,15 +138,10 @@ def update_current_msi_version(body: UpdateMSIVersion):
     )
 
     if computer:
-        msi: DesktopClient = (
-            DesktopClient.query.filter_by(flag_name=body.current_msi_version).first()
-            if body.current_msi_version == "stable"
-            or body.current_msi_version == "latest"
-            else DesktopClient.query.filter_by(version=body.current_msi_version).first()
+        current_msi_version = (
+            get_msi_version(body.current_msi_version) or "undefined"
         )
 
-        current_msi_version = msi.version if msi else "undefined"
-
         computer.current_msi_version = current_msi_version
         computer.update()
 
@@ -113,19 +168,14 @@ def update_current_msi_version(body: UpdateMSIVersion):
 @download_msi_fblueprint.route("/download_lid/<int:lid>", methods=["GET"])
 @logger.catch
 def download_lid_msi(lid: int):
-    msi = DesktopClient.query.filter_by(flag_name="stable").first()
+    msi_id = get_default_desktop_client_id()
+    msi = db.session.get(DesktopClient, msi_id) if msi_id else None
     if not msi:
-        msi = DesktopClient.query.filter_by(flag_name="latest").first()
-        if not msi:
-            msi = DesktopClient.query.first()
-            if not msi:
-                return jsonify(status="fail", message="No MSI found."), 400
+        return jsonify(status="fail", message="No MSI found."), 400
     location = Location.query.filter_by(id=lid).first()
-    base_filename, extension = os.path.splitext(msi.filename)
-    filename = f"{base_filename}_lid_{location.id}{extension}"
-    if msi and location:
-        return send_file(
-            io.BytesIO(msi.blob), download_name=filename, mimetype=msi.mimetype
-        )
+    if location:
+        base_filename, extension = os.path.splitext(msi.filename)
+        filename = f"{base_filename}_lid_{location.id}{extension}"
+        return send_msi(msi, filename)
     else:
         return jsonify(status="fail", message="Wrong request data."), 400
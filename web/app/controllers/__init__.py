@@ -1,5 +1,6 @@
 # ruff: noqa: F401
 from .alert import (
+    get_critical_alert_locations,
     send_critical_alert,
     send_primary_computer_alert,
     send_daily_summary,
@@ -21,13 +22,75 @@ from .pcc_api import (
     check_daily_requests_count,
     execute_pcc_request,
 )
-from .log_event import create_log_event, gen_fake_backup_download_logs
+from .heartbeat_buffer import (
+    buffer_heartbeat,
+    flush_heartbeats,
+    get_pending_heartbeat,
+    get_pending_heartbeats,
+    merge_pending_heartbeats,
+)
+from .agent_credentials import get_credentials_etag
+from .agent_schedule import get_agent_slots, record_agent_arrival, get_agent_arrivals
+from .admission import acquire_admission, release_admission, get_retry_after
+from .files_checksum import (
+    get_files_checksum,
+    get_files_checksum_digest,
+    update_files_checksum,
+)
+from .computer_identity import (
+    find_agent_computer,
+    get_computer_identity,
+    invalidate_computer_identity,
+)
+from .desktop_client_cache import (
+    get_desktop_client_id,
+    get_default_desktop_client_id,
+    get_msi_version,
+    invalidate_desktop_clients_cache,
+)
+from .log_event import (
+    create_log_event,
+    gen_fake_backup_download_logs,
+    bulk_insert_log_events,
+    drain_log_events_stream,
+    drain_log_events_lag,
+    get_log_events_stream_metrics,
+)
+from .computer_lock import lock_computer, get_computer_lock_metrics
+from .computer_status import (
+    evaluate_status,
+    load_computers_status,
+    detect_status_transitions,
+)
+from .availability import (
+    get_computer_availability,
+    get_est_hours,
+    get_availability_version,
+    rebuild_availability,
+)
+from .daily_uptime import get_last_week_uptime, load_last_week_uptime
+from .availability_chart import (
+    get_chart_days,
+    get_availability_chart,
+    get_availability_chart_etag,
+)
 from .backup_log import (
     gen_fake_backup_periods_logs,
     backup_log_on_download_success,
-    backup_log_on_request_to_view,
     backup_log_on_download_error,
     backup_log_on_download_error_with_message,
+    apply_backup_event,
+    on_backup_event,
+    replay_backup_logs,
+    recount_download_errors,
+    sweep_backup_logs,
+)
+from .dashboard import (
+    get_dashboard_scope,
+    count_dashboard_counters,
+    get_dashboard_counters,
+    update_dashboard_snapshots,
+    check_dashboard_snapshots,
 )
 from .pagination import create_pagination
 from .system_log import create_system_log
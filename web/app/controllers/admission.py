@@ -0,0 +1,130 @@
+import time
+import uuid
+import threading
+
+import redis
+
+from app.utils import get_redis
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+# Agent endpoint classes. Status-critical calls (heartbeats, credentials, download status)
+# have their own limit and are never rejected because of telemetry load,
+# telemetry calls are rejected first - they count critical calls in flight too
+CRITICAL = "critical"
+TELEMETRY = "telemetry"
+ENDPOINT_CLASSES = (CRITICAL, TELEMETRY)
+
+# Redis sorted sets with requests in flight: token -> start time
+IN_FLIGHT_KEY = "agent_admission:{}"
+
+_lock = threading.Lock()
+# In-process requests in flight (used when REDIS_URL is not configured): class -> tokens
+_local_in_flight: dict[str, set[str]] = {
+    endpoint_class: set() for endpoint_class in ENDPOINT_CLASSES
+}
+
+
+def get_admission_limit(endpoint_class: str) -> int:
+    """Max number of requests of the class in flight (0 - not limited)"""
+    return {
+        CRITICAL: CFG.AGENT_ADMISSION_CRITICAL_LIMIT,
+        TELEMETRY: CFG.AGENT_ADMISSION_TELEMETRY_LIMIT,
+    }[endpoint_class]
+
+
+def get_retry_after(endpoint_class: str) -> int:
+    """Retry-After (seconds) for the rejected requests of the class"""
+    return {
+        CRITICAL: CFG.AGENT_ADMISSION_CRITICAL_RETRY_AFTER,
+        TELEMETRY: CFG.AGENT_ADMISSION_TELEMETRY_RETRY_AFTER,
+    }[endpoint_class]
+
+
+def _get_counted_classes(endpoint_class: str) -> tuple[str, ...]:
+    return ENDPOINT_CLASSES if endpoint_class == TELEMETRY else (endpoint_class,)
+
+
+def acquire_admission(endpoint_class: str) -> str | None:
+    """Admit agent request if there is room for it.
+    Requests in flight are counted for all app workers (in Redis),
+    so the limits are shared by all of them
+
+    Args:
+        endpoint_class (str): CRITICAL or TELEMETRY
+
+    Returns:
+        str | None: token to release the admission with or None if request is rejected
+    """
+    limit = get_admission_limit(endpoint_class)
+    token = uuid.uuid4().hex
+    if not limit:
+        return token
+
+    counted_classes = _get_counted_classes(endpoint_class)
+
+    redis_client = get_redis()
+    if redis_client:
+        now = time.time()
+        key = IN_FLIGHT_KEY.format(endpoint_class)
+        try:
+            pipe = redis_client.pipeline()
+            # Requests of crashed workers are never released - they expire
+            for counted_class in counted_classes:
+                pipe.zremrangebyscore(
+                    IN_FLIGHT_KEY.format(counted_class),
+                    "-inf",
+                    now - CFG.AGENT_ADMISSION_REQUEST_TIMEOUT,
+                )
+            pipe.zadd(key, {token: now})
+            pipe.expire(key, CFG.AGENT_ADMISSION_REQUEST_TIMEOUT)
+            for counted_class in counted_classes:
+                pipe.zcard(IN_FLIGHT_KEY.format(counted_class))
+            # Results: trimmed, zadd, expire, then the counts of in-flight requests
+            counts_start = len(counted_classes) + 2
+            in_flight = sum(pipe.execute()[counts_start:])
+
+            if in_flight > limit:
+                redis_client.zrem(key, token)
+                return None
+
+        except redis.RedisError as err:
+            # Admission control must not take the api down
+            logger.warning("Agent request is admitted without check. Error: {}", err)
+
+        return token
+
+    with _lock:
+        in_flight = sum(
+            len(_local_in_flight[counted_class]) for counted_class in counted_classes
+        )
+        if in_flight >= limit:
+            return None
+
+        _local_in_flight[endpoint_class].add(token)
+
+    return token
+
+
+def release_admission(endpoint_class: str, token: str):
+    """Release admission of the finished request
+
+    Args:
+        endpoint_class (str): CRITICAL or TELEMETRY
+        token (str): token returned by acquire_admission
+    """
+    if not get_admission_limit(endpoint_class):
+        return
+
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            redis_client.zrem(IN_FLIGHT_KEY.format(endpoint_class), token)
+        except redis.RedisError as err:
+            logger.warning("Agent request admission is not released. Error: {}", err)
+        return
+
+    with _lock:
+        _local_in_flight[endpoint_class].discard(token)
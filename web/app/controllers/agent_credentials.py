@@ -0,0 +1,62 @@
+import hashlib
+
+from sqlalchemy import event, inspect
+
+from app.models import Computer
+from app.controllers.desktop_client_cache import get_msi_version
+from app.controllers.agent_schedule import get_agent_slots
+
+
+# Computer fields returned to the agent by get_credentials.
+# files_checksum_digest is not versioned: it changes after every files checksum upload
+# and agents get the current one from the files checksum endpoints
+CREDENTIALS_FIELDS = (
+    "computer_name",
+    "identifier_key",
+    "location_id",
+    "company_id",
+    "sftp_host",
+    "sftp_username",
+    "sftp_password",
+    "sftp_folder_path",
+    "folder_password",
+    "manager_host",
+    "msi_version",
+)
+
+
+@event.listens_for(Computer, "before_update")
+def _bump_credentials_version(mapper, connection, computer: Computer):
+    state = inspect(computer)
+    if any(state.attrs[field].history.has_changes() for field in CREDENTIALS_FIELDS):
+        computer.credentials_version = (computer.credentials_version or 0) + 1
+
+
+def get_credentials_etag(computer: Computer) -> str:
+    """ETag of the get_credentials response. Changes only when the supplied data changes:
+    computer credentials fields (credentials_version), location/company names,
+    location PCC backup usage, the resolved msi version or the agent slots
+
+    Args:
+        computer (Computer): computer
+
+    Returns:
+        str: ETag value (without quotes)
+    """
+    location = computer.location
+    company = computer.company
+
+    version_data = ":".join(
+        str(value)
+        for value in (
+            computer.id,
+            computer.credentials_version,
+            location.name if location else None,
+            location.use_pcc_backup if location else False,
+            company.name if company else None,
+            get_msi_version(computer.msi_version),
+            get_agent_slots(computer).download_slot,
+        )
+    )
+
+    return hashlib.sha1(version_data.encode()).hexdigest()
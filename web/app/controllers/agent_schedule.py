@@ -0,0 +1,127 @@
+import random
+import threading
+from datetime import datetime, timedelta
+
+from app.models import Computer
+from app.schema import AgentSlots
+from app.utils import get_redis
+
+from config import BaseConfig as CFG
+
+
+# Fractional part of the golden ratio. Multiples of it are spread evenly over [0, 1)
+# for any number of consecutive computer ids, new ids fill the largest gaps
+GOLDEN_RATIO_FRACTION = 0.6180339887498949
+
+# Redis hashes with agent requests arrivals per minute (one per hour): minute -> count
+ARRIVALS_KEY = "agent_arrivals:{}:{:%Y-%m-%dT%H}"
+ARRIVALS_KINDS = ("heartbeat", "credentials")
+
+_lock = threading.Lock()
+# In-process arrivals (used when REDIS_URL is not configured): hash key -> minute -> count
+_local_arrivals: dict[str, dict[int, int]] = {}
+
+
+def get_slot(computer_id: int, window: int) -> int:
+    """Stable offset (seconds) inside the window for the computer.
+
+    Offsets of consecutive ids are evenly spread over the window whatever the fleet size is,
+    so the slots of the existing computers don't move when the fleet grows.
+
+    Args:
+        computer_id (int): computer id
+        window (int): window length, seconds
+
+    Returns:
+        int: offset from the window start, seconds
+    """
+    return int((computer_id * GOLDEN_RATIO_FRACTION) % 1 * window)
+
+
+def get_agent_slots(computer: Computer) -> AgentSlots:
+    """Heartbeat and download slots of the computer agent.
+    Agent runs its scheduled tasks at the slot offset from the period start
+    instead of the top of the hour
+
+    Args:
+        computer (Computer): computer
+
+    Returns:
+        AgentSlots: slots, seconds from the period start
+    """
+    return AgentSlots(
+        heartbeat_slot=get_slot(computer.id, CFG.AGENT_HEARTBEAT_PERIOD),
+        download_slot=get_slot(computer.id, CFG.AGENT_DOWNLOAD_WINDOW),
+    )
+
+
+def record_agent_arrival(kind: str, now: datetime | None = None):
+    """Count agent request in the per minute arrivals histogram.
+    Only one of CFG.AGENT_ARRIVALS_SAMPLE_RATE requests is counted (with that weight)
+
+    Args:
+        kind (str): "heartbeat" or "credentials" (download task start)
+        now (datetime, optional): arrival time (UTC). Defaults to datetime.utcnow().
+    """
+    weight = CFG.AGENT_ARRIVALS_SAMPLE_RATE
+    if weight > 1 and random.randrange(weight):
+        return
+
+    now = now or datetime.utcnow()
+    key = ARRIVALS_KEY.format(kind, now)
+
+    redis_client = get_redis()
+    if redis_client:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hincrby(key, now.minute, weight)
+        pipe.expire(key, CFG.AGENT_ARRIVALS_HISTORY_HOURS * 3600)
+        pipe.execute()
+        return
+
+    with _lock:
+        if key not in _local_arrivals:
+            oldest = now - timedelta(hours=CFG.AGENT_ARRIVALS_HISTORY_HOURS)
+            for old_key in list(_local_arrivals):
+                if old_key.rsplit(":", 1)[1] < f"{oldest:%Y-%m-%dT%H}":
+                    del _local_arrivals[old_key]
+
+        minutes = _local_arrivals.setdefault(key, {})
+        minutes[now.minute] = minutes.get(now.minute, 0) + weight
+
+
+def get_agent_arrivals(
+    hours: int = 24, now: datetime | None = None
+) -> dict[str, list[int]]:
+    """Agent requests arrivals per minute of the hour for the last hours.
+    Flat histogram means agents follow their slots, peaks at minute 0 - they don't
+
+    Args:
+        hours (int, optional): history length (including the current hour). Defaults to 24.
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+
+    Returns:
+        dict[str, list[int]]: kind -> 60 counters (minute of the hour)
+    """
+    now = now or datetime.utcnow()
+    keys = [
+        (kind, ARRIVALS_KEY.format(kind, now - timedelta(hours=hour)))
+        for kind in ARRIVALS_KINDS
+        for hour in range(hours)
+    ]
+
+    redis_client = get_redis()
+    if redis_client:
+        pipe = redis_client.pipeline(transaction=False)
+        for _, key in keys:
+            pipe.hgetall(key)
+        hashes = pipe.execute()
+    else:
+        with _lock:
+            hashes = [dict(_local_arrivals.get(key, {})) for _, key in keys]
+
+    histogram = {kind: [0] * 60 for kind in ARRIVALS_KINDS}
+    for (kind, _), minutes in zip(keys, hashes):
+        for minute, count in minutes.items():
+            histogram[kind][int(minute)] += int(count)
+
+    return histogram
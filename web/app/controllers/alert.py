@@ -1,11 +1,15 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 
-from sqlalchemy import or_, and_
-from sqlalchemy.orm import Query
+from sqlalchemy import or_, and_, func, insert, select
+from sqlalchemy.orm import Query, selectinload
 from flask import render_template
 from flask_mail import Message
 
-from app import models as m, mail, schema as s
+from app import db, models as m, mail, schema as s
+from app.controllers.heartbeat_buffer import flush_heartbeats
+from app.controllers.daily_uptime import load_last_week_uptime
+from app.controllers.computer_status import load_computers_status
 from app.logger import logger
 
 from config import BaseConfig as CFG
@@ -28,6 +32,54 @@ def send_email(
     logger.info("Email with subject {} was successfully sent", subject)
 
 
+def get_critical_alert_locations(
+    current_east_time: datetime,
+) -> dict[int, datetime | None]:
+    """Offline locations to alert at this hour: active locations (except connected
+    to trial and deactivated companies) with activated computers and without backups
+    in the last 2 hours. One grouped query for the whole fleet
+
+    Args:
+        current_east_time (datetime): current EST time
+
+    Returns:
+        dict[int, datetime | None]: location id -> last backup time (EST)
+    """
+    last_backup_time = func.max(m.Computer.last_download_time)
+    rows = db.session.execute(
+        select(m.Location.id, last_backup_time)
+        .join(m.Company, m.Company.id == m.Location.company_id)
+        .join(
+            m.Computer,
+            and_(
+                m.Computer.location_id == m.Location.id,
+                m.Computer.activated.is_(True),
+                m.Computer.is_deleted.is_(False),
+            ),
+        )
+        .where(
+            m.Location.activated.is_(True),
+            m.Location.is_deleted.is_(False),
+            m.Company.is_trial.is_(False),
+            m.Company.activated.is_(True),
+        )
+        .group_by(m.Location.id)
+        .having(
+            or_(
+                last_backup_time.is_(None),
+                last_backup_time <= current_east_time - timedelta(hours=2),
+            )
+        )
+    )
+
+    # Alert only every 2 hours
+    return {
+        location_id: last_backup
+        for location_id, last_backup in rows
+        if not last_backup or (current_east_time - last_backup).seconds // 3600 % 2 == 0
+    }
+
+
 def send_critical_alert():
     """
     CLI command for celery worker.
@@ -40,65 +92,52 @@ def send_critical_alert():
         datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
-    # Select all the active locations (except connected to trial and deactivated companies)
+    # Write buffered heartbeats to db so the alerts use actual computers times
+    flush_heartbeats()
+
+    last_backup_times = get_critical_alert_locations(current_east_time)
+    if not last_backup_times:
+        logger.info("<---Finish sending critical alerts: no offline locations--->")
+        return
+
+    # Load only the offline locations, their computers and their companies users
     locations: list[m.Location] = (
-        m.Location.query.join(m.Company)
-        .filter(
-            m.Location.activated.is_(True),
-            m.Company.is_trial.is_(False),
-            m.Company.activated.is_(True),
-        )
+        m.Location.query.options(selectinload(m.Location.group))
+        .filter(m.Location.id.in_(last_backup_times))
+        .order_by(m.Location.id)
         .all()
     )
 
-    for location in locations:
-        location_computers_query: Query = m.Computer.query.filter(
-            m.Computer.location_id == location.id,
-            m.Computer.activated.is_(True),
-        )
-        with_prev_backups_comps = (
-            location_computers_query.filter(m.Computer.last_download_time.is_not(None))
-            .order_by(m.Computer.last_download_time.desc())
-            .all()
-        )
-
-        # Check that there are no computers connected to the location
-        # Or it has at least one computer that downloaded backup in last 2 hours
-        if not location_computers_query.all() or (
-            with_prev_backups_comps
-            and current_east_time - with_prev_backups_comps[0].last_download_time
-            < timedelta(hours=2)
-        ):
-            continue
+    location_computers: dict[int, list[m.Computer]] = defaultdict(list)
+    for computer in m.Computer.query.filter(
+        m.Computer.location_id.in_(last_backup_times),
+        m.Computer.activated.is_(True),
+    ).order_by(m.Computer.computer_name):
+        location_computers[computer.location_id].append(computer)
+
+    company_users: dict[int, list[m.User]] = defaultdict(list)
+    for user in m.User.query.options(
+        selectinload(m.User.company),
+        selectinload(m.User.location_group),
+        selectinload(m.User.location),
+    ).filter(
+        m.User.activated.is_(True),
+        m.User.company_id.in_({location.company_id for location in locations}),
+    ):
+        company_users[user.company_id].append(user)
 
-        # Alert only every 2 hours
-        if (
-            with_prev_backups_comps
-            and (
-                current_east_time - with_prev_backups_comps[0].last_download_time
-            ).seconds
-            // 3600
-            % 2
-            != 0
-        ):
-            continue
+    for location in locations:
+        last_backup_time = last_backup_times[location.id]
 
         # Select all the company active users
         connected_users: list[m.User] = []
-        all_company_users: list[m.User] = m.User.query.filter(
-            m.User.activated.is_(True),
-            m.User.company_id == location.company_id,
-        ).all()
-
-        for user in all_company_users:
+        for user in company_users[location.company_id]:
             # If user has company level permission
             if user.permission == m.UserPermissionLevel.COMPANY:
                 # Send to company level user only if location is offline more than 4 hours
                 if (
-                    with_prev_backups_comps
-                    and current_east_time
-                    - with_prev_backups_comps[0].last_download_time
-                    < timedelta(hours=4)
+                    last_backup_time
+                    and current_east_time - last_backup_time < timedelta(hours=4)
                 ):
                     continue
                 else:
@@ -124,25 +163,17 @@ def send_critical_alert():
 
         recipients = [user.email for user in connected_users]
 
-        primary_computers = (
-            location_computers_query.filter(
-                m.Computer.device_role == m.DeviceRole.PRIMARY
-            )
-            .order_by(m.Computer.computer_name)
-            .all()
-        )
-        alternate_computers = (
-            location_computers_query.filter(
-                m.Computer.device_role == m.DeviceRole.ALTERNATE
-            )
-            .order_by(m.Computer.computer_name)
-            .all()
-        )
-        last_backup_time = (
-            with_prev_backups_comps[0].last_download_time
-            if with_prev_backups_comps
-            else None
-        )
+        computers = location_computers[location.id]
+        primary_computers = [
+            computer
+            for computer in computers
+            if computer.device_role == m.DeviceRole.PRIMARY
+        ]
+        alternate_computers = [
+            computer
+            for computer in computers
+            if computer.device_role == m.DeviceRole.ALTERNATE
+        ]
 
         alert_html = render_template(
             "email/critical-alert-email.html",
@@ -160,11 +191,17 @@ def send_critical_alert():
                 html=alert_html,
             )
 
-            # Create record about new alert event
-            new_alert_event = m.AlertEvent(
-                location_id=location.id, alert_type=m.AlertEventType.CRITICAL_ALERT
-            )
-            new_alert_event.save()
+            # Record the alert event right after the email is sent, so it is not lost
+            # if the next location fails. Own transaction: the session is not committed,
+            # so the loaded users and computers are not expired
+            with db.engine.begin() as conn:
+                conn.execute(
+                    insert(m.AlertEvent.__table__),
+                    dict(
+                        location_id=location.id,
+                        alert_type=m.AlertEventType.CRITICAL_ALERT,
+                    ),
+                )
 
             logger.info("Critical alert email sent for location {}", location.name)
         except Exception as err:
@@ -189,6 +226,9 @@ def send_primary_computer_alert():
         datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
+    # Write buffered heartbeats to db so the alerts use actual computers times
+    flush_heartbeats()
+
     # Get all the active primary computers which downloaded last backup more than 2 hour ago
     # and not more than 3 hours ago
     all_primary_computers: list[m.Computer] = m.Computer.query.filter(
@@ -319,6 +359,9 @@ def divide_computers_by_location(
     """
     computers_by_location: dict[str, s.ComputersByLocation] = {}
 
+    # Statuses of all the computers with one current time
+    load_computers_status(computers)
+
     for computer in computers:
         if computer.location_id and computers_by_location.get(computer.location_name):
             computers_by_location_obj = computers_by_location[computer.location_name]
@@ -481,6 +524,9 @@ def send_daily_summary():
         datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
+    # Write buffered heartbeats to db so the summaries use actual computers times
+    flush_heartbeats()
+
     # Select all the companies except global, trial and deactivated
     companies: list[m.Company] = m.Company.query.filter(
         m.Company.is_global.is_(False),
@@ -507,10 +553,17 @@ def send_daily_summary():
             m.Computer.computer_name,
         )
 
+        offline_company_computers: list[
+            m.Computer
+        ] = offline_company_computers_query.all()
+
         # If there are no users connected to the company or offline computers - skip it
-        if not company.users or not offline_company_computers_query.all():
+        if not company.users or not offline_company_computers:
             continue
 
+        # Last week summaries of all the computers with one query
+        load_last_week_uptime(offline_company_computers)
+
         (
             company_level_users,
             location_group_level_users,
@@ -521,7 +574,7 @@ def send_daily_summary():
         # Create dictionary with locations as keys and list of computers as values
         computers_by_location: dict[
             str, s.ComputersByLocation
-        ] = divide_computers_by_location(offline_company_computers_query.all())
+        ] = divide_computers_by_location(offline_company_computers)
 
         # Send company level summary
         if company_level_users:
@@ -560,6 +613,9 @@ def send_weekly_summary():
         datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
     )
 
+    # Write buffered heartbeats to db so the summaries use actual computers times
+    flush_heartbeats()
+
     # Select all the companies except global and deactivated
     companies: list[m.Company] = m.Company.query.filter(
         m.Company.is_global.is_(False),
@@ -576,10 +632,16 @@ def send_weekly_summary():
             m.Computer.computer_name,
         )
 
+        company_computers: list[m.Computer] = company_computers_query.all()
+
         # If there are no users connected to the company or computers - skip it
-        if not company.users or not company_computers_query.all():
+        if not company.users or not company_computers:
             continue
 
+        # Last week summaries of all the computers with one query. Location group computers
+        # below are the same objects (session identity map), so they have them too
+        load_last_week_uptime(company_computers)
+
         (
             company_level_users,
             location_group_level_users,
@@ -589,7 +651,7 @@ def send_weekly_summary():
         # Create dictionary with locations as keys and list of computers as values
         company_computers_by_location: dict[
             str, s.ComputersByLocation
-        ] = divide_computers_by_location(company_computers_query.all())
+        ] = divide_computers_by_location(company_computers)
 
         # Send company level summary
         if company_level_users:
@@ -643,13 +705,15 @@ def send_weekly_summary():
                     m.Computer.computer_name,
                 )
 
-                if not users or not group_computers_query.all():
+                group_computers: list[m.Computer] = group_computers_query.all()
+
+                if not users or not group_computers:
                     continue
 
                 # Create dictionary with locations as keys and list of computers as values
                 group_computers_by_location: dict[
                     str, s.ComputersByLocation
-                ] = divide_computers_by_location(group_computers_query.all())
+                ] = divide_computers_by_location(group_computers)
 
                 try:
                     send_email(
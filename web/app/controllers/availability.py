@@ -0,0 +1,331 @@
+import threading
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, event, insert, select
+
+from app import db
+from app import models as m
+from app.controllers.computer_lock import lock_computer
+from app.controllers.daily_uptime import (
+    daily_uptime_values,
+    reset_daily_uptime,
+    save_daily_uptime,
+)
+from app.schema import Availability, BackupPeriod
+from app.utils import bulk_update, get_redis
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+COLORS = ("green", "yellow", "red")
+
+# Incremented on every committed change of the computer availability (chart data cache)
+VERSION_KEY = "computer_availability:version:{}"
+# Session info key with the changed computers ids
+_CHANGED_COMPUTERS = "availability_changed_computers"
+
+_local_versions: dict[int, int] = {}
+_local_lock = threading.Lock()
+
+ONE_HOUR = timedelta(hours=1)
+ONE_SECOND = timedelta(seconds=1)
+
+# (computer id, UTC day) -> [(hours mask, color (None - clear the hours), notes)]
+AvailabilityChanges = dict[tuple[int, date], list[tuple[int, str | None, str]]]
+
+
+def _hour(hour_time: datetime) -> datetime:
+    return hour_time.replace(minute=0, second=0, microsecond=0)
+
+
+def _color(period: BackupPeriod) -> str:
+    if not period.error:
+        return "green"
+    if period.error == m.BackupLogError.ONE_HOUR.value:
+        return "yellow"
+    return "red"
+
+
+def _day_masks(start_time: datetime, end_time: datetime) -> dict[date, int]:
+    """Hours from start_time to end_time (inclusive) as bitmaps of the days"""
+    masks = {}
+    hour = _hour(start_time)
+    while hour <= end_time:
+        last_hour = min(end_time, datetime.combine(hour.date(), time.max))
+        masks[hour.date()] = (1 << (last_hour.hour + 1)) - (1 << hour.hour)
+        hour = datetime.combine(hour.date() + timedelta(days=1), time())
+    return masks
+
+
+def _mark(
+    changes: AvailabilityChanges,
+    computer_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    color: str | None,
+    notes: str = "",
+):
+    for day, mask in _day_masks(start_time, end_time).items():
+        changes.setdefault((computer_id, day), []).append((mask, color, notes))
+
+
+def add_period_changes(
+    changes: AvailabilityChanges,
+    computer_id: int,
+    old_period: BackupPeriod | None,
+    new_period: BackupPeriod,
+):
+    """Add availability changes of the backup period to changes
+
+    Args:
+        changes (AvailabilityChanges): changes to save
+        computer_id (int): computer id
+        old_period (BackupPeriod | None): period before the update (None - new period)
+        new_period (BackupPeriod): period after the update
+    """
+    color = _color(new_period)
+    notes = new_period.notes if color != "green" else ""
+    start_time = new_period.start_time
+
+    if old_period:
+        if (
+            old_period.start_time == new_period.start_time
+            and old_period.end_time <= new_period.end_time
+            and _color(old_period) == color
+        ):
+            # Period is extended - only the new hours are marked
+            start_time = old_period.end_time + ONE_SECOND
+        else:
+            _mark(
+                changes,
+                computer_id,
+                old_period.start_time,
+                old_period.end_time,
+                None,
+            )
+
+    if start_time <= new_period.end_time:
+        _mark(changes, computer_id, start_time, new_period.end_time, color, notes)
+
+
+def _mark_changed(computer_ids: set[int]):
+    db.session.info.setdefault(_CHANGED_COMPUTERS, set()).update(computer_ids)
+
+
+@event.listens_for(db.session, "after_commit")
+def _on_commit(session):
+    # Versions are changed after commit, so the chart data of the old version
+    # can't be cached by other request from the data before the commit
+    computer_ids = session.info.pop(_CHANGED_COMPUTERS, None)
+    if not computer_ids:
+        return
+
+    redis_client = get_redis()
+    if redis_client:
+        pipe = redis_client.pipeline(transaction=False)
+        for computer_id in computer_ids:
+            pipe.incr(VERSION_KEY.format(computer_id))
+        pipe.execute()
+        return
+
+    with _local_lock:
+        for computer_id in computer_ids:
+            _local_versions[computer_id] = _local_versions.get(computer_id, 0) + 1
+
+
+@event.listens_for(db.session, "after_rollback")
+def _on_rollback(session):
+    session.info.pop(_CHANGED_COMPUTERS, None)
+
+
+def get_availability_version(computer_id: int) -> int:
+    """Version of the computer availability. Changes on every committed change
+
+    Args:
+        computer_id (int): computer id
+
+    Returns:
+        int: version
+    """
+    redis_client = get_redis()
+    if redis_client:
+        return int(redis_client.get(VERSION_KEY.format(computer_id)) or 0)
+
+    with _local_lock:
+        return _local_versions.get(computer_id, 0)
+
+
+def save_availability_changes(changes: AvailabilityChanges):
+    """Apply changes to the availability days (without commit).
+    Computers must be locked by the caller, same as for their backup logs changes
+
+    Args:
+        changes (AvailabilityChanges): changes to save
+    """
+    if not changes:
+        return
+
+    _mark_changed({computer_id for computer_id, _ in changes})
+    table = m.ComputerAvailability.__table__
+    rows = {
+        (row.computer_id, row.day): row
+        for row in db.session.execute(
+            select(table).where(
+                table.c.computer_id.in_({computer_id for computer_id, _ in changes}),
+                table.c.day.in_({day for _, day in changes}),
+            )
+        )
+    }
+
+    updated_rows = []
+    new_rows = []
+    uptime_rows = {}
+    for (computer_id, day), day_changes in changes.items():
+        row = rows.get((computer_id, day))
+        values = dict(
+            green=row.green if row else 0,
+            yellow=row.yellow if row else 0,
+            red=row.red if row else 0,
+            notes=(row.notes or "") if row else "",
+        )
+        for mask, color, notes in day_changes:
+            for clear_color in COLORS:
+                values[clear_color] &= ~mask
+            if color:
+                values[color] |= mask
+            if notes:
+                values["notes"] = notes
+
+        if row:
+            updated_rows.append(dict(values, availability_id=row.id))
+        else:
+            new_rows.append(dict(values, computer_id=computer_id, day=day))
+        uptime_rows[(computer_id, day)] = daily_uptime_values(
+            day, values["green"], values["yellow"], values["red"]
+        )
+
+    bulk_update(table, updated_rows, "availability_id")
+    if new_rows:
+        db.session.execute(insert(table), new_rows)
+    save_daily_uptime(uptime_rows)
+
+
+def rebuild_availability(computer_id: int, since: datetime | None = None):
+    """Rebuild the computer availability days (and their daily uptime) from its backup logs
+    (without commit)
+
+    Args:
+        computer_id (int): computer id
+        since (datetime, optional): rebuild days since this time (UTC). Defaults to all days.
+    """
+    lock_computer(computer_id)
+    _mark_changed({computer_id})
+    availability_query = delete(m.ComputerAvailability).where(
+        m.ComputerAvailability.computer_id == computer_id
+    )
+    backup_logs_query = m.BackupLog.query.filter(m.BackupLog.computer_id == computer_id)
+    if since:
+        day_start = datetime.combine(since.date(), time())
+        availability_query = availability_query.where(
+            m.ComputerAvailability.day >= since.date()
+        )
+        backup_logs_query = backup_logs_query.filter(m.BackupLog.end_time >= day_start)
+
+    db.session.execute(availability_query.execution_options(synchronize_session=False))
+    reset_daily_uptime(computer_id, since.date() if since else None)
+
+    changes: AvailabilityChanges = {}
+    for backup_log in backup_logs_query.order_by(m.BackupLog.start_time):
+        period = BackupPeriod(
+            backup_log_type=backup_log.backup_log_type,
+            start_time=backup_log.start_time,
+            end_time=backup_log.end_time,
+            error=backup_log.error or "",
+            notes=backup_log.notes or "",
+        )
+        if since and period.start_time < day_start:
+            period.start_time = day_start
+        add_period_changes(changes, computer_id, None, period)
+
+    save_availability_changes(changes)
+
+    logger.debug(
+        "Availability of computer {} rebuilt: {} days", computer_id, len(changes)
+    )
+
+
+def get_computer_availability(
+    computer_id: int, start_time: datetime, end_time: datetime
+) -> Availability:
+    """Computer backup periods by hours from the availability days.
+    Reads one row per day whatever the number of backup logs
+
+    Args:
+        computer_id (int): computer id
+        start_time (datetime): UTC, from the start of this hour
+        end_time (datetime): UTC, to the end of this hour
+
+    Returns:
+        Availability: hours bitmaps
+    """
+    start_time = _hour(start_time)
+    hours = max((_hour(end_time) - start_time) // ONE_HOUR + 1, 0)
+    first_day = start_time.date()
+
+    green = yellow = red = 0
+    days_notes = {}
+    for row in db.session.execute(
+        select(m.ComputerAvailability).where(
+            m.ComputerAvailability.computer_id == computer_id,
+            m.ComputerAvailability.day >= first_day,
+            m.ComputerAvailability.day <= end_time.date(),
+        )
+    ).scalars():
+        shift = (row.day - first_day).days * 24
+        green |= row.green << shift
+        yellow |= row.yellow << shift
+        red |= row.red << shift
+        days_notes[row.day] = row.notes or ""
+
+    # Masks of the days -> masks of the hours since start_time
+    window = (1 << hours) - 1
+    offset = start_time.hour
+    end = offset + hours
+
+    return Availability(
+        start_time=start_time,
+        hours=hours,
+        green=green >> offset & window,
+        yellow=yellow >> offset & window,
+        red=red >> offset & window,
+        notes=[
+            days_notes.get(first_day + timedelta(days=day), "")
+            for day in range((end + 23) // 24)
+            for _ in range(24)
+        ][offset:end],
+    )
+
+
+def get_est_hours(start_time: datetime, hours: int) -> list[datetime]:
+    """Eastern time of the hours since start_time (chart labels)
+
+    Args:
+        start_time (datetime): UTC
+        hours (int): number of hours
+
+    Returns:
+        list[datetime]: EST datetimes
+    """
+    if not hours:
+        return []
+
+    est_start_time = CFG.offset_to_est(start_time, True)
+    est_end_time = CFG.offset_to_est(start_time + (hours - 1) * ONE_HOUR, True)
+    if est_end_time - est_start_time == (hours - 1) * ONE_HOUR:
+        return [est_start_time + hour * ONE_HOUR for hour in range(hours)]
+
+    # Daylight saving time changes in between
+    return [
+        CFG.offset_to_est(start_time + hour * ONE_HOUR, True) for hour in range(hours)
+    ]
@@ -0,0 +1,122 @@
+import hashlib
+from datetime import datetime, timedelta
+
+from app.controllers.availability import (
+    get_availability_version,
+    get_computer_availability,
+    get_est_hours,
+)
+from app.schema import AvailabilityChart
+from app.utils import cached_json
+
+from config import BaseConfig as CFG
+
+
+# Chart data of computer, range (days), hour and availability version
+CHART_KEY = "availability_chart:{}:{}:{:%Y%m%d%H}:{}"
+
+
+def get_chart_days(days: int | None) -> int:
+    """Chart range limited to 1 .. CFG.AVAILABILITY_CHART_MAX_DAYS days"""
+    return min(max(days or 1, 1), CFG.AVAILABILITY_CHART_MAX_DAYS)
+
+
+def _chart_key(computer_id: int, days: int, now: datetime) -> str:
+    return CHART_KEY.format(
+        computer_id, days, now, get_availability_version(computer_id)
+    )
+
+
+def get_availability_chart_etag(
+    computer_id: int, days: int, now: datetime | None = None
+) -> str:
+    """ETag of the chart data. Changes every hour and on every availability change
+
+    Args:
+        computer_id (int): computer id
+        days (int): chart range
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+
+    Returns:
+        str: ETag value (without quotes)
+    """
+    key = _chart_key(computer_id, days, now or datetime.utcnow())
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _bucket_values(mask: int, buckets: int, bucket_hours: int) -> list[float | None]:
+    bucket_mask = (1 << bucket_hours) - 1
+    values = []
+    for bucket in range(buckets):
+        hours = (mask >> bucket * bucket_hours & bucket_mask).bit_count()
+        values.append(round(hours / bucket_hours, 3) if hours else None)
+    return values
+
+
+def _build_chart(computer_id: int, days: int, now: datetime) -> AvailabilityChart:
+    availability = get_computer_availability(
+        computer_id, now - timedelta(days=days), now
+    )
+    if not availability.logged:
+        return AvailabilityChart(
+            labels=[],
+            bucket_hours=1,
+            green=[],
+            yellow=[],
+            red=[],
+            notes=[],
+            uptime=None,
+            offline_hours=0,
+            offline_periods=0,
+        )
+
+    bucket_hours = -(-availability.hours // CFG.AVAILABILITY_CHART_BUCKETS)
+    buckets = -(-availability.hours // bucket_hours)
+    labels = get_est_hours(availability.start_time, availability.hours)[::bucket_hours]
+
+    notes = []
+    bucket_mask = (1 << bucket_hours) - 1
+    for bucket in range(buckets):
+        offline = availability.offline >> bucket * bucket_hours & bucket_mask
+        # The lowest offline hour of the bucket
+        first_offline_hour = (offline & -offline).bit_length() - 1
+        notes.append(
+            availability.notes[bucket * bucket_hours + first_offline_hour]
+            if offline
+            else ""
+        )
+
+    return AvailabilityChart(
+        labels=[label.strftime("%Y-%m-%d %H:%M:%S") for label in labels],
+        bucket_hours=bucket_hours,
+        green=_bucket_values(availability.green, buckets, bucket_hours),
+        yellow=_bucket_values(availability.yellow, buckets, bucket_hours),
+        red=_bucket_values(availability.red, buckets, bucket_hours),
+        notes=notes,
+        uptime=availability.uptime,
+        offline_hours=availability.offline_hours,
+        offline_periods=availability.offline_periods,
+    )
+
+
+def get_availability_chart(
+    computer_id: int, days: int, now: datetime | None = None
+) -> AvailabilityChart:
+    """Computer info chart data of the last days (and the current hour).
+    Cached per computer, range and hour till the computer availability changes
+
+    Args:
+        computer_id (int): computer id
+        days (int): chart range
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+
+    Returns:
+        AvailabilityChart: chart data
+    """
+    now = now or datetime.utcnow()
+    data = cached_json(
+        _chart_key(computer_id, days, now),
+        CFG.AVAILABILITY_CHART_CACHE_TTL,
+        lambda: _build_chart(computer_id, days, now).json(),
+    )
+    return AvailabilityChart.parse_raw(data)
@@ -1,750 +1,776 @@
-import enum
 import random
+import zoneinfo
 from datetime import datetime, timedelta
 
+from sqlalchemy import and_, delete, func, insert, select
+
+from app import db
 from app import models as m
+from app.models.backup_log import BackupLogError
+from app.models.utils import commit_session
+from app.controllers.computer_lock import lock_computer, try_lock_computers
+from app.controllers.availability import (
+    AvailabilityChanges,
+    add_period_changes,
+    rebuild_availability,
+    save_availability_changes,
+)
+from app.controllers.daily_uptime import add_download_error, set_download_errors
+from app.controllers.log_event import drain_log_events_lag
+from app.schema import BackupEvent, BackupEventType, BackupPeriod
+from app.utils import bulk_update
 from app.logger import logger
 
+from config import BaseConfig as CFG
 
-class BackupLogError(enum.Enum):
-    ONE_HOUR = "Longer than 1 hour without a backup"
-    TWO_HOURS = "Longer than 2 hours without a backup"
 
+OFFLINE_NOTES = "Device is offline"
+DOWNLOAD_ERROR_NOTES = "Unsuccessful backup"
 
-def backup_log_on_download_success(
-    computer: m.Computer,
-    current_time: datetime = datetime.utcnow(),
-):
-    """Create or update backup log for computer
+ONE_SECOND = timedelta(seconds=1)
+# Periods are whole hours: [hour start, hour start + 59:59]
+HOUR_END = timedelta(minutes=59, seconds=59)
+# Sweep doesn't open NO_DOWNLOADS period while the download may still happen
+SWEEP_DELAY = timedelta(minutes=30, seconds=1)
 
-    Args:
-        computer (m.Computer): Computer object
-        current_time (datetime, optional): time when log should be updated or created.Should be in UTC not EST.
-        Defaults to datetime.utcnow().
-    """
-    last_computer_log = (
-        m.BackupLog.query.filter_by(computer_id=computer.id)
-        .order_by(m.BackupLog.start_time.desc(), m.BackupLog.end_time.desc())
-        .first()
+# Log events replayed into backup periods
+REPLAYED_LOG_TYPES = (m.LogType.BACKUP_DOWNLOAD, m.LogType.CLIENT_ERROR)
+
+
+def _hour(time: datetime) -> datetime:
+    return time.replace(minute=0, second=0, microsecond=0)
+
+
+def _with_error(period: BackupPeriod) -> BackupPeriod:
+    """Set NO_DOWNLOADS period error by its duration"""
+    period.error = (
+        BackupLogError.TWO_HOURS.value
+        if period.end_time - period.start_time > HOUR_END
+        else BackupLogError.ONE_HOUR.value
     )
+    return period
 
-    # Remove minutes, seconds and microseconds from current time
-    rounded_current_time = current_time.replace(minute=0, second=0, microsecond=0)
 
-    # If there is no backup log for this computer - create the first one
-    if not last_computer_log:
-        new_with_downloads_log = m.BackupLog(
-            backup_log_type=m.BackupLogType.WITH_DOWNLOADS_PERIOD,
-            start_time=rounded_current_time,
-            end_time=rounded_current_time + timedelta(hours=1) - timedelta(seconds=1),
-            computer_id=computer.id,
+def _no_downloads(start_time: datetime, end_time: datetime, notes: str) -> BackupPeriod:
+    return _with_error(
+        BackupPeriod(
+            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
+            start_time=start_time,
+            end_time=end_time,
+            notes=notes,
         )
-        new_with_downloads_log.save()
-        logger.debug(
-            "Log on_download 1: Created first backup log (successful) for computer {}",
-            computer.computer_name,
+    )
+
+
+def _no_downloads_gap(
+    start_time: datetime,
+    end_time: datetime,
+    logs_enabled_at: datetime | None,
+    logs_disabled_at: datetime | None,
+    notes: str,
+) -> list[BackupPeriod]:
+    """NO_DOWNLOADS periods for [start_time, end_time] except the time logs were disabled"""
+    if not logs_enabled_at or logs_enabled_at <= start_time:
+        return [_no_downloads(start_time, end_time, notes)]
+
+    periods = []
+    # Before logs were disabled
+    disabled_from = _hour(logs_disabled_at) if logs_disabled_at else start_time
+    if disabled_from > start_time:
+        periods.append(
+            _no_downloads(
+                start_time, min(disabled_from - ONE_SECOND, end_time), OFFLINE_NOTES
+            )
         )
-    else:
-        # If the last backup log has type WITH_DOWNLOADS_PERIOD
-        if last_computer_log.backup_log_type == m.BackupLogType.WITH_DOWNLOADS_PERIOD:
-            # If the last backup log end time is less than 1 hour ago - update it
-            if last_computer_log.end_time + timedelta(hours=1) > rounded_current_time:
-                last_computer_log.end_time = (
-                    rounded_current_time + timedelta(hours=1) - timedelta(seconds=1)
-                )
-                last_computer_log.update()
+    # After logs were enabled
+    enabled_from = _hour(logs_enabled_at)
+    if enabled_from < end_time:
+        periods.append(_no_downloads(enabled_from, end_time, notes))
+
+    return periods
+
+
+def _close_no_downloads(
+    last_period: BackupPeriod,
+    end_time: datetime,
+    logs_enabled_at: datetime | None,
+    logs_disabled_at: datetime | None,
+    notes: str | None = None,
+) -> tuple[BackupPeriod, list[BackupPeriod]]:
+    """Move the last NO_DOWNLOADS period end to end_time.
+    If logs were disabled after the period - it ends when logs were disabled
+    and new period starts when they were enabled
+    """
+    period = last_period.copy()
+
+    if not logs_enabled_at or logs_enabled_at <= last_period.end_time:
+        period.end_time = end_time
+        period.notes = notes or period.notes
+        return _with_error(period), []
+
+    disabled_from = _hour(logs_disabled_at) if logs_disabled_at else end_time
+    if disabled_from > period.start_time:
+        period.end_time = disabled_from - ONE_SECOND
+
+    enabled_from = _hour(logs_enabled_at)
+    if enabled_from > end_time:
+        return _with_error(period), []
+
+    return _with_error(period), [
+        _no_downloads(enabled_from, end_time, notes or OFFLINE_NOTES)
+    ]
+
+
+def apply_backup_event(
+    last_period: BackupPeriod | None,
+    logs_enabled_at: datetime | None,
+    logs_disabled_at: datetime | None,
+    event: BackupEvent,
+    previous_period: BackupPeriod | None = None,
+) -> tuple[BackupPeriod | None, list[BackupPeriod]]:
+    """Backup periods state machine. Pure function: doesn't query or change the db,
+    so the same code handles live agent requests and replays of the log events
+
+    Periods are whole hours. Successful download opens (or extends) WITH_DOWNLOADS period
+    and closes NO_DOWNLOADS one. Download error and sweep (time passed without downloads)
+    open (or extend) NO_DOWNLOADS period. Time when logs were disabled is not covered by any period.
+    Download after an error of the same hour merges the hour into the previous WITH_DOWNLOADS
+    period: the returned period is the extended previous one and the last period is dropped
+    (see is_merged)
 
-                logger.debug(
-                    "Log on_download 2: Updated WITH_DOWNLOADS_LOG log for computer {}. Log ID: {}",
-                    computer.computer_name,
-                    last_computer_log.id,
-                )
-            # If the last backup log end time is more than 1 hour ago
-            # Create new backup log\logs with type NO_DOWNLOADS_PERIOD (if logs were enabled)
-            # and then WITH_DOWNLOADS_PERIOD
-            else:
-                # If all the time logs were enabled - computer was offline in that time
-                if (
-                    computer.last_time_logs_enabled
-                    <= last_computer_log.end_time + timedelta(seconds=1)
-                ):
-                    new_no_downloads_log = m.BackupLog(
-                        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                        start_time=last_computer_log.end_time + timedelta(seconds=1),
-                        end_time=rounded_current_time - timedelta(seconds=1),
-                        computer_id=computer.id,
-                        notes="Device is offline",
-                    )
-                    new_no_downloads_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if new_no_downloads_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                    new_no_downloads_log.save()
+    Args:
+        last_period (BackupPeriod | None): the last computer backup period
+        logs_enabled_at (datetime | None): computer.last_time_logs_enabled
+        logs_disabled_at (datetime | None): computer.last_time_logs_disabled
+        event (BackupEvent): event
+        previous_period (BackupPeriod | None, optional): the period before the last one.
+            Defaults to None (periods are not merged).
+
+    Returns:
+        tuple[BackupPeriod | None, list[BackupPeriod]]: updated last period (None if not changed)
+            and new periods ordered by start time
+    """
+    hour = _hour(event.time)
 
-                    logger.debug(
-                        "Log on_download 3: Created new NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                        computer.computer_name,
-                        new_no_downloads_log.id,
-                    )
+    if event.event_type == BackupEventType.DOWNLOAD_SUCCESS:
+        with_downloads = BackupPeriod(
+            backup_log_type=m.BackupLogType.WITH_DOWNLOADS_PERIOD,
+            start_time=hour,
+            end_time=hour + HOUR_END,
+        )
+
+        if not last_period:
+            return None, [with_downloads]
+
+        if last_period.backup_log_type == m.BackupLogType.WITH_DOWNLOADS_PERIOD:
+            # The same hour or the next one - extend the period
+            if last_period.end_time + timedelta(hours=1) > hour:
+                if last_period.end_time >= hour + HOUR_END:
+                    return None, []
+                return last_period.copy(update=dict(end_time=hour + HOUR_END)), []
+
+            # Computer was offline since the last download
+            return None, [
+                *_no_downloads_gap(
+                    last_period.end_time + ONE_SECOND,
+                    hour - ONE_SECOND,
+                    logs_enabled_at,
+                    logs_disabled_at,
+                    OFFLINE_NOTES,
+                ),
+                with_downloads,
+            ]
 
-                # If logs were disabled for some time and then enabled
-                elif (
-                    computer.last_time_logs_enabled
-                    > last_computer_log.end_time + timedelta(seconds=1)
-                    and computer.last_time_logs_enabled < rounded_current_time
+        # The last period is NO_DOWNLOADS
+        if not logs_enabled_at or logs_enabled_at <= last_period.end_time:
+            if last_period.start_time >= hour:
+                if (
+                    previous_period
+                    and previous_period.backup_log_type
+                    == m.BackupLogType.WITH_DOWNLOADS_PERIOD
+                    and previous_period.end_time + ONE_SECOND == last_period.start_time
                 ):
-                    # Check if there should be one or two NO_DOWNLOADS_PERIOD logs because of enabled\disabled
-                    if computer.last_time_logs_disabled.replace(
-                        minute=0, second=0, microsecond=0
-                    ) == computer.last_time_logs_enabled.replace(
-                        minute=0, second=0, microsecond=0
-                    ):
-                        new_no_downloads_log = m.BackupLog(
-                            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                            start_time=computer.last_time_logs_enabled.replace(
-                                minute=0, second=0, microsecond=0
-                            ),
-                            end_time=rounded_current_time - timedelta(seconds=1),
-                            computer_id=computer.id,
-                            notes="Device is offline",
-                        )
-                        new_no_downloads_log.error = (
-                            BackupLogError.TWO_HOURS.value
-                            if new_no_downloads_log.duration
-                            > timedelta(minutes=59, seconds=59)
-                            else BackupLogError.ONE_HOUR.value
-                        )
-                        new_no_downloads_log.save()
+                    # Download error came before the download of the same hour
+                    return (
+                        previous_period.copy(update=dict(end_time=hour + HOUR_END)),
+                        [],
+                    )
 
-                        logger.debug(
-                            "Log on_download 4: Created new NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                            computer.computer_name,
-                            new_no_downloads_log.id,
+                # NO_DOWNLOADS period was opened in this hour (e.g. computer was just activated)
+                return (
+                    last_period.copy(
+                        update=dict(
+                            backup_log_type=m.BackupLogType.WITH_DOWNLOADS_PERIOD,
+                            end_time=hour + HOUR_END,
+                            error="",
+                            notes="",
                         )
-                    else:
-                        first_no_downloads_log = m.BackupLog(
-                            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                            start_time=last_computer_log.end_time
-                            + timedelta(seconds=1),
-                            end_time=computer.last_time_logs_disabled.replace(
-                                minute=0, second=0, microsecond=0
-                            )
-                            - timedelta(seconds=1),
-                            computer_id=computer.id,
-                            notes="Device is offline",
-                        )
-                        first_no_downloads_log.error = (
-                            BackupLogError.TWO_HOURS.value
-                            if first_no_downloads_log.duration
-                            > timedelta(minutes=59, seconds=59)
-                            else BackupLogError.ONE_HOUR.value
-                        )
-                        first_no_downloads_log.save()
-
-                        second_no_downloads_log = m.BackupLog(
-                            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                            start_time=computer.last_time_logs_enabled.replace(
-                                minute=0, second=0, microsecond=0
-                            ),
-                            end_time=rounded_current_time - timedelta(seconds=1),
-                            computer_id=computer.id,
-                            notes="Device is offline",
-                        )
-                        second_no_downloads_log.error = (
-                            BackupLogError.TWO_HOURS.value
-                            if second_no_downloads_log.duration
-                            > timedelta(minutes=59, seconds=59)
-                            else BackupLogError.ONE_HOUR.value
-                        )
-                        second_no_downloads_log.save()
-                        logger.debug(
-                            "Log on_download 5: Created two new NO_DOWNLOADS_PERIOD \
-                                log for computer {}. Logs IDs: {} and {}",
-                            computer.computer_name,
-                            first_no_downloads_log.id,
-                            second_no_downloads_log.id,
-                        )
-                else:
-                    # If logs were just enabled and there was no NO_DOWNLOADS_PERIOD
-                    pass
-
-                new_with_downloads_log = m.BackupLog(
-                    backup_log_type=m.BackupLogType.WITH_DOWNLOADS_PERIOD,
-                    start_time=rounded_current_time,
-                    end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-                    computer_id=computer.id,
+                    ),
+                    [],
                 )
-                new_with_downloads_log.save()
 
-                logger.debug(
-                    "Log on_download 6: Created new WITH_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                    computer.computer_name,
-                    new_with_downloads_log.id,
-                )
+        updated, new_periods = _close_no_downloads(
+            last_period, hour - ONE_SECOND, logs_enabled_at, logs_disabled_at
+        )
+        return updated, [*new_periods, with_downloads]
 
-        # If the last backup log has type NO_DOWNLOADS_PERIOD
-        elif last_computer_log.backup_log_type == m.BackupLogType.NO_DOWNLOADS_PERIOD:
-            # Set end time for the last backup log and create new backup log with type WITH_DOWNLOADS_PERIOD
+    if event.event_type == BackupEventType.DOWNLOAD_ERROR:
+        notes = event.message or DOWNLOAD_ERROR_NOTES
 
-            # If all the time logs were enabled - computer was offline in that time
+        if not last_period:
+            return None, [_no_downloads(hour, hour + HOUR_END, notes)]
 
-            if computer.last_time_logs_enabled <= last_computer_log.end_time:
-                if last_computer_log.start_time < rounded_current_time:
-                    last_computer_log.end_time = rounded_current_time - timedelta(
-                        seconds=1
-                    )
+        if last_period.backup_log_type == m.BackupLogType.WITH_DOWNLOADS_PERIOD:
+            # Backup was already downloaded in this hour
+            if last_period.end_time >= hour + HOUR_END:
+                return None, []
 
-                    # Update error field if necessary
-                    last_computer_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if last_computer_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                # When computer just was activated, user looked at the logs (NO_DOWLOADS log was created)
-                # And then computer downloaded backup in the same hour
-                else:
-                    last_computer_log.end_time = rounded_current_time + timedelta(
-                        minutes=59, seconds=59
-                    )
-                    last_computer_log.backup_log_type = (
-                        m.BackupLogType.WITH_DOWNLOADS_PERIOD
-                    )
-                    last_computer_log.error = ""
-                    last_computer_log.notes = ""
+            return None, _no_downloads_gap(
+                last_period.end_time + ONE_SECOND,
+                hour + HOUR_END,
+                logs_enabled_at,
+                logs_disabled_at,
+                notes,
+            )
 
-                last_computer_log.update()
+        # Errors are merged into the last NO_DOWNLOADS period
+        return _close_no_downloads(
+            last_period, hour + HOUR_END, logs_enabled_at, logs_disabled_at, notes
+        )
 
-                logger.debug(
-                    "Log on_download 7: Updated NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                    computer.computer_name,
-                    last_computer_log.id,
-                )
+    # BackupEventType.SWEEP
+    if not last_period:
+        start_time = _hour(logs_enabled_at) if logs_enabled_at else hour
+        return None, [_no_downloads(start_time, hour + HOUR_END, OFFLINE_NOTES)]
+
+    if last_period.backup_log_type == m.BackupLogType.WITH_DOWNLOADS_PERIOD:
+        if last_period.end_time + SWEEP_DELAY > event.time:
+            return None, []
+
+        return None, _no_downloads_gap(
+            last_period.end_time + ONE_SECOND,
+            hour + HOUR_END,
+            logs_enabled_at,
+            logs_disabled_at,
+            OFFLINE_NOTES,
+        )
 
-            # if logs were disabled after some time and then enabled
-            elif (
-                computer.last_time_logs_enabled > last_computer_log.end_time
-                and computer.last_time_logs_enabled < rounded_current_time
-            ):
-                last_computer_log.end_time = computer.last_time_logs_disabled.replace(
-                    minute=0, second=0, microsecond=0
-                ) - timedelta(seconds=1)
-
-                last_computer_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if last_computer_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                last_computer_log.update()
+    if last_period.end_time >= hour + HOUR_END and (
+        not logs_enabled_at or logs_enabled_at <= last_period.end_time
+    ):
+        return None, []
 
-                new_no_downloads_log = m.BackupLog(
-                    backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                    start_time=computer.last_time_logs_enabled.replace(
-                        minute=0, second=0, microsecond=0
-                    ),
-                    end_time=rounded_current_time - timedelta(seconds=1),
-                    computer_id=computer.id,
-                    notes="Device is offline",
-                )
-                new_no_downloads_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if new_no_downloads_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                new_no_downloads_log.save()
-
-                logger.debug(
-                    "Log on_download 8: Updated NO_DOWNLOADS_PERIOD and created \
-                        new NO_DOWNLOADS_PERIOD logs for computer {}. Logs IDs: {} and {}",
-                    computer.computer_name,
-                    last_computer_log.id,
-                    new_no_downloads_log.id,
-                )
+    return _close_no_downloads(
+        last_period, hour + HOUR_END, logs_enabled_at, logs_disabled_at
+    )
 
-            # if logs were just enabled
-            else:
-                last_computer_log.end_time = computer.last_time_logs_disabled.replace(
-                    minute=0, second=0, microsecond=0
-                ) - timedelta(seconds=1)
 
-                last_computer_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if last_computer_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                last_computer_log.update()
-                logger.debug(
-                    "Log on_download 9: Updated NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                    computer.computer_name,
-                    last_computer_log.id,
-                )
+def is_merged(
+    last_period: BackupPeriod | None, updated_period: BackupPeriod | None
+) -> bool:
+    """Updated period is the previous period the last one was merged into"""
+    return bool(
+        last_period
+        and updated_period
+        and updated_period.start_time < last_period.start_time
+    )
 
-            new_with_downloads_log = m.BackupLog(
-                backup_log_type=m.BackupLogType.WITH_DOWNLOADS_PERIOD,
-                start_time=rounded_current_time,
-                end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-                computer_id=computer.id,
-            )
-            new_with_downloads_log.save()
 
-            logger.debug(
-                "Log on_download 10: Created new WITH_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                computer.computer_name,
-                new_with_downloads_log.id,
+def replay_backup_events(
+    last_period: BackupPeriod | None,
+    logs_enabled_at: datetime | None,
+    logs_disabled_at: datetime | None,
+    events: list[BackupEvent],
+) -> tuple[BackupPeriod | None, list[BackupPeriod]]:
+    """Apply events (ordered by time) one by one in memory
+
+    Returns:
+        tuple[BackupPeriod | None, list[BackupPeriod]]: updated last period (None if not changed)
+            and new periods ordered by start time
+    """
+    updated_period = None
+    new_periods: list[BackupPeriod] = []
+
+    for event in events:
+        current_period = (
+            new_periods[-1] if new_periods else updated_period or last_period
+        )
+        # The last kept period is not merged with the one before it
+        previous_period = None
+        if new_periods:
+            previous_period = (
+                new_periods[-2]
+                if len(new_periods) > 1
+                else updated_period or last_period
             )
+        changed_period, created_periods = apply_backup_event(
+            current_period, logs_enabled_at, logs_disabled_at, event, previous_period
+        )
 
+        if is_merged(current_period, changed_period):
+            new_periods.pop()
+        if changed_period and new_periods:
+            new_periods[-1] = changed_period
+        elif changed_period:
+            updated_period = changed_period
+        new_periods.extend(created_periods)
 
-def gen_fake_backup_periods_logs(computer: m.Computer, time_period: timedelta):
-    """Generate fake logs about periods with and without backups downloads for computer
+    return updated_period, new_periods
+
+
+def _get_last_periods(computer_id: int) -> list[m.BackupLog]:
+    """The last and the previous backup logs of the computer (the last one first)"""
+    return (
+        m.BackupLog.query.filter_by(computer_id=computer_id)
+        .order_by(m.BackupLog.start_time.desc(), m.BackupLog.end_time.desc())
+        .limit(2)
+        .all()
+    )
+
+
+def _to_period(backup_log: m.BackupLog) -> BackupPeriod:
+    return BackupPeriod(
+        id=backup_log.id,
+        backup_log_type=backup_log.backup_log_type,
+        start_time=backup_log.start_time,
+        end_time=backup_log.end_time,
+        error=backup_log.error or "",
+        notes=backup_log.notes or "",
+    )
+
+
+def _to_row(computer_id: int, period: BackupPeriod) -> dict:
+    return dict(period.dict(exclude={"id"}), computer_id=computer_id)
+
+
+def _update_backup_log(backup_log: m.BackupLog, period: BackupPeriod):
+    for field, value in period.dict(exclude={"id"}).items():
+        setattr(backup_log, field, value)
+
+
+def on_backup_event(computer: m.Computer, event: BackupEvent):
+    """Apply event to the last computer backup period and save changes
 
     Args:
         computer (m.Computer): Computer object
-        time_period (timedelta): Time period for logs
+        event (BackupEvent): event
     """
-    # Set up list of working hours
-    WORKING_HOURS = tuple(range(8, 13)) + tuple(range(14, 23))
-
-    # Check if there are any logs exist for this computer
-    current_logs = m.BackupLog.query.filter_by(computer_id=computer.id).all()
-    if current_logs:
-        logger.info("Backup logs already exist for computer {}", computer)
+    # Concurrent requests of the computer would read the same last period
+    lock_computer(computer.id)
+    last_logs = _get_last_periods(computer.id)
+    last_log = last_logs[0] if last_logs else None
+    previous_log = last_logs[1] if len(last_logs) > 1 else None
+    last_period = _to_period(last_log) if last_log else None
+    previous_period = _to_period(previous_log) if previous_log else None
+
+    is_download_error = event.event_type == BackupEventType.DOWNLOAD_ERROR
+    if is_download_error:
+        add_download_error(computer.id, event.time)
+
+    updated_period, new_periods = apply_backup_event(
+        last_period,
+        computer.last_time_logs_enabled,
+        computer.last_time_logs_disabled,
+        event,
+        previous_period,
+    )
+    if not updated_period and not new_periods:
+        if is_download_error:
+            commit_session()
         return
 
-    log_time = (datetime.utcnow() - time_period).replace(
-        minute=0, second=0, microsecond=0
+    changes: AvailabilityChanges = {}
+    if is_merged(last_period, updated_period):
+        db.session.delete(last_log)
+        last_log, last_period = previous_log, previous_period
+    if updated_period:
+        _update_backup_log(last_log, updated_period)
+        add_period_changes(changes, computer.id, last_period, updated_period)
+    for period in new_periods:
+        add_period_changes(changes, computer.id, None, period)
+    db.session.add_all(
+        m.BackupLog(**_to_row(computer.id, period)) for period in new_periods
     )
+    save_availability_changes(changes)
+    commit_session()
 
-    for hour in range(time_period.days * 24 + time_period.seconds // 3600):
-        random_number = random.randint(1, 10)
-        random_waiting = timedelta(minutes=random.randint(0, 30))
-        if log_time.hour in WORKING_HOURS and random_number != 10:
-            backup_log_on_download_success(computer, log_time + random_waiting)
+    logger.debug(
+        "Backup log on {}: {} updated, {} created for computer {}",
+        event.event_type.value,
+        int(bool(updated_period)),
+        len(new_periods),
+        computer.computer_name,
+    )
 
-        log_time += timedelta(hours=1)
 
-    logger.info(
-        "<-----Fake backup periods logs were generated for computer {}----->",
+def backup_log_on_download_success(
+    computer: m.Computer,
+    current_time: datetime | None = None,
+):
+    """Create or update backup log for computer
+
+    Args:
+        computer (m.Computer): Computer object
+        current_time (datetime, optional): time when log should be updated or created.Should be in UTC not EST.
+        Defaults to datetime.utcnow().
+    """
+    on_backup_event(
         computer,
+        BackupEvent(
+            event_type=BackupEventType.DOWNLOAD_SUCCESS,
+            time=current_time or datetime.utcnow(),
+        ),
     )
 
 
-def backup_log_on_request_to_view(computer: m.Computer):
-    """Create or update the last computer backup log on request to view.
+def backup_log_on_download_error(computer: m.Computer):
+    """Create or update the last computer backup log on downloading error.
 
     Args:
         computer (m.Computer): Computer object
     """
-    last_computer_log = (
-        m.BackupLog.query.filter_by(computer_id=computer.id)
-        .order_by(m.BackupLog.start_time.desc())
-        .first()
+    on_backup_event(
+        computer,
+        BackupEvent(event_type=BackupEventType.DOWNLOAD_ERROR, time=datetime.utcnow()),
     )
 
-    # Current time in UTC
-    current_time = datetime.utcnow()
 
-    # Current time in UTC rounded to hours
-    rounded_current_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+def backup_log_on_download_error_with_message(computer: m.Computer, message: str):
+    """Create or update the last computer backup log on downloading error.
+    Error message is kept in the backup log notes
 
-    # If there is no backup logs for this computer but computer activated - create new one with type NO_DOWNLOADS_PERIOD
-    if not last_computer_log:
-        # If not activated - do nothing
-        if not computer.activated:
-            logger.debug(
-                "Log on_request 1: pass backup period logs creation: computer {} not activated",
-                computer.computer_name,
-            )
-            return
+    Args:
+        computer (m.Computer): Computer object
+        message (str): download error message
+    """
+    on_backup_event(
+        computer,
+        BackupEvent(
+            event_type=BackupEventType.DOWNLOAD_ERROR,
+            time=datetime.utcnow(),
+            message=message[:128],
+        ),
+    )
 
-        new_no_downloads_log = m.BackupLog(
-            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-            start_time=computer.last_time_logs_enabled.replace(
-                minute=0, second=0, microsecond=0
-            ),
-            end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-            computer_id=computer.id,
-            notes="Device is offline",
-        )
-        new_no_downloads_log.error = (
-            BackupLogError.TWO_HOURS.value
-            if new_no_downloads_log.duration > timedelta(minutes=59, seconds=59)
-            else BackupLogError.ONE_HOUR.value
+
+def _est_to_utc(time: datetime) -> datetime:
+    return (
+        time.replace(tzinfo=zoneinfo.ZoneInfo("America/New_York"))
+        .astimezone(zoneinfo.ZoneInfo("UTC"))
+        .replace(tzinfo=None)
+    )
+
+
+def _to_backup_event(log_event: m.LogEvent) -> BackupEvent:
+    # Agent log events are created with EST time, backup periods are in UTC
+    if log_event.log_type == m.LogType.BACKUP_DOWNLOAD:
+        return BackupEvent(
+            event_type=BackupEventType.DOWNLOAD_SUCCESS,
+            time=_est_to_utc(log_event.created_at),
         )
-        new_no_downloads_log.save()
-        logger.debug(
-            "Log on_request 2: Created first backup log (unsuccessful) for computer {}",
-            computer.computer_name,
+
+    return BackupEvent(
+        event_type=BackupEventType.DOWNLOAD_ERROR,
+        time=_est_to_utc(log_event.created_at),
+        message=log_event.data or "",
+    )
+
+
+def recount_download_errors(computer_id: int, since: datetime | None = None):
+    """Count computer download errors of the days from its log events (backfill, without commit)
+
+    Args:
+        computer_id (int): computer id
+        since (datetime, optional): count errors of the days since this time (UTC).
+            Defaults to all days.
+    """
+    query = m.LogEvent.query.with_entities(m.LogEvent.created_at).filter(
+        m.LogEvent.computer_id == computer_id,
+        m.LogEvent.log_type == m.LogType.CLIENT_ERROR,
+    )
+    since_day = since.date() if since else None
+    if since_day:
+        query = query.filter(
+            m.LogEvent.created_at
+            >= CFG.offset_to_est(datetime.combine(since_day, datetime.min.time()), True)
         )
 
-        return
+    errors: dict = {}
+    for (created_at,) in query:
+        day = _est_to_utc(created_at).date()
+        errors[day] = errors.get(day, 0) + 1
 
-    # If the last backup log has type WITH_DOWNLOADS_PERIOD
-    if last_computer_log.backup_log_type == m.BackupLogType.WITH_DOWNLOADS_PERIOD:
-        # If the last backup log end time + 30 minutes and 1 second is bigger than current time - ignore it
-        if last_computer_log.end_time + timedelta(minutes=30, seconds=1) > current_time:
-            return
-
-        # If the last backup log end time + 30 minutes and 1 second is less than current_time
-        # Create new backup log with type NO_DOWNLOADS_PERIOD
-        else:
-            # If logs were enabled all the time
-            if computer.last_time_logs_enabled <= last_computer_log.end_time:
-                new_no_downloads_log = m.BackupLog(
-                    backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                    start_time=last_computer_log.end_time + timedelta(seconds=1),
-                    end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-                    computer_id=computer.id,
-                    notes="Device is offline",
-                )
+    set_download_errors(computer_id, errors, since_day)
 
-                new_no_downloads_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if new_no_downloads_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                new_no_downloads_log.save()
 
-                logger.debug(
-                    "Log on_request 3: Created new NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                    computer.computer_name,
-                    new_no_downloads_log.id,
-                )
-            # If logs were disabled for some time and then enabled
-            elif computer.last_time_logs_enabled > last_computer_log.end_time:
-                # If logs were disabled just after the creation of the last backup log
-                if computer.last_time_logs_disabled.replace(
-                    minute=0, second=0, microsecond=0
-                ) == last_computer_log.end_time + timedelta(seconds=1):
-                    new_no_downloads_log = m.BackupLog(
-                        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                        start_time=computer.last_time_logs_enabled.replace(
-                            minute=0, second=0, microsecond=0
-                        ),
-                        end_time=rounded_current_time
-                        + timedelta(minutes=59, seconds=59),
-                        computer_id=computer.id,
-                        notes="Device is offline",
-                    )
+def replay_backup_logs(
+    computer: m.Computer,
+    since: datetime | None = None,
+    now: datetime | None = None,
+) -> int:
+    """Rebuild computer backup logs from its log events (backfills and repairs).
+    Events are replayed in memory and the backup logs are written in one transaction.
+    Backup logs started before the replayed period are kept.
+    Log events waiting in the stream are inserted first, so the replay sees the same events
+    as the live backup logs updates
 
-                    new_no_downloads_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if new_no_downloads_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                    new_no_downloads_log.save()
-                    logger.debug(
-                        "Log on_request 4: Created new NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                        computer.computer_name,
-                        new_no_downloads_log.id,
-                    )
-                # In all other cases there should be two NO_DOWNLOADS_PERIOD logs (before disabled and after enabled)
-                else:
-                    first_no_downloads_log = m.BackupLog(
-                        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                        start_time=last_computer_log.end_time + timedelta(seconds=1),
-                        end_time=computer.last_time_logs_disabled.replace(
-                            minute=0, second=0, microsecond=0
-                        )
-                        - timedelta(seconds=1),
-                        computer_id=computer.id,
-                        notes="Device is offline",
-                    )
+    Args:
+        computer (m.Computer): Computer object
+        since (datetime, optional): replay events since this time (UTC).
+            Defaults to the first log event.
+        now (datetime, optional): backup logs are brought up to this time (UTC), same as
+            the sweep does. Defaults to datetime.utcnow().
 
-                    first_no_downloads_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if first_no_downloads_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                    first_no_downloads_log.save()
-
-                    second_no_downloads_log = m.BackupLog(
-                        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                        start_time=computer.last_time_logs_enabled.replace(
-                            minute=0, second=0, microsecond=0
-                        ),
-                        end_time=rounded_current_time
-                        + timedelta(minutes=59, seconds=59),
-                        computer_id=computer.id,
-                        notes="Device is offline",
-                    )
+    Returns:
+        int: number of written backup logs
 
-                    second_no_downloads_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if second_no_downloads_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                    second_no_downloads_log.save()
-
-                    logger.debug(
-                        "Log on_request 5: Created two new \
-                            NO_DOWNLOADS_PERIOD logs for computer {}. Logs IDs: {} and {}",
-                        computer.computer_name,
-                        first_no_downloads_log.id,
-                        second_no_downloads_log.id,
-                    )
+    Raises:
+        LogEventsLagError: log events stream can't be drained
+    """
+    drain_log_events_lag()
 
-    # If the last backup log has type NO_DOWNLOADS_PERIOD
-    elif last_computer_log.backup_log_type == m.BackupLogType.NO_DOWNLOADS_PERIOD:
-        # Update the end time for the last backup log if logs were enabled all the time
-        if computer.last_time_logs_enabled < last_computer_log.end_time:
-            last_computer_log.end_time = rounded_current_time + timedelta(
-                minutes=59, seconds=59
+    query = m.LogEvent.query.filter(
+        m.LogEvent.computer_id == computer.id,
+        m.LogEvent.log_type.in_(REPLAYED_LOG_TYPES),
+    )
+    if since:
+        query = query.filter(m.LogEvent.created_at >= CFG.offset_to_est(since, True))
+
+    events = [
+        _to_backup_event(log_event)
+        for log_event in query.order_by(m.LogEvent.created_at, m.LogEvent.id)
+    ]
+    if not events:
+        return 0
+
+    replay_from = _hour(since or events[0].time)
+    lock_computer(computer.id)
+    if computer.activated and computer.logs_enabled:
+        events.append(
+            BackupEvent(
+                event_type=BackupEventType.SWEEP,
+                time=now or datetime.utcnow(),
             )
+        )
 
-            # Update error field if necessary
-            last_computer_log.error = (
-                BackupLogError.TWO_HOURS.value
-                if last_computer_log.duration > timedelta(minutes=59, seconds=59)
-                else BackupLogError.ONE_HOUR.value
-            )
+    db.session.execute(
+        delete(m.BackupLog)
+        .where(
+            m.BackupLog.computer_id == computer.id,
+            m.BackupLog.start_time >= replay_from,
+        )
+        .execution_options(synchronize_session=False)
+    )
 
-            last_computer_log.update()
+    # The last kept backup log is rebuilt from the replayed period start
+    last_log = (
+        m.BackupLog.query.filter(
+            m.BackupLog.computer_id == computer.id,
+            m.BackupLog.start_time < replay_from,
+        )
+        .order_by(m.BackupLog.start_time.desc(), m.BackupLog.end_time.desc())
+        .first()
+    )
+    last_period = None
+    if last_log:
+        last_period = _to_period(last_log)
+        if last_period.end_time >= replay_from:
+            last_period.end_time = replay_from - ONE_SECOND
+            if last_period.backup_log_type == m.BackupLogType.NO_DOWNLOADS_PERIOD:
+                _with_error(last_period)
+
+    updated_period, new_periods = replay_backup_events(
+        last_period,
+        computer.last_time_logs_enabled,
+        computer.last_time_logs_disabled,
+        events,
+    )
 
-            logger.debug(
-                "Log on_request 6: Updated NO_DOWNLOADS_PERIOD log for computer {}. Log IDs: {}",
-                computer.computer_name,
-                last_computer_log.id,
-            )
+    if last_log:
+        _update_backup_log(last_log, updated_period or last_period)
+    if new_periods:
+        db.session.execute(
+            insert(m.BackupLog.__table__),
+            [_to_row(computer.id, period) for period in new_periods],
+        )
+    rebuild_availability(computer.id, replay_from)
+    recount_download_errors(computer.id, replay_from)
+    db.session.commit()
 
-        # If logs were disabled for some time and now they are enabled
-        elif computer.last_time_logs_enabled > last_computer_log.end_time:
-            last_computer_log.end_time = computer.last_time_logs_disabled.replace(
-                minute=0, second=0, microsecond=0
-            ) - timedelta(seconds=1)
-
-            # Update error field if necessary
-            last_computer_log.error = (
-                BackupLogError.TWO_HOURS.value
-                if last_computer_log.duration > timedelta(minutes=59, seconds=59)
-                else BackupLogError.ONE_HOUR.value
-            )
-            last_computer_log.update()
+    logger.info(
+        "Backup logs of computer {} replayed since {}: {} events, {} backup logs created",
+        computer.computer_name,
+        replay_from,
+        len(events),
+        len(new_periods),
+    )
 
-            new_no_downloads_log = m.BackupLog(
-                backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                start_time=computer.last_time_logs_enabled.replace(
-                    minute=0, second=0, microsecond=0
-                ),
-                end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-                computer_id=computer.id,
-                notes="Device is offline",
-            )
+    return len(new_periods) + int(bool(updated_period))
 
-            new_no_downloads_log.error = (
-                BackupLogError.TWO_HOURS.value
-                if new_no_downloads_log.duration > timedelta(minutes=59, seconds=59)
-                else BackupLogError.ONE_HOUR.value
-            )
-            new_no_downloads_log.save()
 
-            logger.debug(
-                "Log on_request 7: updated and created NO_DOWNLOADS_PERIOD logs for computer {}. Logs IDss: {} and {}",
-                computer.computer_name,
-                last_computer_log.id,
-                new_no_downloads_log.id,
+def _sweep_batch(computers: list, now: datetime) -> tuple[int, int]:
+    locked_ids = set(try_lock_computers([computer.id for computer in computers]))
+
+    # The last backup log of every computer in the batch
+    last_start_times = (
+        select(
+            m.BackupLog.computer_id,
+            func.max(m.BackupLog.start_time).label("start_time"),
+        )
+        .where(m.BackupLog.computer_id.in_(locked_ids))
+        .group_by(m.BackupLog.computer_id)
+        .subquery()
+    )
+    last_logs: dict[int, m.BackupLog] = {}
+    for backup_log in db.session.execute(
+        select(m.BackupLog).join(
+            last_start_times,
+            and_(
+                m.BackupLog.computer_id == last_start_times.c.computer_id,
+                m.BackupLog.start_time == last_start_times.c.start_time,
+            ),
+        )
+    ).scalars():
+        last_log = last_logs.get(backup_log.computer_id)
+        if not last_log or last_log.end_time < backup_log.end_time:
+            last_logs[backup_log.computer_id] = backup_log
+
+    sweep = BackupEvent(event_type=BackupEventType.SWEEP, time=now)
+    updated_rows = []
+    new_rows = []
+    changes: AvailabilityChanges = {}
+    for computer in computers:
+        if computer.id not in locked_ids:
+            continue
+        last_log = last_logs.get(computer.id)
+        # Not activated computer without backup logs - nothing to show
+        if not last_log and not computer.activated:
+            continue
+
+        last_period = _to_period(last_log) if last_log else None
+        updated_period, new_periods = apply_backup_event(
+            last_period,
+            computer.last_time_logs_enabled,
+            computer.last_time_logs_disabled,
+            sweep,
+        )
+        if updated_period:
+            updated_rows.append(
+                dict(
+                    updated_period.dict(exclude={"id"}),
+                    backup_log_id=last_log.id,
+                )
             )
+            add_period_changes(changes, computer.id, last_period, updated_period)
+        for period in new_periods:
+            new_rows.append(_to_row(computer.id, period))
+            add_period_changes(changes, computer.id, None, period)
 
+    bulk_update(m.BackupLog.__table__, updated_rows, "backup_log_id")
+    if new_rows:
+        db.session.execute(insert(m.BackupLog.__table__), new_rows)
+    save_availability_changes(changes)
 
-def backup_log_on_download_error(computer: m.Computer):
-    """Create or update the last computer backup log on downloading error.
+    # Releases the computers locks
+    db.session.commit()
+
+    return len(updated_rows) + len(new_rows), len(computers) - len(locked_ids)
+
+
+def sweep_backup_logs(now: datetime | None = None) -> int:
+    """Bring backup logs of all computers with enabled logs up to now: extend open NO_DOWNLOADS
+    periods and open new ones for computers without downloads (offline).
+    Computers are handled in batches with a few statements per batch. Computers locked by agent
+    requests at the moment are skipped - they get a backup event anyway or are swept next time
 
     Args:
-        computer (m.Computer): Computer object
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+
+    Returns:
+        int: number of updated and created backup logs
     """
-    last_computer_log = (
-        m.BackupLog.query.filter_by(computer_id=computer.id)
-        .order_by(m.BackupLog.start_time.desc())
-        .first()
+    now = now or datetime.utcnow()
+    total_changed = 0
+    total_skipped = 0
+    last_computer_id = 0
+
+    while True:
+        computers = db.session.execute(
+            select(
+                m.Computer.id,
+                m.Computer.activated,
+                m.Computer.last_time_logs_enabled,
+                m.Computer.last_time_logs_disabled,
+            )
+            .where(
+                m.Computer.id > last_computer_id,
+                m.Computer.logs_enabled.is_(True),
+                m.Computer.is_deleted.is_(False),
+            )
+            .order_by(m.Computer.id)
+            .limit(CFG.BACKUP_LOGS_SWEEP_BATCH_SIZE)
+        ).all()
+        if not computers:
+            break
+
+        changed, skipped = _sweep_batch(computers, now)
+        total_changed += changed
+        total_skipped += skipped
+        last_computer_id = computers[-1].id
+
+    logger.info(
+        "Backup logs swept: [{}] updated or created, [{}] busy computers skipped",
+        total_changed,
+        total_skipped,
     )
 
-    # Current time in UTC rounded to hours
-    rounded_current_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    return total_changed
 
-    # If there is no backup log for this computer - create new one with type NO_DOWNLOADS_PERIOD
-    if not last_computer_log:
-        new_no_downloads_log = m.BackupLog(
-            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-            start_time=rounded_current_time,
-            end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-            computer_id=computer.id,
-            error=BackupLogError.ONE_HOUR.value,
-            notes="Unsuccessful backup",
-        )
-        new_no_downloads_log.save()
-        logger.debug(
-            "Log on_download_error 1: Created first backup log (unsuccessful) for computer {}",
-            computer.computer_name,
-        )
 
-    else:
-        # If the last backup log has type WITH_DOWNLOADS_PERIOD
-        if last_computer_log.backup_log_type == m.BackupLogType.WITH_DOWNLOADS_PERIOD:
-            # Create new backup log with type NO_DOWNLOADS_PERIOD
-
-            # Check the logs were enabled all the time
-            if computer.last_time_logs_enabled <= last_computer_log.end_time:
-                new_no_downloads_log = m.BackupLog(
-                    backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                    start_time=last_computer_log.end_time + timedelta(seconds=1),
-                    end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-                    computer_id=computer.id,
-                    notes="Unsuccessful backup",
-                )
-                new_no_downloads_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if new_no_downloads_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                new_no_downloads_log.save()
-                logger.debug(
-                    "Log on_download_error 2: Created new NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                    computer.computer_name,
-                    new_no_downloads_log.id,
-                )
-            # If logs were disabled for some time and then enabled
-            elif computer.last_time_logs_enabled > last_computer_log.end_time:
-                # If logs were disabled just after the creation of the last backup log
-                if computer.last_time_logs_disabled.replace(
-                    minute=0, second=0, microsecond=0
-                ) == last_computer_log.end_time + timedelta(seconds=1):
-                    new_no_downloads_log = m.BackupLog(
-                        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                        start_time=computer.last_time_logs_enabled.replace(
-                            minute=0, second=0, microsecond=0
-                        ),
-                        end_time=rounded_current_time
-                        + timedelta(minutes=59, seconds=59),
-                        computer_id=computer.id,
-                        notes="Unsuccessful backup",
-                    )
-                    new_no_downloads_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if new_no_downloads_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                    new_no_downloads_log.save()
-                    logger.debug(
-                        "Log on_download_error 3: Created new NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                        computer.computer_name,
-                        new_no_downloads_log.id,
-                    )
-                # In all other cases there should be two NO_DOWNLOADS_PERIOD logs (before disabled and after enabled)
-                else:
-                    first_no_downloads_log = m.BackupLog(
-                        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                        start_time=last_computer_log.end_time + timedelta(seconds=1),
-                        end_time=computer.last_time_logs_disabled.replace(
-                            minute=0, second=0, microsecond=0
-                        )
-                        - timedelta(seconds=1),
-                        computer_id=computer.id,
-                        notes="Device is offline",
-                    )
-                    first_no_downloads_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if first_no_downloads_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                    first_no_downloads_log.save()
-
-                    second_no_downloads_log = m.BackupLog(
-                        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                        start_time=computer.last_time_logs_enabled.replace(
-                            minute=0, second=0, microsecond=0
-                        ),
-                        end_time=rounded_current_time
-                        + timedelta(minutes=59, seconds=59),
-                        computer_id=computer.id,
-                        notes="Unsuccessful backup",
-                    )
-                    second_no_downloads_log.error = (
-                        BackupLogError.TWO_HOURS.value
-                        if second_no_downloads_log.duration
-                        > timedelta(minutes=59, seconds=59)
-                        else BackupLogError.ONE_HOUR.value
-                    )
-                    second_no_downloads_log.save()
-                    logger.debug(
-                        "Log on_download_error 4: Created 2 new \
-                            NO_DOWNLOADS_PERIOD logs for computer {}. Logs IDs: {} and {}",
-                        computer.computer_name,
-                        first_no_downloads_log.id,
-                        second_no_downloads_log.id,
-                    )
+def gen_fake_backup_periods_logs(computer: m.Computer, time_period: timedelta):
+    """Generate fake logs about periods with and without backups downloads for computer
 
-        # If the last backup log has type NO_DOWNLOADS_PERIOD - update it
-        elif last_computer_log.backup_log_type == m.BackupLogType.NO_DOWNLOADS_PERIOD:
-            if computer.last_time_logs_enabled < last_computer_log.end_time:
-                last_computer_log.end_time = (
-                    rounded_current_time + timedelta(hours=1) - timedelta(seconds=1)
-                )
-                last_computer_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if last_computer_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                last_computer_log.notes = "Unsuccessful backup"
-                last_computer_log.update()
-                logger.debug(
-                    "Log on_download_error 5: updated NO_DOWNLOADS_PERIOD log for computer {}. Log ID: {}",
-                    computer.computer_name,
-                    last_computer_log.id,
-                )
-            else:
-                last_computer_log.end_time = computer.last_time_logs_disabled.replace(
-                    minute=0, second=0, microsecond=0
-                ) - timedelta(seconds=1)
-                last_computer_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if last_computer_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                last_computer_log.update()
+    Args:
+        computer (m.Computer): Computer object
+        time_period (timedelta): Time period for logs
+    """
+    # Set up list of working hours
+    WORKING_HOURS = tuple(range(8, 13)) + tuple(range(14, 23))
 
-                new_no_downloads_log = m.BackupLog(
-                    backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-                    start_time=computer.last_time_logs_enabled.replace(
-                        minute=0, second=0, microsecond=0
-                    ),
-                    end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-                    computer_id=computer.id,
-                    notes="Unsuccessful backup",
-                )
-                new_no_downloads_log.error = (
-                    BackupLogError.TWO_HOURS.value
-                    if new_no_downloads_log.duration > timedelta(minutes=59, seconds=59)
-                    else BackupLogError.ONE_HOUR.value
-                )
-                new_no_downloads_log.save()
-                logger.debug(
-                    "Log on_download_error 6: updated and created new \
-                        NO_DOWNLOADS_PERIOD logs for computer {}. Logs IDs: {} and {}",
-                    computer.computer_name,
-                    last_computer_log.id,
-                    new_no_downloads_log.id,
+    # Check if there are any logs exist for this computer
+    current_logs = m.BackupLog.query.filter_by(computer_id=computer.id).all()
+    if current_logs:
+        logger.info("Backup logs already exist for computer {}", computer)
+        return
+
+    log_time = _hour(datetime.utcnow() - time_period)
+    events = []
+
+    for hour in range(time_period.days * 24 + time_period.seconds // 3600):
+        random_number = random.randint(1, 10)
+        random_waiting = timedelta(minutes=random.randint(0, 30))
+        if log_time.hour in WORKING_HOURS and random_number != 10:
+            events.append(
+                BackupEvent(
+                    event_type=BackupEventType.DOWNLOAD_SUCCESS,
+                    time=log_time + random_waiting,
                 )
+            )
 
+        log_time += timedelta(hours=1)
 
-def backup_log_on_download_error_with_message(computer: m.Computer, message: str):
-    # Current time in UTC rounded to hours
-    rounded_current_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
-    new_no_downloads_log = m.BackupLog(
-        backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
-        start_time=rounded_current_time,
-        end_time=rounded_current_time + timedelta(minutes=59, seconds=59),
-        computer_id=computer.id,
-        error=BackupLogError.ONE_HOUR.value,
-        notes=message,
+    _, periods = replay_backup_events(
+        None, computer.last_time_logs_enabled, computer.last_time_logs_disabled, events
     )
-    new_no_downloads_log.save()
-    logger.debug(
-        "Log on_download_error 1: Created first backup log (unsuccessful) for computer {}",
-        computer.computer_name,
+    if periods:
+        db.session.execute(
+            insert(m.BackupLog.__table__),
+            [_to_row(computer.id, period) for period in periods],
+        )
+        rebuild_availability(computer.id)
+        db.session.commit()
+
+    logger.info(
+        "<-----Fake backup periods logs were generated for computer {}----->",
+        computer,
     )
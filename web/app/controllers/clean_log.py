@@ -24,6 +24,14 @@ def clean_old_logs():
     )
     old_computer_logs_amount = len(old_computer_logs_query.all())
     old_computer_logs_query.delete()
+    db.session.query(m.ComputerAvailability).filter(
+        m.ComputerAvailability.day
+        < (datetime.utcnow() - timedelta(days=CFG.COMPUTER_LOGS_DELETION_PERIOD)).date()
+    ).delete()
+    db.session.query(m.ComputerDailyUptime).filter(
+        m.ComputerDailyUptime.day
+        < (datetime.utcnow() - timedelta(days=CFG.COMPUTER_LOGS_DELETION_PERIOD)).date()
+    ).delete()
 
     # Clean old log events
     old_log_events_query = db.session.query(m.LogEvent).filter(
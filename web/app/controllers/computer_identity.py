@@ -0,0 +1,133 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Computer
+from app.schema import ComputerIdentity
+from app.utils import cached_json, delete_cached
+
+from config import BaseConfig as CFG
+
+
+IDENTITY_KEY = "computer_identity:{}"
+
+# Computer fields cached in the identity. Changing any of them invalidates the cache
+IDENTITY_FIELDS = (
+    "identifier_key",
+    "is_deleted",
+    "activated",
+    "logs_enabled",
+    "location_id",
+    "msi_version",
+)
+
+
+def _to_identity(computer: Computer) -> ComputerIdentity:
+    return ComputerIdentity(
+        computer_id=computer.id,
+        activated=computer.activated,
+        logs_enabled=computer.logs_enabled,
+        location_id=computer.location_id,
+        msi_version=computer.msi_version,
+    )
+
+
+def invalidate_computer_identity(*identifier_keys: str):
+    """Remove cached identities. Called on computer changes and deletes"""
+    delete_cached(*[IDENTITY_KEY.format(key) for key in identifier_keys if key])
+
+
+def get_computer_identity(identifier_key: str | None) -> ComputerIdentity | None:
+    """Resolve agent identifier_key to computer id and flags.
+    Uses short-TTL cache, so repeated agent calls don't query the database
+
+    Args:
+        identifier_key (str | None): computer identifier key
+
+    Returns:
+        ComputerIdentity | None: identity or None if there is no such (not deleted) computer
+    """
+    if not identifier_key:
+        return None
+
+    def build() -> str | None:
+        computer = Computer.query.filter_by(identifier_key=identifier_key).first()
+        return _to_identity(computer).json() if computer else None
+
+    data = cached_json(
+        IDENTITY_KEY.format(identifier_key), CFG.COMPUTER_IDENTITY_CACHE_TTL, build
+    )
+    return ComputerIdentity.parse_raw(data) if data else None
+
+
+def find_agent_computer(
+    identifier_key: str | None, computer_name: str, match_name: bool = False
+) -> tuple[Computer | None, Computer | None]:
+    """Find computer by identifier_key and computer with such name.
+    Each lookup loads one row by its index: many agents share the same computer name or
+    identifier key (all unregistered agents send "new_computer").
+    The identity cache is not used: the agent endpoints need the computer object anyway
+
+    Args:
+        identifier_key (str | None): computer identifier key
+        computer_name (str): computer name
+        match_name (bool, optional): computer must match both identifier_key and name.
+            Defaults to False.
+
+    Returns:
+        tuple[Computer | None, Computer | None]: computer by identifier_key, computer by name
+    """
+    computer: Computer | None = None
+    if identifier_key:
+        query = Computer.query.filter_by(identifier_key=identifier_key)
+        if match_name:
+            query = query.filter_by(computer_name=computer_name)
+        computer = query.first()
+
+    if computer and computer.computer_name == computer_name:
+        return computer, computer
+
+    computer_by_name: Computer | None = Computer.query.filter_by(
+        computer_name=computer_name
+    ).first()
+
+    return computer, computer_by_name
+
+
+def _changed_identifier_keys(computer: Computer) -> list[str]:
+    state = inspect(computer)
+    if not any(state.attrs[field].history.has_changes() for field in IDENTITY_FIELDS):
+        return []
+
+    # Old identifier_key must be invalidated too if it was changed
+    history = state.attrs.identifier_key.history
+    return [computer.identifier_key, *history.deleted]
+
+
+@event.listens_for(Computer, "after_update")
+def _on_computer_update(mapper, connection, computer: Computer):
+    keys = _changed_identifier_keys(computer)
+    if keys:
+        invalidate_computer_identity(*keys)
+        session = Session.object_session(computer)
+        if session:
+            session.info.setdefault("invalidated_identities", set()).update(keys)
+
+
+@event.listens_for(Computer, "after_delete")
+def _on_computer_delete(mapper, connection, computer: Computer):
+    invalidate_computer_identity(computer.identifier_key)
+
+
+@event.listens_for(db.session, "after_commit")
+def _on_commit(session):
+    # Invalidate once more after commit - identity could be cached by other request
+    # from the old data before the transaction was committed
+    keys = session.info.pop("invalidated_identities", None)
+    if keys:
+        invalidate_computer_identity(*keys)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _on_rollback(session):
+    session.info.pop("invalidated_identities", None)
@@ -0,0 +1,160 @@
+import time
+import threading
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app import db
+from app.utils import get_redis
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+# First key of the Postgres advisory locks taken for the computers (second one is computer id),
+# so they don't clash with other advisory locks
+COMPUTER_LOCK_NAMESPACE = 0x454D4152  # "EMAR"
+
+COMPUTER_LOCK_METRICS = "computer_lock:metrics"
+
+# In-process locks (databases without advisory locks, e.g. SQLite): computer id -> stripe
+_STRIPES_COUNT = 64
+_stripes = [threading.Lock() for _ in range(_STRIPES_COUNT)]
+# Session info key with stripes held till the end of the transaction
+_HELD_STRIPES = "computer_lock_stripes"
+
+_metrics_lock = threading.Lock()
+_local_metrics: dict[str, float] = {}
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _release_stripes(session: Session, transaction: SessionTransaction):
+    # Same as Postgres transaction level advisory lock - released on commit or rollback
+    if transaction.parent is not None:
+        return
+
+    for stripe in session.info.pop(_HELD_STRIPES, []):
+        stripe.release()
+
+
+def lock_computer(computer_id: int):
+    """Serialize changes of the computer data (e.g. backup logs) made by concurrent requests.
+    Lock is held till the end of the current transaction: on Postgres it is a transaction level
+    advisory lock, with other databases - in-process lock released on commit or rollback.
+    Taking the same lock again in the transaction is a no-op
+
+    Args:
+        computer_id (int): computer id
+    """
+    started_at = time.perf_counter()
+
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :computer_id)"),
+            dict(namespace=COMPUTER_LOCK_NAMESPACE, computer_id=computer_id),
+        )
+    else:
+        # Make sure the transaction is started - the lock is released when it ends
+        db.session.connection()
+        held_stripes = db.session.info.setdefault(_HELD_STRIPES, [])
+        stripe = _stripes[computer_id % _STRIPES_COUNT]
+        if stripe in held_stripes:
+            return
+        stripe.acquire()
+        held_stripes.append(stripe)
+
+    _record_lock_wait(computer_id, time.perf_counter() - started_at)
+
+
+def try_lock_computers(computer_ids: list[int]) -> list[int]:
+    """Take locks (see lock_computer) of the computers which are not locked by others
+    without waiting. Used by background jobs - busy computers are handled next time
+
+    Args:
+        computer_ids (list[int]): computers ids
+
+    Returns:
+        list[int]: ids of the locked computers
+    """
+    if not computer_ids:
+        return []
+
+    if db.engine.dialect.name == "postgresql":
+        rows = db.session.execute(
+            text(
+                "SELECT id, pg_try_advisory_xact_lock(:namespace, id) AS locked "
+                "FROM unnest(CAST(:computer_ids AS integer[])) AS id"
+            ),
+            dict(namespace=COMPUTER_LOCK_NAMESPACE, computer_ids=list(computer_ids)),
+        )
+        return [computer_id for computer_id, locked in rows if locked]
+
+    db.session.connection()
+    held_stripes = db.session.info.setdefault(_HELD_STRIPES, [])
+    locked_ids = []
+    for computer_id in computer_ids:
+        stripe = _stripes[computer_id % _STRIPES_COUNT]
+        if stripe not in held_stripes:
+            if not stripe.acquire(blocking=False):
+                continue
+            held_stripes.append(stripe)
+        locked_ids.append(computer_id)
+
+    return locked_ids
+
+
+def _record_lock_wait(computer_id: int, wait: float):
+    if wait > CFG.COMPUTER_LOCK_SLOW_WAIT:
+        logger.warning("Computer {} lock was awaited for {:.3f}s", computer_id, wait)
+
+    waited = int(wait > CFG.COMPUTER_LOCK_CONTENDED_WAIT)
+    slow = int(wait > CFG.COMPUTER_LOCK_SLOW_WAIT)
+
+    redis_client = get_redis()
+    if redis_client:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hincrby(COMPUTER_LOCK_METRICS, "acquired", 1)
+        pipe.hincrby(COMPUTER_LOCK_METRICS, "contended", waited)
+        pipe.hincrby(COMPUTER_LOCK_METRICS, "slow", slow)
+        pipe.hincrbyfloat(COMPUTER_LOCK_METRICS, "wait_seconds_total", wait)
+        pipe.execute()
+        return
+
+    with _metrics_lock:
+        _local_metrics["acquired"] = _local_metrics.get("acquired", 0) + 1
+        _local_metrics["contended"] = _local_metrics.get("contended", 0) + waited
+        _local_metrics["slow"] = _local_metrics.get("slow", 0) + slow
+        _local_metrics["wait_seconds_total"] = (
+            _local_metrics.get("wait_seconds_total", 0) + wait
+        )
+        _local_metrics["wait_seconds_max"] = max(
+            _local_metrics.get("wait_seconds_max", 0), wait
+        )
+
+
+def get_computer_lock_metrics() -> dict:
+    """Computer locks wait metrics
+
+    Returns:
+        dict: acquired (locks taken), contended (had to wait for another request),
+            slow (waited longer than CFG.COMPUTER_LOCK_SLOW_WAIT), wait_seconds_total
+            and wait_seconds_avg (wait_seconds_max - in-process metrics only)
+    """
+    redis_client = get_redis()
+    if redis_client:
+        metrics = redis_client.hgetall(COMPUTER_LOCK_METRICS)
+    else:
+        with _metrics_lock:
+            metrics = dict(_local_metrics)
+
+    metrics = {key: float(value) for key, value in metrics.items()}
+    for key in ("acquired", "contended", "slow"):
+        metrics[key] = int(metrics.get(key, 0))
+    metrics.setdefault("wait_seconds_total", 0.0)
+    metrics["wait_seconds_avg"] = (
+        metrics["wait_seconds_total"] / metrics["acquired"]
+        if metrics["acquired"]
+        else 0.0
+    )
+
+    return metrics
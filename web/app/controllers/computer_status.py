@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert, or_, select
+
+from app import db
+from app.models import Computer, ComputerStatus, LogEvent, LogType
+from app.controllers.heartbeat_buffer import flush_heartbeats, merge_pending_heartbeats
+from app.utils import bulk_update
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+# Same thresholds as Computer.status
+ONLINE_PERIOD = timedelta(hours=1, minutes=30)
+ONLINE_NO_BACKUP_PERIOD = timedelta(minutes=10)
+# Deadlines are always after the thresholds, so the status is changed when they are reached
+DEADLINE_DELAY = timedelta(seconds=1)
+
+STATUS_LOG_TYPES = {
+    ComputerStatus.ONLINE: LogType.STATUS_GREEN,
+    ComputerStatus.ONLINE_NO_BACKUP: LogType.STATUS_YELLOW,
+    ComputerStatus.OFFLINE_NO_BACKUP: LogType.STATUS_RED,
+}
+
+
+def evaluate_status(
+    activated: bool,
+    last_download_time: datetime | None,
+    last_time_online: datetime | None,
+    current_east_time: datetime,
+) -> tuple[ComputerStatus, datetime | None]:
+    """Computer status (same as Computer.status) and the time it changes by itself
+
+    Args:
+        activated (bool): computer is activated
+        last_download_time (datetime | None): EST
+        last_time_online (datetime | None): EST
+        current_east_time (datetime): current EST time
+
+    Returns:
+        tuple[ComputerStatus, datetime | None]: status and its deadline (EST).
+            None - only a heartbeat, download or activation can change the status
+    """
+    if not activated:
+        return ComputerStatus.NOT_ACTIVATED, None
+    if last_download_time and last_download_time >= current_east_time - ONLINE_PERIOD:
+        return (
+            ComputerStatus.ONLINE,
+            last_download_time + ONLINE_PERIOD + DEADLINE_DELAY,
+        )
+    if (
+        last_time_online
+        and last_time_online >= current_east_time - ONLINE_NO_BACKUP_PERIOD
+    ):
+        return (
+            ComputerStatus.ONLINE_NO_BACKUP,
+            last_time_online + ONLINE_NO_BACKUP_PERIOD + DEADLINE_DELAY,
+        )
+    return ComputerStatus.OFFLINE_NO_BACKUP, None
+
+
+@event.listens_for(Computer.activated, "set")
+@event.listens_for(Computer.last_download_time, "set")
+@event.listens_for(Computer.last_time_online, "set")
+def _on_status_times_set(computer: Computer, value, old_value, initiator):
+    computer._evaluated_status = None
+    if value == old_value:
+        return
+
+    # Newer times can only improve the status right away (a worse status comes with
+    # the status deadline), same as in flush_heartbeats
+    status = computer.current_status
+    if initiator.key == "activated" or status is None:
+        is_due = True
+    elif value is None or (
+        old_value is not None
+        and (not isinstance(old_value, datetime) or value < old_value)
+    ):
+        # Time is reset, moved back or its previous value is not loaded
+        is_due = True
+    elif initiator.key == "last_download_time":
+        is_due = status != ComputerStatus.ONLINE
+    else:
+        is_due = status == ComputerStatus.OFFLINE_NO_BACKUP
+
+    if is_due:
+        # Status of the computer is checked by the next detect_status_transitions()
+        computer.status_deadline = CFG.offset_to_est(datetime.utcnow(), True)
+
+
+def load_computers_status(
+    computers: list[Computer], now: datetime | None = None
+) -> dict[int, ComputerStatus]:
+    """Evaluate statuses of all the computers from their loaded attributes with one
+    current time (no queries, buffered heartbeats are merged with one Redis round trip),
+    so Computer.status of the listed computers is consistent
+
+    Args:
+        computers (list[Computer]): computers
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+
+    Returns:
+        dict[int, ComputerStatus]: computer id -> status
+    """
+    merge_pending_heartbeats(computers)
+    current_east_time = CFG.offset_to_est(now or datetime.utcnow(), True)
+
+    statuses = {}
+    for computer in computers:
+        computer._evaluated_status, _ = evaluate_status(
+            computer.activated,
+            computer.last_download_time,
+            computer.last_time_online,
+            current_east_time,
+        )
+        statuses[computer.id] = computer._evaluated_status
+
+    return statuses
+
+
+def detect_status_transitions(now: datetime | None = None) -> int:
+    """Update persisted statuses of the computers which reached their status deadline
+    (or were changed since the last check) and create STATUS_GREEN/YELLOW/RED log events
+    of the changed statuses (if computer logs are enabled). Computers are selected by the status_deadline index,
+    so the cost depends on the number of due computers, not on the fleet size
+
+    Args:
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+
+    Returns:
+        int: number of computers with changed status
+    """
+    # Flushed heartbeats make the computers due (see flush_heartbeats)
+    flush_heartbeats()
+
+    current_east_time = CFG.offset_to_est(now or datetime.utcnow(), True)
+    computers = Computer.__table__
+    changed = 0
+
+    while True:
+        rows = db.session.execute(
+            select(
+                computers.c.id,
+                computers.c.activated,
+                computers.c.last_download_time,
+                computers.c.last_time_online,
+                computers.c.current_status,
+                computers.c.logs_enabled,
+            )
+            .where(
+                computers.c.is_deleted.is_(False),
+                or_(
+                    computers.c.status_deadline <= current_east_time,
+                    computers.c.current_status.is_(None),
+                ),
+            )
+            .order_by(computers.c.id)
+            .limit(CFG.COMPUTER_STATUS_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        updated_rows = []
+        log_events = []
+        for row in rows:
+            status, deadline = evaluate_status(
+                row.activated,
+                row.last_download_time,
+                row.last_time_online,
+                current_east_time,
+            )
+            values = dict(
+                computer_id=row.id, current_status=status, status_deadline=deadline
+            )
+            if status != row.current_status:
+                values["status_changed_at"] = current_east_time
+                # No event for the first evaluation of the computer status
+                # and for the computers with disabled logs
+                if (
+                    row.current_status
+                    and row.logs_enabled
+                    and status in STATUS_LOG_TYPES
+                ):
+                    log_events.append(
+                        dict(
+                            computer_id=row.id,
+                            log_type=STATUS_LOG_TYPES[status],
+                            created_at=current_east_time,
+                            data=f"{row.current_status.value} -> {status.value}",
+                        )
+                    )
+                changed += 1
+            updated_rows.append(values)
+
+        bulk_update(computers, updated_rows, "computer_id")
+        if log_events:
+            db.session.execute(insert(LogEvent.__table__), log_events)
+        db.session.commit()
+
+        if len(rows) < CFG.COMPUTER_STATUS_BATCH_SIZE:
+            break
+
+    logger.info("Computer statuses checked: {} changed", changed)
+
+    return changed
@@ -0,0 +1,226 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import insert, select, update
+
+from app import db
+from app import models as m
+from app.schema import WeekUptime
+from app.utils import bulk_update
+
+
+ONE_WEEK = timedelta(days=7)
+HOUR_SECONDS = 3600
+HOUR_END = timedelta(minutes=59, seconds=59)
+
+
+def daily_uptime_values(day: date, green: int, yellow: int, red: int) -> dict:
+    """Daily uptime columns of the day availability masks
+
+    Args:
+        day (date): UTC day
+        green (int): hours with downloads bitmap
+        yellow (int): hours without downloads (up to 2 hours) bitmap
+        red (int): hours without downloads (longer) bitmap
+
+    Returns:
+        dict: daily uptime values
+    """
+    offline = yellow | red
+    day_start = datetime.combine(day, time())
+
+    return dict(
+        online_seconds=green.bit_count() * HOUR_SECONDS,
+        offline_seconds=offline.bit_count() * HOUR_SECONDS,
+        # Every offline period starts with an offline hour after an online (or not logged) one
+        offline_occurrences=(offline & ~(offline << 1)).bit_count(),
+        offline_at_start=bool(offline & 1),
+        offline_at_end=bool(offline >> 23 & 1),
+        first_backup_at=day_start + timedelta(hours=(green & -green).bit_length() - 1)
+        if green
+        else None,
+        last_backup_at=day_start + timedelta(hours=green.bit_length() - 1) + HOUR_END
+        if green
+        else None,
+    )
+
+
+def _existing_ids(computer_days: set[tuple[int, date]]) -> dict[tuple[int, date], int]:
+    table = m.ComputerDailyUptime.__table__
+    return {
+        (row.computer_id, row.day): row.id
+        for row in db.session.execute(
+            select(table.c.id, table.c.computer_id, table.c.day).where(
+                table.c.computer_id.in_(
+                    {computer_id for computer_id, _ in computer_days}
+                ),
+                table.c.day.in_({day for _, day in computer_days}),
+            )
+        )
+    }
+
+
+def save_daily_uptime(rows: dict[tuple[int, date], dict]):
+    """Create or update daily uptime rows (without commit)
+
+    Args:
+        rows (dict[tuple[int, date], dict]): (computer id, UTC day) -> values to set
+    """
+    if not rows:
+        return
+
+    table = m.ComputerDailyUptime.__table__
+    existing_ids = _existing_ids(set(rows))
+
+    updated_rows = [
+        dict(values, uptime_id=existing_ids[key])
+        for key, values in rows.items()
+        if key in existing_ids
+    ]
+    new_rows = [
+        dict(values, computer_id=computer_id, day=day)
+        for (computer_id, day), values in rows.items()
+        if (computer_id, day) not in existing_ids
+    ]
+
+    bulk_update(table, updated_rows, "uptime_id")
+    if new_rows:
+        db.session.execute(insert(table), new_rows)
+
+
+def reset_daily_uptime(computer_id: int, since: date | None = None):
+    """Clear the availability based columns of the computer days (before rebuild).
+    Download errors are kept
+
+    Args:
+        computer_id (int): computer id
+        since (date, optional): UTC day to clear from. Defaults to all days.
+    """
+    query = update(m.ComputerDailyUptime).where(
+        m.ComputerDailyUptime.computer_id == computer_id
+    )
+    if since:
+        query = query.where(m.ComputerDailyUptime.day >= since)
+
+    db.session.execute(
+        query.values(
+            online_seconds=0,
+            offline_seconds=0,
+            offline_occurrences=0,
+            offline_at_start=False,
+            offline_at_end=False,
+            first_backup_at=None,
+            last_backup_at=None,
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def add_download_error(computer_id: int, error_time: datetime):
+    """Count download error of the computer (without commit)
+
+    Args:
+        computer_id (int): computer id
+        error_time (datetime): UTC
+    """
+    key = (computer_id, error_time.date())
+    uptime_id = _existing_ids({key}).get(key)
+
+    if uptime_id:
+        db.session.execute(
+            update(m.ComputerDailyUptime)
+            .where(m.ComputerDailyUptime.id == uptime_id)
+            .values(download_errors=m.ComputerDailyUptime.download_errors + 1)
+            .execution_options(synchronize_session=False)
+        )
+        return
+
+    save_daily_uptime({key: dict(download_errors=1)})
+
+
+def set_download_errors(
+    computer_id: int, errors: dict[date, int], since: date | None = None
+):
+    """Replace download errors counters of the computer days (backfill, without commit)
+
+    Args:
+        computer_id (int): computer id
+        errors (dict[date, int]): UTC day -> number of download errors
+        since (date, optional): days before it are not changed. Defaults to all days.
+    """
+    query = update(m.ComputerDailyUptime).where(
+        m.ComputerDailyUptime.computer_id == computer_id
+    )
+    if since:
+        query = query.where(m.ComputerDailyUptime.day >= since)
+    db.session.execute(
+        query.values(download_errors=0).execution_options(synchronize_session=False)
+    )
+
+    save_daily_uptime(
+        {
+            (computer_id, day): dict(download_errors=count)
+            for day, count in errors.items()
+        }
+    )
+
+
+def get_last_week_uptime(
+    computer_ids: list[int], now: datetime | None = None
+) -> dict[int, WeekUptime]:
+    """Last week (the last 7 UTC days including today) summary of the computers. One query
+
+    Args:
+        computer_ids (list[int]): computers ids
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+
+    Returns:
+        dict[int, WeekUptime]: computer id -> summary (empty one if there are no backup periods)
+    """
+    week_uptime = {computer_id: WeekUptime() for computer_id in computer_ids}
+    if not computer_ids:
+        return week_uptime
+
+    since = (now or datetime.utcnow()).date() - ONE_WEEK + timedelta(days=1)
+    rows = db.session.execute(
+        select(m.ComputerDailyUptime)
+        .where(
+            m.ComputerDailyUptime.computer_id.in_(computer_ids),
+            m.ComputerDailyUptime.day >= since,
+        )
+        .order_by(m.ComputerDailyUptime.computer_id, m.ComputerDailyUptime.day)
+    ).scalars()
+
+    previous_row: m.ComputerDailyUptime | None = None
+    for row in rows:
+        uptime = week_uptime[row.computer_id]
+        uptime.logged = uptime.logged or bool(row.online_seconds or row.offline_seconds)
+        uptime.offline_occurrences += row.offline_occurrences
+        # Offline period over midnight is counted by both days
+        if (
+            row.offline_at_start
+            and previous_row
+            and previous_row.computer_id == row.computer_id
+            and previous_row.day == row.day - timedelta(days=1)
+            and previous_row.offline_at_end
+        ):
+            uptime.offline_occurrences -= 1
+        uptime.offline_time += timedelta(seconds=row.offline_seconds)
+        uptime.online_time += timedelta(seconds=row.online_seconds)
+        uptime.download_errors += row.download_errors
+        uptime.first_backup_at = uptime.first_backup_at or row.first_backup_at
+        uptime.last_backup_at = row.last_backup_at or uptime.last_backup_at
+        previous_row = row
+
+    return week_uptime
+
+
+def load_last_week_uptime(computers: list[m.Computer], now: datetime | None = None):
+    """Load last week summary of all the computers with one query, so
+    Computer.last_week_offline_* don't query it for every computer
+
+    Args:
+        computers (list[m.Computer]): computers
+        now (datetime, optional): current time (UTC). Defaults to datetime.utcnow().
+    """
+    week_uptime = get_last_week_uptime([computer.id for computer in computers], now)
+    for computer in computers:
+        computer.last_week_uptime = week_uptime[computer.id]
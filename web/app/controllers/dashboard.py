@@ -0,0 +1,390 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+
+from app import db
+from app.models import (
+    Company,
+    Computer,
+    DashboardSnapshot,
+    DeviceRole,
+    Location,
+    LocationGroup,
+    LocationStatus,
+    User,
+    UserPermissionLevel,
+)
+from app.models.location_group import locations_to_group
+from app.schema import DashboardCounters
+from app.utils import bulk_update, cached_json
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+# Main page counters of the permission scope ("global", "company:<id>", "location_group:<id>"
+# or "location:<id>")
+DASHBOARD_KEY = "dashboard:{}"
+
+
+def get_dashboard_scope(viewer: User) -> tuple[UserPermissionLevel, int | None]:
+    """Permission scope of the main page counters
+
+    Args:
+        viewer (User): user object
+
+    Returns:
+        tuple[UserPermissionLevel, int | None]: permission level and id of the company,
+            location group or location (None - global scope)
+    """
+    match viewer.permission:
+        case UserPermissionLevel.GLOBAL:
+            return UserPermissionLevel.GLOBAL, None
+        case UserPermissionLevel.COMPANY:
+            return UserPermissionLevel.COMPANY, viewer.company_id
+        case UserPermissionLevel.LOCATION_GROUP:
+            return UserPermissionLevel.LOCATION_GROUP, viewer.location_group[0].id
+        case UserPermissionLevel.LOCATION:
+            return UserPermissionLevel.LOCATION, viewer.location[0].id
+
+
+def _scope_filters(
+    level: UserPermissionLevel, scope_id: int | None
+) -> tuple[list, list]:
+    """Locations and computers filters of the scope"""
+    match level:
+        case UserPermissionLevel.GLOBAL:
+            return [], []
+        case UserPermissionLevel.COMPANY:
+            # Company computers and computers in the company locations
+            company_locations = select(Location.id).where(
+                Location.company_id == scope_id,
+                Location.is_deleted.is_(False),
+                Location.computers_per_location > 0,
+            )
+            return [Location.company_id == scope_id], [
+                or_(
+                    Computer.company_id == scope_id,
+                    Computer.location_id.in_(company_locations),
+                )
+            ]
+        case UserPermissionLevel.LOCATION_GROUP:
+            group_locations = select(locations_to_group.c.location_id).where(
+                locations_to_group.c.location_group_id == scope_id
+            )
+            return [Location.id.in_(group_locations)], [
+                Computer.location_id.in_(
+                    select(Location.id).where(
+                        Location.id.in_(group_locations),
+                        Location.is_deleted.is_(False),
+                    )
+                )
+            ]
+        case UserPermissionLevel.LOCATION:
+            return [Location.id == scope_id], [Computer.location_id == scope_id]
+
+
+def _scope_key(level: UserPermissionLevel, scope_id: int | None) -> str:
+    return f"{level.value.lower()}:{scope_id}" if scope_id else level.value.lower()
+
+
+def _locations_columns() -> list:
+    """Locations counters (only locations with computers are counted)"""
+    with_computers = Location.computers_per_location > 0
+    activated_location = and_(with_computers, Location.activated.is_(True))
+    return [
+        func.count().filter(with_computers).label("total_locations"),
+        func.count().filter(activated_location).label("activated_locations"),
+        func.count()
+        .filter(activated_location, Location.status == LocationStatus.OFFLINE)
+        .label("locations_offline"),
+        func.count()
+        .filter(activated_location, Location.status == LocationStatus.ONLINE)
+        .label("locations_online"),
+        func.count()
+        .filter(
+            activated_location,
+            Location.status == LocationStatus.ONLINE_PRIMARY_OFFLINE,
+        )
+        .label("locations_primary_offline"),
+    ]
+
+
+def _computers_columns(online_since: datetime) -> list:
+    """Computers counters. Same as Computer.status: ONLINE or (activated) offline"""
+    activated = Computer.activated.is_(True)
+    online = and_(activated, Computer.last_download_time >= online_since)
+    offline = and_(
+        activated,
+        or_(
+            Computer.last_download_time.is_(None),
+            Computer.last_download_time < online_since,
+        ),
+    )
+    primary = Computer.device_role == DeviceRole.PRIMARY
+    alternate = Computer.device_role == DeviceRole.ALTERNATE
+    return [
+        func.count().label("total_computers"),
+        func.count().filter(activated).label("activated_computers"),
+        func.count().filter(online).label("computers_online"),
+        func.count().filter(offline).label("computers_offline"),
+        func.count().filter(activated, primary).label("activated_primary"),
+        func.count().filter(online, primary).label("primary_online"),
+        func.count().filter(offline, primary).label("primary_offline"),
+        func.count().filter(activated, alternate).label("activated_alternate"),
+        func.count().filter(online, alternate).label("alternate_online"),
+        func.count().filter(offline, alternate).label("alternate_offline"),
+    ]
+
+
+def _online_since() -> datetime:
+    return CFG.offset_to_est(datetime.utcnow(), True) - timedelta(hours=1, minutes=30)
+
+
+def count_dashboard_counters(
+    level: UserPermissionLevel, scope_id: int | None = None
+) -> DashboardCounters:
+    """Main page counters of the scope from the live data: one aggregate query for
+    locations and one for computers
+
+    Args:
+        level (UserPermissionLevel): scope permission level
+        scope_id (int, optional): company, location group or location id. Defaults to None.
+
+    Returns:
+        DashboardCounters: counters
+    """
+    locations_filters, computers_filters = _scope_filters(level, scope_id)
+
+    locations = db.session.execute(
+        select(*_locations_columns()).where(
+            Location.is_deleted.is_(False),
+            Location.computers_per_location > 0,
+            *locations_filters,
+        )
+    ).one()
+    computers = db.session.execute(
+        select(*_computers_columns(_online_since())).where(
+            Computer.is_deleted.is_(False), *computers_filters
+        )
+    ).one()
+
+    return DashboardCounters(**locations._mapping, **computers._mapping)
+
+
+def _dashboard_scopes() -> list[tuple[UserPermissionLevel, int | None]]:
+    """All the permission scopes: global, companies, location groups and locations"""
+    scopes = [(UserPermissionLevel.GLOBAL, None)]
+    for level, model in (
+        (UserPermissionLevel.COMPANY, Company),
+        (UserPermissionLevel.LOCATION_GROUP, LocationGroup),
+        (UserPermissionLevel.LOCATION, Location),
+    ):
+        scopes += [
+            (level, scope_id)
+            for scope_id in db.session.scalars(
+                select(model.id).where(model.is_deleted.is_(False)).order_by(model.id)
+            )
+        ]
+    return scopes
+
+
+def update_dashboard_snapshots(online_since: datetime | None = None) -> int:
+    """Refresh main page counters snapshots of all the permission scopes.
+    Counters are grouped by location (and company) by two aggregate queries and summed
+    up per scope, only changed snapshots are updated. The caller commits
+
+    Args:
+        online_since (datetime, optional): computers with downloads since the time (EST)
+            are online. Defaults to 1.5 hours ago.
+
+    Returns:
+        int: number of created, updated and deleted snapshots
+    """
+    counters_fields = list(DashboardCounters.__fields__)
+    totals: dict[str, dict[str, int]] = {
+        _scope_key(level, scope_id): dict.fromkeys(counters_fields, 0)
+        for level, scope_id in _dashboard_scopes()
+    }
+
+    def add(scopes: set[str], row):
+        for scope in scopes:
+            counters = totals.get(scope)
+            # Scope was deleted (e.g. a computer of a deleted company)
+            if counters is None:
+                continue
+            for field, value in row._mapping.items():
+                if field in counters:
+                    counters[field] += value
+
+    global_scope = _scope_key(UserPermissionLevel.GLOBAL, None)
+
+    # NOTE Locations counters, one row per location
+    location_groups = {}
+    company_locations = {}
+    for row in db.session.execute(
+        select(
+            Location.id,
+            Location.company_id,
+            Location.computers_per_location,
+            locations_to_group.c.location_group_id,
+            *_locations_columns(),
+        )
+        .outerjoin(locations_to_group, locations_to_group.c.location_id == Location.id)
+        .where(Location.is_deleted.is_(False))
+        .group_by(
+            Location.id,
+            Location.company_id,
+            Location.computers_per_location,
+            locations_to_group.c.location_group_id,
+        )
+    ):
+        scopes = {
+            global_scope,
+            _scope_key(UserPermissionLevel.LOCATION, row.id),
+            _scope_key(UserPermissionLevel.COMPANY, row.company_id),
+        }
+        if row.location_group_id:
+            location_groups[row.id] = row.location_group_id
+            scopes.add(
+                _scope_key(UserPermissionLevel.LOCATION_GROUP, row.location_group_id)
+            )
+        if row.computers_per_location > 0:
+            company_locations[row.id] = row.company_id
+        add(scopes, row)
+
+    # NOTE Computers counters, one row per company and location pair
+    for row in db.session.execute(
+        select(
+            Computer.company_id,
+            Computer.location_id,
+            *_computers_columns(online_since or _online_since()),
+        )
+        .where(Computer.is_deleted.is_(False))
+        .group_by(Computer.company_id, Computer.location_id)
+    ):
+        scopes = {global_scope, _scope_key(UserPermissionLevel.COMPANY, row.company_id)}
+        if row.location_id in company_locations:
+            # Computers in the company locations are counted for the company too
+            scopes.add(
+                _scope_key(
+                    UserPermissionLevel.COMPANY, company_locations[row.location_id]
+                )
+            )
+        if row.location_id in location_groups:
+            scopes.add(
+                _scope_key(
+                    UserPermissionLevel.LOCATION_GROUP, location_groups[row.location_id]
+                )
+            )
+        if row.location_id:
+            scopes.add(_scope_key(UserPermissionLevel.LOCATION, row.location_id))
+        add(scopes, row)
+
+    # NOTE Write only changed snapshots
+    snapshots = DashboardSnapshot.__table__
+    existing = {
+        row.scope: row
+        for row in db.session.execute(
+            select(
+                snapshots.c.id,
+                snapshots.c.scope,
+                *(snapshots.c[field] for field in counters_fields),
+            )
+        )
+    }
+    updated_at = datetime.utcnow()
+    new_rows = []
+    changed_rows = []
+    for scope, counters in totals.items():
+        snapshot = existing.pop(scope, None)
+        if not snapshot:
+            new_rows.append(dict(counters, scope=scope, updated_at=updated_at))
+        elif any(getattr(snapshot, key) != value for key, value in counters.items()):
+            changed_rows.append(
+                dict(counters, snapshot_id=snapshot.id, updated_at=updated_at)
+            )
+
+    if new_rows:
+        db.session.execute(insert(snapshots), new_rows)
+    bulk_update(snapshots, changed_rows, "snapshot_id")
+    # Snapshots of deleted scopes
+    if existing:
+        db.session.execute(
+            delete(snapshots).where(
+                snapshots.c.id.in_([row.id for row in existing.values()])
+            )
+        )
+
+    logger.info(
+        "Dashboard snapshots: {} created, {} updated, {} deleted",
+        len(new_rows),
+        len(changed_rows),
+        len(existing),
+    )
+
+    return len(new_rows) + len(changed_rows) + len(existing)
+
+
+def check_dashboard_snapshots() -> list[str]:
+    """Compare snapshots of all the scopes with the live counters.
+    Computers which changed their status since the last refresh are reported too
+
+    Returns:
+        list[str]: mismatches descriptions
+    """
+    snapshots = {
+        snapshot.scope: DashboardCounters.from_orm(snapshot)
+        for snapshot in DashboardSnapshot.query.all()
+    }
+
+    scopes = _dashboard_scopes()
+    mismatches = []
+    for level, scope_id in scopes:
+        scope = _scope_key(level, scope_id)
+        snapshot = snapshots.get(scope)
+        if not snapshot:
+            mismatches.append(f"{scope}: no snapshot")
+            continue
+        live = count_dashboard_counters(level, scope_id)
+        differences = [
+            f"{field} {value} != {getattr(live, field)}"
+            for field, value in snapshot
+            if value != getattr(live, field)
+        ]
+        if differences:
+            mismatches.append(f"{scope}: {', '.join(differences)}")
+
+    for mismatch in mismatches:
+        logger.warning("Dashboard snapshot mismatch - {}", mismatch)
+    logger.info(
+        "Dashboard snapshots checked: {} scopes, {} mismatches",
+        len(scopes),
+        len(mismatches),
+    )
+
+    return mismatches
+
+
+def get_dashboard_counters(viewer: User) -> DashboardCounters:
+    """Main page counters of the viewer permission scope: the scope snapshot
+    (see update_dashboard_snapshots) or the live counters. Cached per scope for CFG.DASHBOARD_CACHE_TTL seconds
+
+    Args:
+        viewer (User): user object
+
+    Returns:
+        DashboardCounters: counters
+    """
+    level, scope_id = get_dashboard_scope(viewer)
+    scope = _scope_key(level, scope_id)
+
+    def build() -> str:
+        snapshot = DashboardSnapshot.query.filter_by(scope=scope).first()
+        if snapshot:
+            return DashboardCounters.from_orm(snapshot).json()
+        # Scope created after the last snapshots refresh
+        return count_dashboard_counters(level, scope_id).json()
+
+    data = cached_json(DASHBOARD_KEY.format(scope), CFG.DASHBOARD_CACHE_TTL, build)
+    return DashboardCounters.parse_raw(data)
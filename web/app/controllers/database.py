@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from app import db
 from app.logger import logger
 from app import models as m
+from app.controllers.desktop_client_cache import invalidate_desktop_clients_cache
 from config import BaseConfig as CFG
 
 
@@ -94,7 +95,6 @@ def init_db(test_me: bool = False):
                 "identifier_key": "comp1_identifier_key",
                 "folder_password": "pass",
                 "manager_host": "comp1_manager_host",
-                "files_checksum": dict(),
                 "msi_version": "stable",
             },
             "comp2_late": {
@@ -112,7 +112,6 @@ def init_db(test_me: bool = False):
                 "identifier_key": "comp2_identifier_key",
                 "folder_password": "pass",
                 "manager_host": "comp2_manager_host",
-                "files_checksum": dict(),
                 "msi_version": "stable",
             },
             "comp3_test": {
@@ -128,7 +127,6 @@ def init_db(test_me: bool = False):
                 "identifier_key": "comp3_identifier_key",
                 "folder_password": "pass",
                 "manager_host": "comp3_manager_host",
-                "files_checksum": dict(),
                 "msi_version": "1.0.9.110769",
             },
             "comp4_test": {
@@ -144,7 +142,6 @@ def init_db(test_me: bool = False):
                 "identifier_key": "comp4_identifier_key",
                 "folder_password": "pass",
                 "manager_host": "comp4_manager_host",
-                "files_checksum": dict(),
                 "msi_version": "stable",
             },
             "comp5_test": {
@@ -160,7 +157,6 @@ def init_db(test_me: bool = False):
                 "identifier_key": "comp5_identifier_key",
                 "folder_password": "pass",
                 "manager_host": "comp5_manager_host",
-                "files_checksum": dict(),
             },
             "comp7_no_download_time": {
                 "computer_name": "comp7_no_download_time",
@@ -174,7 +170,6 @@ def init_db(test_me: bool = False):
                 "identifier_key": "comp7_identifier_key",
                 "folder_password": "pass",
                 "manager_host": "comp7_manager_host",
-                "files_checksum": dict(),
             },
             "comp6_late": {
                 "computer_name": "comp6_late",
@@ -191,7 +186,6 @@ def init_db(test_me: bool = False):
                 "identifier_key": "comp6_identifier_key",
                 "folder_password": "pass",
                 "manager_host": "comp6_manager_host",
-                "files_checksum": dict(),
             },
         }
 
@@ -224,7 +218,6 @@ def init_db(test_me: bool = False):
                     identifier_key=computers[computer]["identifier_key"],
                     folder_password=computers[computer]["folder_password"],
                     manager_host=computers[computer]["manager_host"],
-                    files_checksum=computers[computer]["files_checksum"],
                 ).save()
             elif "msi_version" in computers[computer]:
                 m.Computer(
@@ -240,7 +233,6 @@ def init_db(test_me: bool = False):
                     identifier_key=computers[computer]["identifier_key"],
                     folder_password=computers[computer]["folder_password"],
                     manager_host=computers[computer]["manager_host"],
-                    files_checksum=computers[computer]["files_checksum"],
                     msi_version=computers[computer]["msi_version"],
                 ).save()
 
@@ -258,7 +250,6 @@ def init_db(test_me: bool = False):
                     identifier_key=computers[computer]["identifier_key"],
                     folder_password=computers[computer]["folder_password"],
                     manager_host=computers[computer]["manager_host"],
-                    files_checksum=computers[computer]["files_checksum"],
                 ).save()
 
         m.ClientVersion(name="stable").save()
@@ -285,6 +276,8 @@ def init_db(test_me: bool = False):
 
         db.session.commit()
 
+    invalidate_desktop_clients_cache()
+
 
 def empty_to_stable():
     """
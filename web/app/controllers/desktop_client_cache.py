@@ -0,0 +1,147 @@
+import time
+import threading
+
+from app import db
+from app.models import ClientVersion, DesktopClient
+from app.utils import get_redis
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+# Redis key with the cache version. It is incremented on every desktop client or client version change
+# so the other app workers reload their in-process cache
+VERSION_KEY = "desktop_clients:cache_version"
+
+# Flags which are resolved by flag name. All the other values are explicit versions
+CLIENT_FLAGS = ("stable", "latest")
+
+_lock = threading.Lock()
+# (flag name -> (desktop client id, version), version -> desktop client id, first client id).
+# Replaced as a whole on reload, so readers always see a complete snapshot without the lock
+_clients: tuple[dict[str, tuple[int, str]], dict[str, int], int | None] = ({}, {}, None)
+_loaded_version: str | None = None
+_local_version: int = 0
+_loaded_at: float | None = None
+
+
+def _current_version() -> str:
+    redis_client = get_redis()
+    if redis_client:
+        return redis_client.get(VERSION_KEY) or "0"
+
+    return str(_local_version)
+
+
+def _load(version: str):
+    global _clients, _loaded_version, _loaded_at
+
+    rows = (
+        db.session.query(DesktopClient.id, DesktopClient.version, ClientVersion.name)
+        .outerjoin(ClientVersion, DesktopClient.flag_id == ClientVersion.id)
+        .order_by(DesktopClient.id)
+        .all()
+    )
+
+    flags = {}
+    versions = {}
+    for client_id, client_version, flag_name in rows:
+        if flag_name:
+            flags.setdefault(flag_name, (client_id, client_version))
+        if client_version:
+            versions.setdefault(client_version, client_id)
+
+    _clients = (flags, versions, rows[0][0] if rows else None)
+    _loaded_version = version
+    _loaded_at = time.monotonic()
+
+    logger.debug("Desktop clients cache loaded. Version: {}", version)
+
+
+def _ensure_loaded() -> tuple[dict[str, tuple[int, str]], dict[str, int], int | None]:
+    """Loaded desktop clients snapshot: flags, versions and the first client id"""
+    version = _current_version()
+
+    with _lock:
+        if (
+            _loaded_at is None
+            or _loaded_version != version
+            or time.monotonic() - _loaded_at > CFG.DESKTOP_CLIENTS_CACHE_MAX_AGE
+        ):
+            _load(version)
+
+    return _clients
+
+
+def invalidate_desktop_clients_cache():
+    """Drop cached desktop clients versions in all the app workers.
+    Must be called after desktop client or client version is created, changed or deleted
+    """
+    global _local_version, _loaded_at
+
+    redis_client = get_redis()
+    if redis_client:
+        redis_client.incr(VERSION_KEY)
+
+    with _lock:
+        _local_version += 1
+        _loaded_at = None
+
+
+def get_desktop_client_id(msi_version: str | None) -> int | None:
+    """Resolve "stable"/"latest" flag or explicit version to desktop client id
+    without querying the database (uses in-process cache)
+
+    Args:
+        msi_version (str | None): flag name or version
+
+    Returns:
+        int | None: desktop client id or None if there is no such desktop client
+    """
+    if not msi_version:
+        return None
+
+    flags, versions, _ = _ensure_loaded()
+
+    if msi_version in CLIENT_FLAGS:
+        flag = flags.get(msi_version)
+        return flag[0] if flag else None
+
+    return versions.get(msi_version)
+
+
+def get_msi_version(msi_version: str | None) -> str | None:
+    """Resolve "stable"/"latest" flag or explicit version to the desktop client version
+    without querying the database (uses in-process cache)
+
+    Args:
+        msi_version (str | None): flag name or version
+
+    Returns:
+        str | None: desktop client version or None if there is no such desktop client
+    """
+    if not msi_version:
+        return None
+
+    flags, versions, _ = _ensure_loaded()
+
+    if msi_version in CLIENT_FLAGS:
+        flag = flags.get(msi_version)
+        return flag[1] if flag else None
+
+    return msi_version if msi_version in versions else None
+
+
+def get_default_desktop_client_id() -> int | None:
+    """Desktop client for new installations: "stable", then "latest", then any
+
+    Returns:
+        int | None: desktop client id or None if there are no desktop clients
+    """
+    flags, _, first_id = _ensure_loaded()
+
+    for flag_name in CLIENT_FLAGS:
+        if flag_name in flags:
+            return flags[flag_name][0]
+
+    return first_id
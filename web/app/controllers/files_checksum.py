@@ -0,0 +1,122 @@
+import json
+import hashlib
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from app import db
+from app.models import Computer, ComputerFileChecksum
+from app.logger import logger
+
+
+def get_files_checksum_digest(files_checksum: dict[str, str]) -> str:
+    """Root digest of the files checksums. The agent calculates it the same way
+    so the whole set can be compared without sending it
+
+    Args:
+        files_checksum (dict[str, str]): path -> checksum
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    data = json.dumps(files_checksum, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def get_files_checksum(computer: Computer) -> dict[str, str]:
+    """Files checksums of the computer
+
+    Args:
+        computer (Computer): computer
+
+    Returns:
+        dict[str, str]: path -> checksum
+    """
+    rows = db.session.execute(
+        select(ComputerFileChecksum.path, ComputerFileChecksum.checksum).where(
+            ComputerFileChecksum.computer_id == computer.id
+        )
+    )
+    return {path: checksum for path, checksum in rows}
+
+
+def update_files_checksum(
+    computer: Computer,
+    files_checksum: dict[str, str] | None = None,
+    changed: dict[str, str] | None = None,
+    removed: list[str] | None = None,
+) -> str:
+    """Update files checksums of the computer. Only changed rows are written.
+    Either the full set (files_checksum) or the delta (changed and removed) is applied
+
+    Args:
+        computer (Computer): computer
+        files_checksum (dict[str, str], optional): full set path -> checksum. Defaults to None.
+        changed (dict[str, str], optional): new or changed files path -> checksum. Defaults to None.
+        removed (list[str], optional): removed files paths. Defaults to None.
+
+    Returns:
+        str: new root digest (also saved to computer.files_checksum_digest)
+    """
+    current = get_files_checksum(computer)
+
+    if files_checksum is not None:
+        changed = {
+            path: checksum
+            for path, checksum in files_checksum.items()
+            if current.get(path) != checksum
+        }
+        removed = [path for path in current if path not in files_checksum]
+    else:
+        changed = {
+            path: checksum
+            for path, checksum in (changed or {}).items()
+            if current.get(path) != checksum
+        }
+        removed = [path for path in removed or [] if path in current]
+
+    table = ComputerFileChecksum.__table__
+    new_rows = [
+        {"computer_id": computer.id, "path": path, "checksum": checksum}
+        for path, checksum in changed.items()
+        if path not in current
+    ]
+    updated_rows = [
+        {"_path": path, "_checksum": checksum}
+        for path, checksum in changed.items()
+        if path in current
+    ]
+
+    if removed:
+        db.session.execute(
+            delete(table).where(
+                table.c.computer_id == computer.id, table.c.path.in_(removed)
+            )
+        )
+    if updated_rows:
+        db.session.execute(
+            update(table)
+            .where(
+                table.c.computer_id == computer.id,
+                table.c.path == bindparam("_path"),
+            )
+            .values(checksum=bindparam("_checksum")),
+            updated_rows,
+        )
+    if new_rows:
+        db.session.execute(insert(table), new_rows)
+
+    current.update(changed)
+    for path in removed:
+        current.pop(path)
+
+    computer.files_checksum_digest = get_files_checksum_digest(current)
+
+    logger.debug(
+        "Files checksum of computer {} updated. Added: {}, changed: {}, removed: {}",
+        computer.computer_name,
+        len(new_rows),
+        len(updated_rows),
+        len(removed),
+    )
+
+    return computer.files_checksum_digest
@@ -0,0 +1,374 @@
+import json
+from datetime import datetime
+
+from flask import g, has_app_context
+from sqlalchemy import and_, bindparam, case, func, literal, or_, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.models import Computer, ComputerStatus
+from app.schema import HeartbeatRecord
+from app.utils import get_redis
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+# Redis keys. "online" hash: computer_id -> {"computer_ip", "last_time_online"},
+# "download" hash: computer_id -> last_download_time.
+# Download time is kept separately so the next heartbeat without download doesn't overwrite it.
+# Heartbeats are buffered only with Redis (shared by all the workers and the flush task),
+# without Redis they are written to the computer row right away.
+# Agent requests only write to the buffer, it's flushed by the flush_heartbeats beat task
+ONLINE_KEY = "heartbeats:online"
+DOWNLOAD_KEY = "heartbeats:download"
+# Flush renames the hashes to the processing keys and deletes them after the db commit,
+# so the heartbeats of a failed (or killed) flush are flushed again by the next one
+ONLINE_PROCESSING_KEY = "heartbeats:online:processing"
+DOWNLOAD_PROCESSING_KEY = "heartbeats:download:processing"
+# Only one flush at a time uses the processing keys (seconds)
+FLUSH_LOCK_KEY = "heartbeats:flush_lock"
+FLUSH_LOCK_TIMEOUT = 60
+
+
+def _to_records(online: dict, download: dict) -> dict[int, HeartbeatRecord]:
+    """Combine raw buffer hashes into heartbeat records"""
+    records: dict[int, HeartbeatRecord] = {}
+
+    for computer_id in set(online) | set(download):
+        online_data = online.get(computer_id)
+        if isinstance(online_data, str):
+            online_data = json.loads(online_data)
+        online_data = online_data or {}
+
+        records[int(computer_id)] = HeartbeatRecord(
+            computer_id=int(computer_id),
+            computer_ip=online_data.get("computer_ip"),
+            last_time_online=online_data.get("last_time_online"),
+            last_download_time=download.get(computer_id),
+        )
+
+    return records
+
+
+def _read_buffer(computer_ids: list[int]) -> dict[int, HeartbeatRecord]:
+    """Buffered heartbeats of the computers (one round trip, only the requested fields).
+    Heartbeats being flushed are read too, the newer buffered ones win"""
+    redis_client = get_redis()
+    if not redis_client or not computer_ids:
+        return {}
+
+    pipe = redis_client.pipeline(transaction=False)
+    for key in (
+        ONLINE_KEY,
+        DOWNLOAD_KEY,
+        ONLINE_PROCESSING_KEY,
+        DOWNLOAD_PROCESSING_KEY,
+    ):
+        pipe.hmget(key, computer_ids)
+    online, download, online_processing, download_processing = pipe.execute()
+
+    return _to_records(
+        {
+            key: value or processing_value
+            for key, value, processing_value in zip(
+                computer_ids, online, online_processing
+            )
+            if value or processing_value
+        },
+        {
+            key: value or processing_value
+            for key, value, processing_value in zip(
+                computer_ids, download, download_processing
+            )
+            if value or processing_value
+        },
+    )
+
+
+def _take_buffer() -> tuple[dict[int, HeartbeatRecord], bool]:
+    """Move the buffered heartbeats to the processing keys (under the flush lock).
+    Heartbeats left there by a failed flush are taken instead of the buffer
+
+    Returns:
+        tuple[dict[int, HeartbeatRecord], bool]: heartbeats to flush and
+            if they were left by a failed flush
+    """
+    redis_client = get_redis()
+
+    is_left = bool(redis_client.exists(ONLINE_PROCESSING_KEY, DOWNLOAD_PROCESSING_KEY))
+    if not is_left:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.rename(ONLINE_KEY, ONLINE_PROCESSING_KEY)
+        pipe.rename(DOWNLOAD_KEY, DOWNLOAD_PROCESSING_KEY)
+        # Rename of an empty (not existing) hash fails, the other one is renamed anyway
+        pipe.execute(raise_on_error=False)
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(ONLINE_PROCESSING_KEY)
+    pipe.hgetall(DOWNLOAD_PROCESSING_KEY)
+    online, download = pipe.execute()
+    return _to_records(online, download), is_left
+
+
+def get_pending_heartbeats(computer_ids: list[int]) -> dict[int, HeartbeatRecord]:
+    """Heartbeats of the computers which are not flushed to the database yet.
+    Read heartbeats are kept for the app context (request or CLI command),
+    so every computer is read from Redis once
+
+    Args:
+        computer_ids (list[int]): computers ids
+
+    Returns:
+        dict[int, HeartbeatRecord]: computer_id -> buffered heartbeat
+    """
+    if not has_app_context():
+        return _read_buffer(computer_ids)
+
+    if "pending_heartbeats" not in g:
+        # computer_id -> buffered heartbeat or None (nothing is buffered)
+        g.pending_heartbeats = {}
+
+    missing_ids = [
+        computer_id
+        for computer_id in computer_ids
+        if computer_id not in g.pending_heartbeats
+    ]
+    if missing_ids:
+        records = _read_buffer(missing_ids)
+        for computer_id in missing_ids:
+            g.pending_heartbeats[computer_id] = records.get(computer_id)
+
+    return {
+        computer_id: g.pending_heartbeats[computer_id]
+        for computer_id in computer_ids
+        if g.pending_heartbeats[computer_id]
+    }
+
+
+def get_pending_heartbeat(computer_id: int) -> HeartbeatRecord | None:
+    """Buffered heartbeat of the computer or None"""
+    return get_pending_heartbeats([computer_id]).get(computer_id)
+
+
+def _apply_heartbeat(
+    computer: Computer, record: HeartbeatRecord, write_through: bool = False
+):
+    """Show buffered values on the computer object without marking it dirty
+    (so the buffered values are not written by some other commit).
+    Timestamps are never moved back
+
+    Args:
+        computer (Computer): computer object
+        record (HeartbeatRecord): heartbeat
+        write_through (bool, optional): set the values as changes of the computer
+            (written by the next commit). Defaults to False.
+    """
+    set_value = setattr if write_through else set_committed_value
+
+    if record.computer_ip:
+        set_value(computer, "computer_ip", record.computer_ip)
+
+    if record.last_time_online and (
+        not computer.last_time_online
+        or computer.last_time_online < record.last_time_online
+    ):
+        set_value(computer, "last_time_online", record.last_time_online)
+
+    if record.last_download_time and (
+        not computer.last_download_time
+        or computer.last_download_time < record.last_download_time
+    ):
+        set_value(computer, "last_download_time", record.last_download_time)
+
+
+def merge_pending_heartbeats(computers: list[Computer]):
+    """Show buffered heartbeats on the loaded computers (one Redis round trip).
+    Called by the code which reads computers last_time_online / last_download_time
+    (pages, lists). Background jobs flush the buffer first instead
+
+    Args:
+        computers (list[Computer]): computers
+    """
+    if not get_redis() or not computers:
+        return
+
+    records = get_pending_heartbeats([computer.id for computer in computers])
+    for computer in computers:
+        record = records.get(computer.id)
+        if record:
+            _apply_heartbeat(computer, record)
+
+
+def buffer_heartbeat(
+    computer: Computer,
+    computer_ip: str | None,
+    last_time_online: datetime,
+    last_download_time: datetime | None = None,
+):
+    """Record computer heartbeat in the write-behind buffer instead of updating computer row.
+    Buffered heartbeats are written to the database in bulk by flush_heartbeats()
+
+    Args:
+        computer (Computer): computer object
+        computer_ip (str | None): computer IP
+        last_time_online (datetime): last time online (EST)
+        last_download_time (datetime, optional): last download time (EST). Defaults to None.
+    """
+    redis_client = get_redis()
+    if not redis_client:
+        # Nothing to flush the buffer to - write the heartbeat with the request changes
+        record = HeartbeatRecord(
+            computer_id=computer.id,
+            computer_ip=computer_ip,
+            last_time_online=last_time_online,
+            last_download_time=last_download_time,
+        )
+        _apply_heartbeat(computer, record, write_through=True)
+        computer.update()
+        return
+
+    online_data = {
+        "computer_ip": computer_ip,
+        "last_time_online": last_time_online.isoformat(),
+    }
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(ONLINE_KEY, computer.id, json.dumps(online_data))
+    if last_download_time:
+        pipe.hset(DOWNLOAD_KEY, computer.id, last_download_time.isoformat())
+    else:
+        # Buffered download time is kept
+        pipe.hget(DOWNLOAD_KEY, computer.id)
+        pipe.hget(DOWNLOAD_PROCESSING_KEY, computer.id)
+    results = pipe.execute()
+
+    record = HeartbeatRecord(
+        computer_id=computer.id,
+        computer_ip=computer_ip,
+        last_time_online=last_time_online,
+        last_download_time=last_download_time or results[-2] or results[-1],
+    )
+    _apply_heartbeat(computer, record)
+
+    # Keep the heartbeats read by the current context up to date
+    if has_app_context():
+        g.setdefault("pending_heartbeats", {})[computer.id] = record
+
+
+def _write_heartbeats(records: dict[int, HeartbeatRecord]):
+    """Write heartbeats to the database with one bulk UPDATE in own transaction
+    (flush can be called in the middle of the job unit of work)"""
+    computers = Computer.__table__
+    new_last_time_online = bindparam("_last_time_online", type_=db.DateTime)
+    new_last_download_time = bindparam("_last_download_time", type_=db.DateTime)
+
+    stmt = (
+        update(computers)
+        .where(computers.c.id == bindparam("_id"))
+        .values(
+            computer_ip=func.coalesce(
+                bindparam("_computer_ip", type_=db.String), computers.c.computer_ip
+            ),
+            last_time_online=case(
+                (
+                    and_(
+                        new_last_time_online.is_not(None),
+                        or_(
+                            computers.c.last_time_online.is_(None),
+                            computers.c.last_time_online < new_last_time_online,
+                        ),
+                    ),
+                    new_last_time_online,
+                ),
+                else_=computers.c.last_time_online,
+            ),
+            last_download_time=case(
+                (
+                    and_(
+                        new_last_download_time.is_not(None),
+                        or_(
+                            computers.c.last_download_time.is_(None),
+                            computers.c.last_download_time < new_last_download_time,
+                        ),
+                    ),
+                    new_last_download_time,
+                ),
+                else_=computers.c.last_download_time,
+            ),
+            # Heartbeat can only improve the status right away (a worse status comes with
+            # the status deadline), so only such computers are checked by the status detector
+            status_deadline=case(
+                (
+                    or_(
+                        computers.c.current_status.is_(None),
+                        computers.c.current_status == ComputerStatus.OFFLINE_NO_BACKUP,
+                        and_(
+                            new_last_download_time.is_not(None),
+                            computers.c.current_status != ComputerStatus.ONLINE,
+                        ),
+                    ),
+                    literal(CFG.offset_to_est(datetime.utcnow(), True), db.DateTime),
+                ),
+                else_=computers.c.status_deadline,
+            ),
+        )
+    )
+
+    params = [
+        {
+            "_id": record.computer_id,
+            "_computer_ip": record.computer_ip,
+            "_last_time_online": record.last_time_online,
+            "_last_download_time": record.last_download_time,
+        }
+        for record in records.values()
+    ]
+
+    with db.engine.begin() as conn:
+        conn.execute(stmt, params)
+
+
+def flush_heartbeats() -> int:
+    """Write all the buffered heartbeats to the database with one bulk UPDATE.
+    Timestamps are never moved back (newer values written by other requests are kept).
+    Heartbeats are removed from Redis only after they are committed
+
+    Returns:
+        int: number of flushed heartbeats
+    """
+    redis_client = get_redis()
+    if not redis_client:
+        return 0
+
+    lock = redis_client.lock(
+        FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT, blocking_timeout=FLUSH_LOCK_TIMEOUT
+    )
+    if not lock.acquire():
+        logger.warning("Heartbeats flush is skipped: the previous one is not finished")
+        return 0
+
+    flushed = 0
+    try:
+        while True:
+            records, is_left = _take_buffer()
+            if records:
+                try:
+                    _write_heartbeats(records)
+                except Exception as err:
+                    logger.error("Heartbeats flush failed. Error: {}", err)
+                    raise
+                flushed += len(records)
+            redis_client.delete(ONLINE_PROCESSING_KEY, DOWNLOAD_PROCESSING_KEY)
+
+            # Heartbeats left by a failed flush are written, now the buffer itself
+            if not is_left:
+                break
+    finally:
+        lock.release()
+
+    if has_app_context():
+        g.pop("pending_heartbeats", None)
+
+    logger.debug("{} buffered heartbeats were flushed", flushed)
+
+    return flushed
@@ -1,9 +1,38 @@
+import os
+import time
 import random
+import socket
 from datetime import datetime, timedelta
 
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app import db
 from app.models import LogEvent, LogType, Computer
+from app.utils import get_redis
 from app.logger import logger
 
+from config import BaseConfig as CFG
+
+
+# Agent log events are appended to this Redis stream inside the request
+# and inserted to the db in bulk by the consumers of LOG_EVENTS_GROUP
+LOG_EVENTS_STREAM = "log_events:stream"
+LOG_EVENTS_GROUP = "log_events_writers"
+LOG_EVENTS_METRICS = "log_events:metrics"
+# Entries which can't be inserted (e.g. computer was deleted) are moved here with the error
+LOG_EVENTS_DEAD_LETTERS = "log_events:dead_letters"
+
+# Errors caused by the entry data, not by the db availability
+ENTRY_ERRORS = (ValueError, KeyError, IntegrityError, DataError)
+
+# Entries delivered to a consumer which died are claimed by others after this time (ms)
+LOG_EVENTS_CLAIM_IDLE_TIME = 5 * 60 * 1000
+
+
+class LogEventsLagError(Exception):
+    """Log events stream has events which are not inserted to the db yet"""
+
 
 def create_log_event(
     computer: Computer,
@@ -11,7 +40,9 @@ def create_log_event(
     data: str | None = None,
     created_at: datetime | None = None,
 ):
-    """Create new log event for computer
+    """Create new log event for computer.
+    With Redis configured the event is appended to the log events stream (see drain_log_events_stream),
+    otherwise (or if the stream is full) it is saved to the db right away
 
     Args:
         computer (m.Computer): Computer object
@@ -19,11 +50,39 @@ def create_log_event(
         data (str, optional): Data for log. Defaults to None.
         created_at (datetime, optional): log creation time. Defaults to None.
     """
+    created_at = created_at if created_at else datetime.utcnow()
+    data = data if data else ""
+
+    redis_client = get_redis()
+
+    if redis_client:
+        # The stream is not trimmed: it holds only the events not inserted yet
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.xadd(
+            LOG_EVENTS_STREAM,
+            {
+                "computer_id": computer.id,
+                "log_type": log_type.value,
+                "created_at": created_at.isoformat(),
+                "data": data,
+            },
+        )
+        pipe.xlen(LOG_EVENTS_STREAM)
+        entry_id, stream_length = pipe.execute()
+        if stream_length <= CFG.LOG_EVENTS_STREAM_MAXLEN:
+            return
+
+        redis_client.xdel(LOG_EVENTS_STREAM, entry_id)
+        logger.error(
+            "Log events stream is full ([{}] events). Is drain_log_events running?",
+            stream_length,
+        )
+
     new_log = LogEvent(
         log_type=log_type,
         computer_id=computer.id,
-        created_at=created_at if created_at else datetime.utcnow(),
-        data=data if data else "",
+        created_at=created_at,
+        data=data,
     )
 
     new_log.save()
@@ -31,6 +90,237 @@ def create_log_event(
     # logger.debug("New log event created: {}", new_log)
 
 
+def bulk_insert_log_events(log_events: list[dict]) -> int:
+    """Insert log events with one multi-row INSERT
+
+    Args:
+        log_events (list[dict]): log events rows (computer_id, log_type, created_at, data)
+
+    Returns:
+        int: number of inserted log events
+    """
+    if not log_events:
+        return 0
+
+    db.session.execute(insert(LogEvent.__table__), log_events)
+    db.session.commit()
+
+    return len(log_events)
+
+
+def _stream_entry_to_row(fields: dict) -> dict:
+    return {
+        "computer_id": int(fields["computer_id"]),
+        "log_type": LogType(fields["log_type"]),
+        "created_at": datetime.fromisoformat(fields["created_at"]),
+        "data": fields.get("data", "")[:128],
+    }
+
+
+def _insert_stream_entries(
+    redis_client, entries: list[tuple[str, dict]]
+) -> tuple[int, int]:
+    """Insert stream entries with one INSERT. If the batch fails because of some entries,
+    insert them one by one and move the failed ones to the dead letters stream,
+    so they don't block the consumers
+
+    Returns:
+        tuple[int, int]: number of inserted and dead lettered entries
+    """
+    # Entries deleted from the stream are claimed without fields
+    entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    try:
+        return (
+            bulk_insert_log_events(
+                [_stream_entry_to_row(fields) for _, fields in entries]
+            ),
+            0,
+        )
+    except ENTRY_ERRORS as err:
+        db.session.rollback()
+        logger.warning("Log events batch insert failed. Error: {}", err)
+
+    inserted = 0
+    dead_letters = 0
+    for entry_id, fields in entries:
+        try:
+            inserted += bulk_insert_log_events([_stream_entry_to_row(fields)])
+        except ENTRY_ERRORS as err:
+            db.session.rollback()
+            redis_client.xadd(
+                LOG_EVENTS_DEAD_LETTERS,
+                dict(fields, entry_id=entry_id, error=str(err)[:256]),
+            )
+            dead_letters += 1
+
+    if dead_letters:
+        logger.error("{} log events were moved to dead letters", dead_letters)
+
+    return inserted, dead_letters
+
+
+def _ensure_log_events_group(redis_client):
+    try:
+        redis_client.xgroup_create(
+            LOG_EVENTS_STREAM, LOG_EVENTS_GROUP, id="0", mkstream=True
+        )
+    except Exception as err:
+        # Group already exists
+        if "BUSYGROUP" not in str(err):
+            raise
+
+
+def drain_log_events_stream(max_seconds: int = 50) -> int:
+    """Consume log events stream and bulk insert events to the db.
+    Runs until the stream is empty or max_seconds passed.
+    Entries are acknowledged only after they are committed to the db
+    or moved to the dead letters stream
+
+    Args:
+        max_seconds (int, optional): time limit for one run. Defaults to 50.
+
+    Returns:
+        int: number of inserted log events
+    """
+    redis_client = get_redis()
+    if not redis_client:
+        logger.info("Redis is not configured. Log events are saved directly.")
+        return 0
+
+    _ensure_log_events_group(redis_client)
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    started_at = time.monotonic()
+    total_inserted = 0
+    total_dead_letters = 0
+
+    while time.monotonic() - started_at < max_seconds:
+        # Take over entries of dead consumers first, then new ones
+        _, entries, *_ = redis_client.xautoclaim(
+            LOG_EVENTS_STREAM,
+            LOG_EVENTS_GROUP,
+            consumer,
+            min_idle_time=LOG_EVENTS_CLAIM_IDLE_TIME,
+            start_id="0-0",
+            count=CFG.LOG_EVENTS_BATCH_SIZE,
+        )
+        if not entries:
+            response = redis_client.xreadgroup(
+                LOG_EVENTS_GROUP,
+                consumer,
+                {LOG_EVENTS_STREAM: ">"},
+                count=CFG.LOG_EVENTS_BATCH_SIZE,
+            )
+            entries = response[0][1] if response else []
+
+        if not entries:
+            break
+
+        try:
+            inserted, dead_letters = _insert_stream_entries(redis_client, entries)
+        except Exception as err:
+            # E.g. db is not available - entries stay pending and are claimed later
+            db.session.rollback()
+            logger.error("Log events insert failed. Error: {}", err)
+            break
+        total_inserted += inserted
+        total_dead_letters += dead_letters
+
+        entries_ids = [entry_id for entry_id, _ in entries]
+
+        redis_client.xack(LOG_EVENTS_STREAM, LOG_EVENTS_GROUP, *entries_ids)
+        redis_client.xdel(LOG_EVENTS_STREAM, *entries_ids)
+
+    duration = time.monotonic() - started_at
+    metrics = get_log_events_stream_metrics()
+    metrics.update(
+        last_run_at=datetime.utcnow().isoformat(),
+        last_run_inserted=total_inserted,
+        last_run_dead_letters=total_dead_letters,
+        last_run_seconds=round(duration, 3),
+        last_run_throughput=round(total_inserted / duration, 1) if duration else 0,
+    )
+    pipe = redis_client.pipeline()
+    pipe.hset(
+        LOG_EVENTS_METRICS,
+        mapping={
+            key: value
+            for key, value in metrics.items()
+            if key not in ("lag", "pending", "inserted_total")
+        },
+    )
+    pipe.hincrby(LOG_EVENTS_METRICS, "inserted_total", total_inserted)
+    pipe.execute()
+
+    logger.info(
+        "Log events stream drained: inserted [{}] in [{}s] ({} events/s), lag [{}], pending [{}]",
+        total_inserted,
+        metrics["last_run_seconds"],
+        metrics["last_run_throughput"],
+        metrics["lag"],
+        metrics["pending"],
+    )
+
+    return total_inserted
+
+
+def drain_log_events_lag():
+    """Insert all the log events waiting in the stream before reading log events from the db
+    (e.g. for the backup logs replay)
+
+    Raises:
+        LogEventsLagError: some events are still not inserted (pending or db errors)
+    """
+    if not get_redis():
+        return
+
+    drain_log_events_stream()
+    metrics = get_log_events_stream_metrics()
+    if int(metrics["lag"]) or int(metrics["pending"]):
+        raise LogEventsLagError(
+            f"Log events stream has [{metrics['lag']}] new and [{metrics['pending']}] "
+            "pending events. Try again when they are inserted."
+        )
+
+
+def get_log_events_stream_metrics() -> dict:
+    """Log events stream consumer metrics
+
+    Returns:
+        dict: lag (entries not delivered to consumers yet), pending (delivered but not acknowledged),
+            inserted_total and the last run stats
+    """
+    redis_client = get_redis()
+    if not redis_client:
+        return {}
+
+    _ensure_log_events_group(redis_client)
+
+    group_info = next(
+        (
+            group
+            for group in redis_client.xinfo_groups(LOG_EVENTS_STREAM)
+            if group["name"] == LOG_EVENTS_GROUP
+        ),
+        {},
+    )
+    stream_length = redis_client.xlen(LOG_EVENTS_STREAM)
+    pending = group_info.get("pending", 0)
+
+    metrics = redis_client.hgetall(LOG_EVENTS_METRICS)
+    metrics.update(
+        # "lag" is reported by Redis 7+, otherwise approximate it with the stream length
+        lag=group_info.get("lag")
+        if group_info.get("lag") is not None
+        else max(stream_length - pending, 0),
+        pending=pending,
+    )
+    metrics.setdefault("inserted_total", 0)
+
+    return metrics
+
+
 def gen_fake_backup_download_logs(computer: Computer, time_period: timedelta):
     """Generate fake backup logs for computer
 
@@ -1,77 +1,141 @@
 from datetime import datetime, timedelta
 
+from sqlalchemy import func, select
+
+from app import db
 from app.models import (
     Company,
     Location,
     Computer,
-    ComputerStatus,
     DeviceRole,
     LocationStatus,
 )
+from app.controllers.heartbeat_buffer import flush_heartbeats
+from app.controllers.dashboard import update_dashboard_snapshots
+from app.utils import bulk_update
 from app.logger import logger
 
 from config import BaseConfig as CFG
 
 
-def update_companies_locations_statistic():
+def _computers_counters(group_by, online_since: datetime) -> dict[int, tuple]:
+    """Computers counters grouped by company or location id (one query)
+
+    Returns:
+        dict[int, tuple]: id -> (activated computers, online, online primary)
+    """
+    online = Computer.last_download_time >= online_since
+    return {
+        row[0]: row[1:]
+        for row in db.session.execute(
+            select(
+                group_by,
+                func.count(),
+                func.count().filter(online),
+                func.count().filter(
+                    online, Computer.device_role == DeviceRole.PRIMARY.value
+                ),
+            )
+            .where(
+                group_by.is_not(None),
+                Computer.is_deleted.is_(False),
+                Computer.activated.is_(True),
+            )
+            .group_by(group_by)
+        )
+    }
+
+
+def update_companies_locations_statistic() -> int:
+    """Update computers counters of all companies and locations, locations statuses
+    and the dashboard snapshots. Counters are computed by a few aggregate queries
+    and only changed rows are updated, in one transaction
+
+    Returns:
+        int: number of updated companies and locations
+    """
     logger.info("<-----Start Updating Companies and Locations statistics----->")
 
+    # Write buffered heartbeats to db so the statistics use actual computers times
+    flush_heartbeats()
+
     current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+    online_since = current_east_time - timedelta(hours=1, minutes=30)
 
     # NOTE Update number of Locations and Computers in Companies
-    companies = Company.query.all()
-
-    for company in companies:
-        company.locations_per_company = len(company.locations)
-        company.total_computers = company.total_computers_counter
-
-        offline_company_computers = company.total_offline_computers
-        online_company_computers = Computer.query.filter(
-            Computer.company_id == company.id,
-            Computer.status == ComputerStatus.ONLINE.value,
-        ).count()
-
-        company.computers_online = online_company_computers
-        company.computers_offline = offline_company_computers
-
-        company.update()
+    company_computers = _computers_counters(Computer.company_id, online_since)
+    company_locations = dict(
+        db.session.execute(
+            select(Location.company_id, func.count())
+            .where(Location.is_deleted.is_(False))
+            .group_by(Location.company_id)
+        ).all()
+    )
+
+    companies_rows = []
+    for company in db.session.execute(
+        select(
+            Company.id,
+            Company.locations_per_company,
+            Company.total_computers,
+            Company.computers_online,
+            Company.computers_offline,
+        ).where(Company.is_deleted.is_(False))
+    ):
+        total, online, _ = company_computers.get(company.id, (0, 0, 0))
+        values = dict(
+            locations_per_company=company_locations.get(company.id, 0),
+            total_computers=total,
+            computers_online=online,
+            computers_offline=total - online,
+        )
+        if any(getattr(company, key) != value for key, value in values.items()):
+            companies_rows.append(dict(values, row_id=company.id))
 
     # NOTE Update number of Computers in Locations and status of Locations
-    locations = Location.query.all()
-
-    for location in locations:
-        location.computers_per_location = location.total_computers
-
-        online_location_computers = Computer.query.filter(
-            Computer.location_id == location.id,
-            Computer.activated.is_(True),
-            Computer.last_download_time.is_not(None),
-            Computer.last_download_time
-            >= current_east_time - timedelta(hours=1, minutes=30),
-        ).count()
-        online_primary_computers = Computer.query.filter(
-            Computer.location_id == location.id,
-            Computer.activated.is_(True),
-            Computer.device_role == DeviceRole.PRIMARY.value,
-            Computer.last_download_time.is_not(None),
-            Computer.last_download_time
-            >= current_east_time - timedelta(hours=1, minutes=30),
-        ).count()
-
-        offline_location_computers = location.total_computers_offline
-
-        location.computers_online = online_location_computers
-        location.computers_offline = offline_location_computers
+    location_computers = _computers_counters(Computer.location_id, online_since)
+
+    locations_rows = []
+    for location in db.session.execute(
+        select(
+            Location.id,
+            Location.activated,
+            Location.status,
+            Location.computers_per_location,
+            Location.computers_online,
+            Location.computers_offline,
+        ).where(Location.is_deleted.is_(False))
+    ):
+        total, online, online_primary = location_computers.get(location.id, (0, 0, 0))
 
         if not location.activated:
-            location.status = None
-        elif online_primary_computers:
-            location.status = LocationStatus.ONLINE
-        elif online_location_computers:
-            location.status = LocationStatus.ONLINE_PRIMARY_OFFLINE
+            status = None
+        elif online_primary:
+            status = LocationStatus.ONLINE
+        elif online:
+            status = LocationStatus.ONLINE_PRIMARY_OFFLINE
         else:
-            location.status = LocationStatus.OFFLINE
-
-        location.update()
-
-    logger.info("<-----Finish Updating Companies and Locations statistics----->")
+            status = LocationStatus.OFFLINE
+
+        values = dict(
+            status=status,
+            computers_per_location=total,
+            computers_online=online,
+            computers_offline=total - online,
+        )
+        if any(getattr(location, key) != value for key, value in values.items()):
+            locations_rows.append(dict(values, row_id=location.id))
+
+    bulk_update(Company.__table__, companies_rows, "row_id")
+    bulk_update(Location.__table__, locations_rows, "row_id")
+    # Snapshots use the updated locations statuses
+    update_dashboard_snapshots(online_since)
+    db.session.commit()
+
+    logger.info(
+        "<-----Finish Updating Companies and Locations statistics: {} companies, {} locations updated----->",
+        len(companies_rows),
+        len(locations_rows),
+    )
+
+    return len(companies_rows) + len(locations_rows)
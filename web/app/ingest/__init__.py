@@ -0,0 +1,78 @@
+import contextlib
+
+import redis.asyncio as aioredis
+from anyio import CapacityLimiter
+from flask import Flask
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.ingest.database import create_engine
+from app.ingest.endpoints import (
+    last_time,
+    download_status,
+    files_checksum,
+    printer_info,
+    special_status,
+)
+from app.logger import logger
+
+from config import BaseConfig as CFG
+
+
+async def handle_server_error(request: Request, exc: Exception) -> JSONResponse:
+    logger.exception("Agent request {} failed. Error: {}", request.url.path, exc)
+    return JSONResponse(dict(status="fail", message="Internal server error"), 500)
+
+
+def create_ingest_app(flask_app: Flask | None = None) -> Starlette:
+    """ASGI app for the agent telemetry endpoints. Deployed next to the Flask app,
+    so agent traffic doesn't compete with admin pages for the sync workers.
+
+    Requests are validated with the same schemas and computers are resolved with the async
+    database pool (or the shared identity cache). Changes are made by the same controllers
+    as in the Flask api, in a limited number of worker threads.
+
+    Args:
+        flask_app (Flask | None, optional): Flask app providing config and db session.
+            Defaults to None (new app is created).
+
+    Returns:
+        Starlette: ASGI app
+    """
+    if flask_app is None:
+        from app import create_app
+
+        flask_app = create_app()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        app.state.flask_app = flask_app
+        app.state.engine = create_engine(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+        app.state.redis = (
+            aioredis.from_url(CFG.REDIS_URL, decode_responses=True)
+            if CFG.REDIS_URL
+            else None
+        )
+        app.state.limiter = CapacityLimiter(CFG.INGEST_SYNC_WORKERS)
+
+        yield
+
+        await app.state.engine.dispose()
+        if app.state.redis:
+            await app.state.redis.close()
+
+    routes = [
+        Route("/last_time", last_time, methods=["POST"]),
+        Route("/download_status", download_status, methods=["POST"]),
+        Route("/files_checksum", files_checksum, methods=["POST"]),
+        Route("/printer_info", printer_info, methods=["POST"]),
+        Route("/special_status", special_status, methods=["POST"]),
+    ]
+
+    return Starlette(
+        routes=routes,
+        lifespan=lifespan,
+        exception_handlers={Exception: handle_server_error},
+    )
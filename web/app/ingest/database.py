@@ -0,0 +1,130 @@
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.models import Computer
+from app.schema import ComputerIdentity
+from app.controllers.computer_identity import IDENTITY_KEY
+
+from config import BaseConfig as CFG
+
+
+# Sync database url scheme -> async driver
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_uri(database_uri: str) -> str:
+    """Same database url with the async driver
+
+    Args:
+        database_uri (str): SQLALCHEMY_DATABASE_URI of the Flask app
+
+    Raises:
+        ValueError: if there is no async driver for the database
+
+    Returns:
+        str: database url for the async engine
+    """
+    scheme, address = database_uri.split("://", 1)
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if not driver:
+        raise ValueError(f"Async driver for {scheme} database is not supported")
+
+    return f"{driver}://{address}"
+
+
+def create_engine(database_uri: str) -> AsyncEngine:
+    """Async engine with connections pool shared by the ingestion app requests"""
+    async_database_uri = get_async_database_uri(database_uri)
+    if async_database_uri.startswith("sqlite"):
+        return create_async_engine(async_database_uri)
+
+    return create_async_engine(
+        async_database_uri,
+        pool_size=CFG.INGEST_DATABASE_POOL_SIZE,
+        pool_pre_ping=True,
+    )
+
+
+async def find_agent_identity(
+    engine: AsyncEngine,
+    redis_client: aioredis.Redis | None,
+    identifier_key: str | None,
+    computer_name: str | None = None,
+    match_name: bool = False,
+) -> tuple[ComputerIdentity | None, bool]:
+    """Async version of find_agent_computer(): resolves the agent to the computer identity.
+    Uses the same identity cache as the Flask app, so repeated agent calls don't query the database
+
+    Args:
+        engine (AsyncEngine): async engine
+        redis_client (aioredis.Redis | None): async Redis client (None if Redis is not configured)
+        identifier_key (str | None): computer identifier key
+        computer_name (str | None, optional): computer name. Defaults to None.
+        match_name (bool, optional): computer must match both identifier_key and name.
+            Defaults to False.
+
+    Returns:
+        tuple[ComputerIdentity | None, bool]: identity, computer with such name exists
+    """
+    if identifier_key and redis_client and not match_name:
+        data = await redis_client.get(IDENTITY_KEY.format(identifier_key))
+        if data:
+            return ComputerIdentity.parse_raw(data), True
+
+    if not identifier_key and not computer_name:
+        return None, False
+
+    columns = (
+        Computer.id,
+        Computer.identifier_key,
+        Computer.computer_name,
+        Computer.activated,
+        Computer.logs_enabled,
+        Computer.location_id,
+        Computer.msi_version,
+    )
+
+    # One row by each index: unregistered agents share identifier_key "new_computer"
+    row = None
+    name_exists = False
+    async with engine.connect() as conn:
+        if identifier_key:
+            stmt = select(*columns).where(
+                Computer.is_deleted.is_(False),
+                Computer.identifier_key == identifier_key,
+            )
+            if match_name:
+                stmt = stmt.where(Computer.computer_name == computer_name)
+            row = (await conn.execute(stmt.limit(1))).first()
+
+        if row and row.computer_name == computer_name:
+            name_exists = True
+        elif computer_name:
+            stmt = select(Computer.id).where(
+                Computer.is_deleted.is_(False), Computer.computer_name == computer_name
+            )
+            name_exists = (await conn.execute(stmt.limit(1))).first() is not None
+
+    if not row:
+        return None, name_exists
+
+    identity = ComputerIdentity(
+        computer_id=row.id,
+        activated=row.activated,
+        logs_enabled=row.logs_enabled,
+        location_id=row.location_id,
+        msi_version=row.msi_version,
+    )
+    if redis_client:
+        await redis_client.set(
+            IDENTITY_KEY.format(identifier_key),
+            identity.json(),
+            ex=CFG.COMPUTER_IDENTITY_CACHE_TTL,
+        )
+
+    return identity, name_exists
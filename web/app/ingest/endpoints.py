@@ -0,0 +1,233 @@
+from typing import Callable, Type
+
+from pydantic import BaseModel, ValidationError
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app import db
+from app.models import Computer
+from app.schema import (
+    LastTime,
+    DownloadStatus,
+    FilesChecksum,
+    PrinterInfo,
+    ComputerSpecialStatus,
+)
+from app.api.computer import update_special_status
+from app.api.downloads_info import (
+    get_compstat_data,
+    record_heartbeat,
+    update_computer_files_checksum,
+    update_download_status,
+    update_printer_info,
+)
+from app.ingest.database import find_agent_identity
+from app.ingest.unit_of_work import run_unit_of_work
+from app.logger import logger
+
+
+COMPUTER_NOT_FOUND = "Wrong request data. Computer not found."
+
+
+async def _parse_body(
+    request: Request, schema: Type[BaseModel]
+) -> tuple[BaseModel | None, JSONResponse | None]:
+    """Validate request body with the same schema as the Flask api does"""
+    try:
+        return schema.parse_obj(await request.json()), None
+    except ValidationError as err:
+        return None, JSONResponse(err.errors(), 422)
+    except ValueError as err:
+        return None, JSONResponse(
+            [{"loc": ["body"], "msg": str(err), "type": "value_error.jsondecode"}],
+            422,
+        )
+
+
+def _get_computer_ip(request: Request) -> str | None:
+    return request.headers.get(
+        "X-Forwarded-For", request.client.host if request.client else None
+    )
+
+
+def _get_computer(computer_id: int) -> Computer | None:
+    computer: Computer | None = db.session.get(Computer, computer_id)
+    return computer if computer and not computer.is_deleted else None
+
+
+async def _run(request: Request, func: Callable, *args) -> JSONResponse:
+    data, status_code = await run_unit_of_work(
+        request.app.state.flask_app, request.app.state.limiter, func, *args
+    )
+    return JSONResponse(data, status_code)
+
+
+def _last_time(computer_id: int, body: LastTime, computer_ip: str | None):
+    computer = _get_computer(computer_id)
+    if not computer:
+        return dict(status="fail", message=COMPUTER_NOT_FOUND, rmcreds="rmcreds"), 400
+
+    record_heartbeat(computer, bool(body.last_download_time), computer_ip)
+
+    return (
+        dict(
+            status="success",
+            message="Writing time to db",
+            **get_compstat_data(computer),
+        ),
+        200,
+    )
+
+
+async def last_time(request: Request) -> JSONResponse:
+    body, error = await _parse_body(request, LastTime)
+    if error:
+        return error
+
+    identity, name_exists = await find_agent_identity(
+        request.app.state.engine,
+        request.app.state.redis,
+        body.identifier_key,
+        body.computer_name,
+    )
+
+    if identity:
+        return await _run(
+            request, _last_time, identity.computer_id, body, _get_computer_ip(request)
+        )
+
+    elif name_exists:
+        message = "Wrong id."
+        logger.info(
+            "Last download/online time update failed. computer: {}, id {}. Reason: {}",
+            body.computer_name,
+            body.identifier_key,
+            message,
+        )
+        return JSONResponse(dict(status="fail", message=message), 400)
+
+    logger.info(
+        "Last download/online time update failed. computer: {}, id {}. \
+        Reason: {}. Removing local credentials.",
+        body.computer_name,
+        body.identifier_key,
+        COMPUTER_NOT_FOUND,
+    )
+    return JSONResponse(
+        dict(status="fail", message=COMPUTER_NOT_FOUND, rmcreds="rmcreds"), 400
+    )
+
+
+def _download_status(computer_id: int, body: DownloadStatus):
+    computer = _get_computer(computer_id)
+    if not computer:
+        return dict(status="fail", message=COMPUTER_NOT_FOUND), 400
+
+    update_download_status(computer, body)
+
+    return dict(status="success", message="Writing download status to db"), 200
+
+
+async def download_status(request: Request) -> JSONResponse:
+    body, error = await _parse_body(request, DownloadStatus)
+    if error:
+        return error
+
+    identity, _ = await find_agent_identity(
+        request.app.state.engine, request.app.state.redis, body.identifier_key
+    )
+
+    if identity:
+        return await _run(request, _download_status, identity.computer_id, body)
+
+    logger.info(
+        "Download status update failed. company_name: {}, location {}. Reason: {}",
+        body.company_name,
+        body.location_name,
+        COMPUTER_NOT_FOUND,
+    )
+    return JSONResponse(dict(status="fail", message=COMPUTER_NOT_FOUND), 400)
+
+
+def _files_checksum(computer_id: int, body: FilesChecksum):
+    computer = _get_computer(computer_id)
+    if not computer:
+        return dict(status="fail", message=COMPUTER_NOT_FOUND), 400
+
+    return update_computer_files_checksum(computer, body)
+
+
+async def files_checksum(request: Request) -> JSONResponse:
+    body, error = await _parse_body(request, FilesChecksum)
+    if error:
+        return error
+
+    identity, _ = await find_agent_identity(
+        request.app.state.engine, request.app.state.redis, body.identifier_key
+    )
+
+    if identity:
+        return await _run(request, _files_checksum, identity.computer_id, body)
+
+    logger.info(f"Files checksum update failed. Reason: {COMPUTER_NOT_FOUND}")
+    return JSONResponse(dict(status="fail", message=COMPUTER_NOT_FOUND), 400)
+
+
+def _printer_info(computer_id: int, body: PrinterInfo):
+    computer = _get_computer(computer_id)
+    if not computer:
+        return dict(status="fail", message=COMPUTER_NOT_FOUND), 400
+
+    update_printer_info(computer, body.printer_info)
+
+    return dict(status="success", message="Writing printer info to db"), 200
+
+
+async def printer_info(request: Request) -> JSONResponse:
+    body, error = await _parse_body(request, PrinterInfo)
+    if error:
+        return error
+
+    identity, _ = await find_agent_identity(
+        request.app.state.engine, request.app.state.redis, body.identifier_key
+    )
+
+    if identity:
+        return await _run(request, _printer_info, identity.computer_id, body)
+
+    logger.info(f"Printer info update failed. Reason: {COMPUTER_NOT_FOUND}")
+    return JSONResponse(dict(status="fail", message=COMPUTER_NOT_FOUND), 400)
+
+
+def _special_status(computer_id: int, body: ComputerSpecialStatus):
+    computer = _get_computer(computer_id)
+    if not computer:
+        return dict(status="fail", message=COMPUTER_NOT_FOUND), 404
+
+    update_special_status(computer, body.special_status)
+
+    return dict(status="success"), 200
+
+
+async def special_status(request: Request) -> JSONResponse:
+    body, error = await _parse_body(request, ComputerSpecialStatus)
+    if error:
+        return error
+
+    identity, _ = await find_agent_identity(
+        request.app.state.engine,
+        request.app.state.redis,
+        body.identifier_key,
+        body.computer_name,
+        match_name=True,
+    )
+
+    if identity:
+        return await _run(request, _special_status, identity.computer_id, body)
+
+    message = (
+        f"Computer with such identifier_key: {body.identifier_key} "
+        f"and computer_name: {body.computer_name} doesn't exist"
+    )
+    logger.info("Computer special status failed. Reason: {}", message)
+    return JSONResponse(dict(status="fail", message=message), 404)
@@ -0,0 +1,46 @@
+from typing import Callable
+
+from anyio import CapacityLimiter, to_thread
+from flask import Flask, g
+
+from app import db
+
+
+async def run_unit_of_work(
+    flask_app: Flask,
+    limiter: CapacityLimiter,
+    func: Callable[..., tuple[dict, int]],
+    *args,
+) -> tuple[dict, int]:
+    """Run sync controllers logic in a worker thread inside the Flask app context.
+    Same as BlueprintApi unit of work: one commit per request, rollback on error responses.
+    Writes use the sync Flask-SQLAlchemy session (not the async engine), so the number of
+    concurrent writes is limited by the limiter capacity and the sync pool size
+
+    Args:
+        flask_app (Flask): Flask app (provides db session and config)
+        limiter (CapacityLimiter): limits number of concurrently running units of work
+        func (Callable[..., tuple[dict, int]]): function returning response data and status code
+
+    Returns:
+        tuple[dict, int]: response data and status code
+    """
+
+    def run() -> tuple[dict, int]:
+        with flask_app.app_context():
+            g.unit_of_work = True
+            try:
+                data, status_code = func(*args)
+                if status_code >= 400:
+                    db.session.rollback()
+                else:
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                g.unit_of_work = False
+
+        return data, status_code
+
+    return await to_thread.run_sync(run, limiter=limiter)
@@ -7,7 +7,10 @@ from .desktop_client import DesktopClient, DesktopClientView
 from .client_version import ClientVersion, ClientVersionView
 from .pcc_access_token import PCCAccessToken
 from .log_event import LogEvent, LogType
-from .backup_log import BackupLog, BackupLogType
+from .backup_log import BackupLog, BackupLogType, BackupLogError
+from .computer_availability import ComputerAvailability
+from .computer_daily_uptime import ComputerDailyUptime
+from .dashboard_snapshot import DashboardSnapshot
 from .utils import count
 from .system_log import SystemLog, SystemLogType
 from .pcc_creation_report import PCCCreationReport, CreationReportStatus
@@ -15,6 +18,7 @@ from .pcc_activations_scan import PCCActivationsScan, ScanStatus
 from .pcc_daily_request import PCCDailyRequest
 from .location_group import LocationGroup, LocationGroupView
 from .download_backup_call import DownloadBackupCall
+from .computer_file_checksum import ComputerFileChecksum
 from .alert_event import AlertEvent, AlertEventType
 from .telemetry_settings import TelemetrySettings
 from .computer_settings_link_table import ComputerSettingsLinkTable
@@ -14,6 +14,11 @@ class BackupLogType(enum.Enum):
     NO_DOWNLOADS_PERIOD = "NO_DOWNLOADS_PERIOD"
 
 
+class BackupLogError(enum.Enum):
+    ONE_HOUR = "Longer than 1 hour without a backup"
+    TWO_HOURS = "Longer than 2 hours without a backup"
+
+
 class BackupLog(db.Model, ModelMixin):
     __tablename__ = "backup_logs"
 
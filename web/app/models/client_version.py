@@ -54,6 +54,16 @@ class ClientVersionView(RowActionListMixin, MyModelView):
         # otherwise whatever the inherited method returns
         return super().allow_row_action(action, model)
 
+    def after_model_change(self, form, model, is_created):
+        from app.controllers import invalidate_desktop_clients_cache
+
+        invalidate_desktop_clients_cache()
+
+    def after_model_delete(self, model):
+        from app.controllers import invalidate_desktop_clients_cache
+
+        invalidate_desktop_clients_cache()
+
     # list rows depending on current user permissions
     def get_query(self):
         if (
@@ -3,7 +3,7 @@ from copy import copy
 from zoneinfo import ZoneInfo
 from datetime import datetime, timedelta
 
-from sqlalchemy import JSON, or_, and_, sql, func, select, Enum, case
+from sqlalchemy import or_, and_, sql, func, select, Enum, case
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property, hybrid_method
 
@@ -21,6 +21,7 @@ from app.models.utils import (
     ActivatedMixin,
     SoftDeleteMixin,
     QueryWithSoftDelete,
+    commit_session,
 )
 from app.utils import MyModelView
 from app.logger import logger
@@ -102,14 +103,21 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
     download_status = db.Column(db.String(64))
     last_download_time = db.Column(db.DateTime)
     last_time_online = db.Column(db.DateTime)
-    identifier_key = db.Column(db.String(128), default="new_computer", nullable=False)
+    identifier_key = db.Column(
+        db.String(128), default="new_computer", nullable=False, index=True
+    )
 
     manager_host = db.Column(db.String(256), default=CFG.DEFAULT_MANAGER_HOST)
     # Place where backup file was downloaded last time (tempdir)
     last_downloaded = db.Column(db.String(256))
     # Place where backup file was saved last time (directory inside emar_backups.zip)
     last_saved_path = db.Column(db.String(256))
-    files_checksum = db.Column(JSON)
+    # Root digest of the computer files checksums (see ComputerFileChecksum)
+    files_checksum_digest = db.Column(db.String(64))
+    # Incremented when data supplied to the agent by get_credentials changes (used for ETag)
+    credentials_version = db.Column(
+        db.Integer, nullable=False, default=1, server_default=sql.text("1")
+    )
 
     logs_enabled = db.Column(db.Boolean, server_default=sql.true(), default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -127,6 +135,12 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
     )
     printer_status_timestamp = db.Column(db.DateTime, default=datetime.utcnow())
 
+    # Persisted status (see status) kept up to date by detect_status_transitions,
+    # status_deadline - EST time the status has to be checked again
+    current_status = db.Column(Enum(ComputerStatus), nullable=True, index=True)
+    status_changed_at = db.Column(db.DateTime)
+    status_deadline = db.Column(db.DateTime, index=True)
+
     company = relationship(
         "Company",
         back_populates="computers",
@@ -148,6 +162,18 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
 
     log_events = relationship("LogEvent", lazy="select")
 
+    files_checksums = relationship(
+        "ComputerFileChecksum",
+        lazy="select",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    # Last week summary (not mapped), see last_week_uptime
+    _last_week_uptime = None
+    # Status evaluated by load_computers_status (not mapped), see status
+    _evaluated_status = None
+
     def __repr__(self):
         return self.computer_name
 
@@ -171,7 +197,7 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
             "manager_host",
             "activated",
             "logs_enabled",
-            "files_checksum",
+            "files_checksum_digest",
             "identifier_key",
             "computer_ip",
         ]
@@ -185,7 +211,7 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
         self.is_deleted = True
         self.deleted_at = datetime.utcnow()
         if commit:
-            db.session.commit()
+            commit_session()
         return self
 
     def restore(self):
@@ -206,9 +232,10 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
         self.download_status = None
         self.last_downloaded = None
         self.last_saved_path = None
-        self.files_checksum = "{}"
+        self.files_checksum_digest = None
+        self.files_checksums = []
         self.computer_ip = None
-        db.session.commit()
+        commit_session()
         return self
 
     def activate(self, commit: bool = True):
@@ -219,7 +246,7 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
         self.last_time_logs_enabled = datetime.utcnow()
 
         if commit:
-            db.session.commit()
+            commit_session()
         return self
 
     def deactivate(
@@ -232,7 +259,7 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
         self.last_time_logs_disabled = deactivated_at
 
         if commit:
-            db.session.commit()
+            commit_session()
         return self
 
     @hybrid_property
@@ -267,36 +294,21 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
 
     @hybrid_property
     def status(self) -> ComputerStatus:
-        current_east_time: datetime = CFG.offset_to_est(datetime.utcnow(), True)
-
-        # Not activated status
-        if not self.activated:
-            return ComputerStatus.NOT_ACTIVATED
-        # If computer downloaded backup less than 1 hour ago - it is ONLINE
-        elif (
-            db.session.query(Computer)
-            .filter(
-                Computer.id == self.id,
-                Computer.last_download_time.is_not(None),
-                Computer.last_download_time
-                >= current_east_time - timedelta(hours=1, minutes=30),
-            )
-            .first()
-        ):
-            return ComputerStatus.ONLINE
-        # If computer downloaded backup more than 1 hour ago but was online less than 10 minutes ago - ONLINE_NO_BACKUP
-        elif (
-            db.session.query(Computer)
-            .filter(
-                Computer.id == self.id,
-                Computer.last_time_online.is_not(None),
-                Computer.last_time_online >= current_east_time - timedelta(minutes=10),
-            )
-            .first()
-        ):
-            return ComputerStatus.ONLINE_NO_BACKUP
-        else:
-            return ComputerStatus.OFFLINE_NO_BACKUP
+        # NOTE heartbeats from the write-behind buffer are not in the loaded attributes
+        # until they are flushed (see app.controllers.heartbeat_buffer).
+        # Pages get statuses (with the buffered heartbeats merged in) by load_computers_status()
+        if self._evaluated_status is not None:
+            return self._evaluated_status
+
+        from app.controllers import evaluate_status
+
+        status, _ = evaluate_status(
+            self.activated,
+            self.last_download_time,
+            self.last_time_online,
+            CFG.offset_to_est(datetime.utcnow(), True),
+        )
+        return status
 
     @status.expression
     def status(cls):
@@ -352,95 +364,61 @@ class Computer(db.Model, ModelMixin, SoftDeleteMixin, ActivatedMixin):
             else:
                 return (time - self.last_download_time).seconds // 3600
 
+    @property
+    def last_week_uptime(self):
+        """
+        Last week summary from the daily uptime rollup (app.controllers.daily_uptime).
+        Lists of computers get it with one query by load_last_week_uptime()
+
+        Returns:
+            WeekUptime: last week summary
+        """
+        if self._last_week_uptime is None:
+            from app.controllers import get_last_week_uptime
+
+            self._last_week_uptime = get_last_week_uptime([self.id])[self.id]
+
+        return self._last_week_uptime
+
+    @last_week_uptime.setter
+    def last_week_uptime(self, value):
+        self._last_week_uptime = value
+
     @hybrid_property
     def last_week_offline_occurrences(self) -> int:
-        from app.models.backup_log import BackupLog, BackupLogType
-
         """
         Returns number of occurrences offline in last week
 
         Returns:
             int: number of occurrences
         """
-        current_east_time: datetime = CFG.offset_to_est(datetime.utcnow(), True)
-
         # If computer backup logs disables - return None
         if not self.logs_enabled:
             return None
 
-        last_log: BackupLog = (
-            BackupLog.query.filter(
-                BackupLog.computer_id == self.id,
-            )
-            .order_by(BackupLog.end_time.desc())
-            .first()
-        )
-
-        # If computer doesn't have any logs or the last one older than 7 days - return 1
-        if not last_log or last_log.end_time < current_east_time - timedelta(days=7):
+        # If computer doesn't have any logs during the last week - return 1
+        if not self.last_week_uptime.logged:
             return 1
 
-        last_week_offline_logs: int = BackupLog.query.filter(
-            BackupLog.computer_id == self.id,
-            BackupLog.backup_log_type == BackupLogType.NO_DOWNLOADS_PERIOD,
-            BackupLog.end_time >= current_east_time - timedelta(days=7),
-        ).count()
-
-        return last_week_offline_logs
+        return self.last_week_uptime.offline_occurrences
 
     @hybrid_property
     def last_week_offline_time(self) -> timedelta:
-        from app.models.backup_log import BackupLog, BackupLogType
-
         """
         Returns summarized offline time during the last week (timedelta object)
 
         Returns:
             timedelta: summarized offline time
         """
-        current_east_time: datetime = CFG.offset_to_est(datetime.utcnow(), True)
-
         # If computer backup logs disables - return None
         if not self.logs_enabled:
             return None
 
-        last_log: BackupLog = (
-            BackupLog.query.filter(
-                BackupLog.computer_id == self.id,
-            )
-            .order_by(BackupLog.end_time.desc())
-            .first()
-        )
-
-        # If computer doesn't have any logs or the last one older than 7 days - 7 days timedelta
-        if not last_log or last_log.end_time < current_east_time - timedelta(days=7):
+        # If computer doesn't have any logs during the last week - 7 days timedelta
+        if not self.last_week_uptime.logged:
             return timedelta(days=7)
 
-        last_week_offline_logs: list[BackupLog] = (
-            BackupLog.query.filter(
-                BackupLog.computer_id == self.id,
-                BackupLog.backup_log_type == BackupLogType.NO_DOWNLOADS_PERIOD,
-                BackupLog.end_time >= current_east_time - timedelta(days=7),
-            )
-            .order_by(BackupLog.end_time.desc())
-            .all()
-        )
-
-        summarized_offline_time: timedelta = timedelta(seconds=0)
-
-        for log in last_week_offline_logs:
-            # If log is still in progress - end time is current time
-            if log == last_log:
-                log.end_time = current_east_time
-
-            if log.start_time < current_east_time - timedelta(days=7):
-                summarized_offline_time += log.end_time - (
-                    current_east_time - timedelta(days=7)
-                )
-            else:
-                summarized_offline_time += log.duration
-
-        return summarized_offline_time
+        return self.last_week_uptime.offline_time
 
     @hybrid_method
     def total_pcc_api_calls(
@@ -537,7 +515,7 @@ class ComputerView(RowActionListMixin, MyModelView):
         "manager_host",
         "last_downloaded",
         "last_saved_path",
-        "files_checksum",
+        "files_checksum_digest",
         "created_at",
         "computer_ip",
     )
@@ -548,9 +526,13 @@ class ComputerView(RowActionListMixin, MyModelView):
         "last_time_logs_enabled",
         "last_time_logs_disabled",
         "download_backup_calls",
+        "files_checksums",
         "is_deleted",
         "deleted_at",
         "deactivated_at",
+        "current_status",
+        "status_changed_at",
+        "status_deadline",
     )
 
     column_searchable_list = searchable_sortable_list
@@ -582,7 +564,7 @@ class ComputerView(RowActionListMixin, MyModelView):
         "computer_ip": {"readonly": True},
         "type": {"readonly": True},
         "sftp_port": {"readonly": True},
-        # "files_checksum": {"readonly": True},
+        # "files_checksum_digest": {"readonly": True},
     }
 
     # form_args control fields order. It is dict though...
@@ -607,7 +589,7 @@ class ComputerView(RowActionListMixin, MyModelView):
         "last_download_time": {"label": "Last download time"},
         "last_time_online": {"label": "Last time online"},
         "identifier_key": {"label": "Identifier key"},
-        "files_checksum": {"label": "Files checksum"},
+        "files_checksum_digest": {"label": "Files checksum digest"},
         "created_at": {"label": "Created at"},
         "computer_ip": {"label": "Computer IP"},
     }
@@ -1008,6 +990,17 @@ class ComputerView(RowActionListMixin, MyModelView):
         # Create system log that computer was deleted
         create_system_log(SystemLogType.COMPUTER_DELETED, model, current_user)
 
+    def get_list(self, *args, **kwargs):
+        count, data = super().get_list(*args, **kwargs)
+
+        # Statuses of the page computers with one current time
+        if isinstance(data, list):
+            from app.controllers import load_computers_status
+
+            load_computers_status(data)
+
+        return count, data
+
     def get_query(self):
         OBLIGATORY_VERSIONS = [
             ("stable", "stable"),
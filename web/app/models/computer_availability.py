@@ -0,0 +1,31 @@
+from app import db
+from app.models.utils import ModelMixin
+
+
+class ComputerAvailability(db.Model, ModelMixin):
+    """Computer backup periods of the day (UTC) as 24 hour slots.
+    Every mask is a bitmap of the day hours (bit N - hour N): green - with downloads,
+    yellow / red - without downloads longer than 1 / 2 hours. Hours out of all masks
+    have no backup periods (logs were disabled)
+    """
+
+    __tablename__ = "computer_availability"
+    __table_args__ = (db.UniqueConstraint("computer_id", "day"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    computer_id = db.Column(
+        db.Integer,
+        db.ForeignKey("computers.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    day = db.Column(db.Date, nullable=False)
+    green = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    yellow = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    red = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Notes of the last period without downloads of the day
+    notes = db.Column(db.String(128), server_default="", default="")
+
+    def __repr__(self):
+        return f"<{self.computer_id}: {self.day} {self.green:024b}/{self.yellow:024b}/{self.red:024b}>"
@@ -0,0 +1,47 @@
+from app import db
+from app.models.utils import ModelMixin
+
+
+class ComputerDailyUptime(db.Model, ModelMixin):
+    """Computer backup periods summary of the day (UTC). Hours based columns are derived
+    from the computer availability of the day, download errors are counted by the agent events
+    """
+
+    __tablename__ = "computer_daily_uptime"
+    __table_args__ = (db.UniqueConstraint("computer_id", "day"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    computer_id = db.Column(
+        db.Integer,
+        db.ForeignKey("computers.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    day = db.Column(db.Date, nullable=False)
+    online_seconds = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    offline_seconds = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    # Periods without downloads of the day (the one continued from the previous day included)
+    offline_occurrences = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    # Offline at the first / last hour of the day - the period continues over midnight
+    offline_at_start = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.false()
+    )
+    offline_at_end = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.false()
+    )
+    # Start of the first and end of the last hour with downloads
+    first_backup_at = db.Column(db.DateTime)
+    last_backup_at = db.Column(db.DateTime)
+    download_errors = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+
+    def __repr__(self):
+        return f"<{self.computer_id}: {self.day} offline {self.offline_seconds}s>"
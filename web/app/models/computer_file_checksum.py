@@ -0,0 +1,25 @@
+from app import db
+from app.models.utils import ModelMixin
+
+
+class ComputerFileChecksum(db.Model, ModelMixin):
+    """Checksum of one backup file on the computer SFTP (path -> checksum).
+    The whole set of the computer is summarized by Computer.files_checksum_digest
+    """
+
+    __tablename__ = "computer_file_checksums"
+    __table_args__ = (db.UniqueConstraint("computer_id", "path"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    computer_id = db.Column(
+        db.Integer,
+        db.ForeignKey("computers.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    path = db.Column(db.String(512), nullable=False)
+    checksum = db.Column(db.String(128), nullable=False)
+
+    def __repr__(self):
+        return f"<{self.computer_id}: {self.path} - {self.checksum}>"
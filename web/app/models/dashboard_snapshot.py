@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from app import db
+from app.models.utils import ModelMixin
+
+
+def _counter():
+    return db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+
+class DashboardSnapshot(db.Model, ModelMixin):
+    """Main page counters (see DashboardCounters) of the permission scope,
+    refreshed by the update_cl_stat task
+    """
+
+    __tablename__ = "dashboard_snapshot"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # "global", "company:<id>", "location_group:<id>" or "location:<id>"
+    scope = db.Column(db.String(64), nullable=False, unique=True)
+
+    # Locations with computers
+    total_locations = _counter()
+    activated_locations = _counter()
+    locations_offline = _counter()
+    locations_online = _counter()
+    locations_primary_offline = _counter()
+
+    total_computers = _counter()
+    activated_computers = _counter()
+    computers_online = _counter()
+    computers_offline = _counter()
+
+    activated_primary = _counter()
+    primary_online = _counter()
+    primary_offline = _counter()
+
+    activated_alternate = _counter()
+    alternate_online = _counter()
+    alternate_offline = _counter()
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<{self.scope}: {self.updated_at}>"
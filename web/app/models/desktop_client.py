@@ -74,7 +74,13 @@ class DesktopClientView(RowActionListMixin, MyModelView):
         "filename",
         "download",
     )
-    form_excluded_columns = ("mimetype", "size", "filename")
+    form_excluded_columns = (
+        "mimetype",
+        "size",
+        "filename",
+        "blob_sha256",
+        "blob_data",
+    )
 
     form_extra_fields = {
         "blob": BlobUploadField(
@@ -136,6 +142,16 @@ class DesktopClientView(RowActionListMixin, MyModelView):
         # otherwise whatever the inherited method returns
         return super().allow_row_action(action, model)
 
+    def after_model_change(self, form, model, is_created):
+        from app.controllers import invalidate_desktop_clients_cache
+
+        invalidate_desktop_clients_cache()
+
+    def after_model_delete(self, model):
+        from app.controllers import invalidate_desktop_clients_cache
+
+        invalidate_desktop_clients_cache()
+
     # list rows depending on current user permissions
     def get_query(self):
         # check permissions
@@ -2,26 +2,44 @@ from datetime import datetime
 
 from gettext import gettext
 
+from flask import g, has_app_context
 from werkzeug.datastructures import FileStorage
 from wtforms.validators import InputRequired
 from wtforms.widgets import FileInput
 from wtforms import ValidationError, fields
 from flask_sqlalchemy import BaseQuery
 import sqlalchemy as sa
+from sqlalchemy.orm import declared_attr, deferred
 
 from app import db
+from app.utils.blob_store import get_blob_path, read_blob, save_blob
+
+
+def in_unit_of_work() -> bool:
+    """Check if current request is handled as one unit of work (see BlueprintApi)"""
+    return has_app_context() and g.get("unit_of_work", False)
+
+
+def commit_session():
+    """Commit current session.
+    Inside request unit of work only flush changes - commit is done once when the request ends
+    """
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
 
 
 class ModelMixin(object):
     def save(self):
         # Save this model to the database.
         db.session.add(self)
-        db.session.commit()
+        commit_session()
         return self
 
     def update(self):
         # Update this model to the database.
-        db.session.commit()
+        commit_session()
         return self
 
 
@@ -33,7 +51,7 @@ class SoftDeleteMixin(object):
         # Soft delete this model from the database.
         self.is_deleted = True
         self.deleted_at = datetime.utcnow()
-        db.session.commit()
+        commit_session()
         return self
 
 
@@ -141,8 +159,31 @@ class BlobUploadField(fields.StringField):
 class BlobMixin(object):
     mimetype = db.Column(db.Unicode(length=255), nullable=False)
     filename = db.Column(db.Unicode(length=255), nullable=False)
-    blob = db.Column(db.LargeBinary(), nullable=False)
     size = db.Column(db.Integer, nullable=False)
+    # SHA-256 of the content. The content itself is kept in the blob store (see app.utils.blob_store)
+    blob_sha256 = db.Column(db.String(64), nullable=True)
+
+    @declared_attr
+    def blob_data(cls):
+        # NOTE legacy content column (moved to the blob store by migration). Deferred - never loaded
+        # with the row, so queries for metadata don't pull the file into memory
+        return deferred(db.Column("blob", db.LargeBinary(), nullable=True))
+
+    @property
+    def blob(self) -> bytes | None:
+        if self.blob_sha256:
+            return read_blob(self.blob_sha256)
+        return self.blob_data
+
+    @blob.setter
+    def blob(self, value: bytes):
+        self.blob_sha256 = save_blob(value)
+        self.blob_data = None
+
+    @property
+    def blob_path(self) -> str | None:
+        """Path of the content file in the blob store"""
+        return get_blob_path(self.blob_sha256) if self.blob_sha256 else None
 
 
 def count(query: sa.sql.selectable.Select) -> int:
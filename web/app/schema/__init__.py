@@ -7,8 +7,9 @@ from .computer import (
     ComputerSpecialStatus,
     ComputerInfo,
     ComputerRegInfoLid,
+    ComputerIdentity,
 )
-from .files_checksum import FilesChecksum
+from .files_checksum import FilesChecksum, FilesChecksumQuery
 from .load_msi import LoadMSI
 from .update_msi_version import UpdateMSIVersion
 from .two_legged_auth_result import TwoLeggedAuthResult
@@ -26,3 +27,9 @@ from .alert import ComputersByLocation
 from .location import LocationInfo
 from .printer_info import PrinterInfoDict, PrinterInfo
 from .agent_telemetry import AgentTelemetry, TelemetryRequestId
+from .heartbeat import HeartbeatRecord
+from .agent_sync import AgentSync, AgentSyncDownloadStatus
+from .agent_schedule import AgentSlots
+from .backup_period import BackupEvent, BackupEventType, BackupPeriod
+from .availability import Availability, AvailabilityChart, WeekUptime
+from .dashboard import DashboardCounters
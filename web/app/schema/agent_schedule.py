@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class AgentSlots(BaseModel):
+    # Offsets (seconds) from the heartbeat period and the hour start
+    heartbeat_slot: int
+    download_slot: int
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+from .printer_info import PrinterInfoDict
+
+
+class AgentSyncDownloadStatus(BaseModel):
+    download_status: str
+    last_downloaded: Optional[str]
+    last_saved_path: Optional[str]
+    error_message: Optional[str]
+
+
+class AgentSync(BaseModel):
+    computer_name: Optional[str]
+    identifier_key: str
+    last_time_online: datetime
+    last_download_time: Optional[datetime]
+    printer_info: Optional[PrinterInfoDict]
+    special_status: Optional[str]
+    download_status: Optional[AgentSyncDownloadStatus]
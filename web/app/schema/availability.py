@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from pydantic import BaseModel
+
+
+class Availability(BaseModel):
+    """Computer backup periods by hours. Masks are bitmaps (bit N - hour N from start_time)"""
+
+    # UTC, start of the first hour
+    start_time: datetime
+    hours: int
+    green: int = 0
+    yellow: int = 0
+    red: int = 0
+    # Notes of the period without downloads for every hour
+    notes: list[str] = []
+
+    @property
+    def offline(self) -> int:
+        return self.yellow | self.red
+
+    @property
+    def logged(self) -> int:
+        return self.green | self.yellow | self.red
+
+    @property
+    def online_hours(self) -> int:
+        return self.green.bit_count()
+
+    @property
+    def offline_hours(self) -> int:
+        return self.offline.bit_count()
+
+    @property
+    def offline_periods(self) -> int:
+        # Every offline period starts with an offline hour after an online (or not logged) one
+        return (self.offline & ~(self.offline << 1)).bit_count()
+
+    @property
+    def uptime(self) -> float | None:
+        """Percent of the logged hours with downloads (None - no backup periods)"""
+        logged_hours = self.logged.bit_count()
+        if not logged_hours:
+            return None
+        return self.online_hours / logged_hours * 100
+
+    def series(self, mask: int) -> list[int | None]:
+        """Chart data: 1 for the hours of the mask, None for others"""
+        bits = f"{mask:0{self.hours}b}"[::-1] if self.hours else ""
+        return [1 if bit == "1" else None for bit in bits]
+
+
+class AvailabilityChart(BaseModel):
+    """Computer info chart data. Every bar is a bucket of bucket_hours hours,
+    colors values are parts of the bucket hours (1 - whole bucket, None - no hours)
+    """
+
+    # Eastern time of the buckets starts
+    labels: list[str]
+    bucket_hours: int
+    green: list[float | None]
+    yellow: list[float | None]
+    red: list[float | None]
+    # Notes of the first offline hour of the bucket
+    notes: list[str]
+    uptime: float | None
+    offline_hours: int
+    offline_periods: int
+
+
+class WeekUptime(BaseModel):
+    """Computer backup periods summary of the last week (from the daily uptime rollup)"""
+
+    # There are backup periods in the last week
+    logged: bool = False
+    offline_occurrences: int = 0
+    offline_time: timedelta = timedelta(0)
+    online_time: timedelta = timedelta(0)
+    download_errors: int = 0
+    first_backup_at: datetime | None = None
+    last_backup_at: datetime | None = None
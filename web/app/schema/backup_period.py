@@ -0,0 +1,31 @@
+import enum
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.models.backup_log import BackupLogType
+
+
+class BackupEventType(enum.Enum):
+    DOWNLOAD_SUCCESS = "DOWNLOAD_SUCCESS"
+    DOWNLOAD_ERROR = "DOWNLOAD_ERROR"
+    # No download (or error) up to this time - periodic sweep
+    SWEEP = "SWEEP"
+
+
+class BackupEvent(BaseModel):
+    event_type: BackupEventType
+    # UTC
+    time: datetime
+    # Download error message (stored in the period notes)
+    message: str = ""
+
+
+class BackupPeriod(BaseModel):
+    # BackupLog id (None - new period)
+    id: int | None = None
+    backup_log_type: BackupLogType
+    start_time: datetime
+    end_time: datetime
+    error: str = ""
+    notes: str = ""
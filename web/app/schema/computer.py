@@ -47,3 +47,11 @@ class ComputerSpecialStatus(BaseModel):
     identifier_key: str
     computer_name: str
     special_status: str
+
+
+class ComputerIdentity(BaseModel):
+    computer_id: int
+    activated: bool | None
+    logs_enabled: bool | None
+    location_id: int | None
+    msi_version: str | None
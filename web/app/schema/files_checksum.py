@@ -5,4 +5,13 @@ from pydantic import BaseModel
 class FilesChecksum(BaseModel):
     last_time_online: datetime
     identifier_key: str
-    files_checksum: dict
+    # Full set path -> checksum
+    files_checksum: dict[str, str] | None = None
+    # Delta against the set with the base_digest root digest
+    changed: dict[str, str] | None = None
+    removed: list[str] | None = None
+    base_digest: str | None = None
+
+
+class FilesChecksumQuery(BaseModel):
+    identifier_key: str
@@ -4,3 +4,5 @@ from pydantic import BaseModel
 class GetCredentials(BaseModel):
     computer_name: str
     identifier_key: str
+    # Agents which compare files_checksum_digest first don't need the whole files checksum
+    with_files_checksum: bool = True
@@ -0,0 +1,9 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class HeartbeatRecord(BaseModel):
+    computer_id: int
+    computer_ip: str | None
+    last_time_online: datetime | None
+    last_download_time: datetime | None
@@ -5,3 +5,7 @@ from .utils import (
     get_base64_string,
     update_report_data,
 )
+from .redis_client import get_redis
+from .cache import cached_json, delete_cached
+from .bulk_update import bulk_update
+from .blob_store import get_blob_path, save_blob, read_blob
@@ -0,0 +1,64 @@
+import os
+import hashlib
+import tempfile
+
+from config import BaseConfig as CFG
+
+
+def get_blob_path(sha256: str) -> str:
+    """Path of the blob in the content-addressed blob store
+
+    Args:
+        sha256 (str): blob SHA-256 hex digest
+
+    Returns:
+        str: <BLOB_STORE_DIR>/<2 first chars>/<digest>
+    """
+    return os.path.join(CFG.BLOB_STORE_DIR, sha256[:2], sha256)
+
+
+def save_blob(data: bytes) -> str:
+    """Save blob to the blob store. Blob with the same content is stored only once
+
+    Args:
+        data (bytes): blob content
+
+    Returns:
+        str: blob SHA-256 hex digest (key in the blob store)
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = get_blob_path(sha256)
+
+    if os.path.exists(path):
+        return sha256
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to temp file and rename - readers never see partially written blob
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return sha256
+
+
+def read_blob(sha256: str) -> bytes:
+    """Read blob from the blob store
+
+    Args:
+        sha256 (str): blob SHA-256 hex digest
+
+    Raises:
+        FileNotFoundError: if there is no such blob in the store
+
+    Returns:
+        bytes: blob content
+    """
+    with open(get_blob_path(sha256), "rb") as blob_file:
+        return blob_file.read()
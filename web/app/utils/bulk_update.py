@@ -0,0 +1,23 @@
+from sqlalchemy import Table, bindparam, update
+
+
+def bulk_update(table: Table, rows: list[dict], id_param: str):
+    """Update table rows by id with one executemany UPDATE per set of columns.
+    SET columns are taken from the rows
+
+    Args:
+        table (Table): table
+        rows (list[dict]): column values and the row id (in id_param)
+        id_param (str): name of the row id in the rows (must not be a table column name)
+    """
+    from app import db
+
+    # Rows with different columns can't be updated by the same statement
+    rows_by_columns: dict[tuple, list[dict]] = {}
+    for row in rows:
+        rows_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+
+    for columns_rows in rows_by_columns.values():
+        db.session.execute(
+            update(table).where(table.c.id == bindparam(id_param)), columns_rows
+        )
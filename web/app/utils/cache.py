@@ -0,0 +1,80 @@
+import time
+import threading
+from typing import Callable
+
+from .redis_client import get_redis
+
+
+# In-process storage (used when REDIS_URL is not configured): key -> (expire at, json)
+_local_cache: dict[str, tuple[float, str]] = {}
+_local_lock = threading.Lock()
+# Expired values are dropped when the storage grows to this size
+_local_purge_size = 1024
+
+
+def _get_local(key: str) -> str | None:
+    with _local_lock:
+        expire_at, data = _local_cache.get(key, (0, None))
+        if data is not None and expire_at < time.monotonic():
+            del _local_cache[key]
+            return None
+        return data
+
+
+def _set_local(key: str, ttl: int, data: str):
+    global _local_purge_size
+
+    with _local_lock:
+        if len(_local_cache) >= _local_purge_size:
+            now = time.monotonic()
+            for expired_key in [
+                cached_key
+                for cached_key, (expire_at, _) in _local_cache.items()
+                if expire_at < now
+            ]:
+                del _local_cache[expired_key]
+            _local_purge_size = max(2 * len(_local_cache), 1024)
+        _local_cache[key] = (time.monotonic() + ttl, data)
+
+
+def cached_json(key: str, ttl: int, build: Callable[[], str | None]) -> str | None:
+    """JSON cached in Redis (or in process if Redis is not configured) for ttl seconds
+
+    Args:
+        key (str): cache key
+        ttl (int): seconds
+        build (Callable[[], str | None]): builds the JSON on cache miss (None is not cached)
+
+    Returns:
+        str | None: cached or built JSON
+    """
+    redis_client = get_redis()
+    data = redis_client.get(key) if redis_client else _get_local(key)
+    if data:
+        return data
+
+    data = build()
+    if data is None:
+        return None
+
+    if redis_client:
+        redis_client.set(key, data, ex=ttl)
+    else:
+        _set_local(key, ttl, data)
+
+    return data
+
+
+def delete_cached(*keys: str):
+    """Remove values cached by cached_json()"""
+    if not keys:
+        return
+
+    redis_client = get_redis()
+    if redis_client:
+        redis_client.delete(*keys)
+        return
+
+    with _local_lock:
+        for key in keys:
+            _local_cache.pop(key, None)
@@ -0,0 +1,18 @@
+from functools import lru_cache
+
+import redis
+
+from config import BaseConfig as CFG
+
+
+@lru_cache
+def get_redis() -> redis.Redis | None:
+    """Shared Redis client
+
+    Returns:
+        redis.Redis | None: client connected to CFG.REDIS_URL or None if Redis is not configured
+    """
+    if not CFG.REDIS_URL:
+        return None
+
+    return redis.Redis.from_url(CFG.REDIS_URL, decode_responses=True)
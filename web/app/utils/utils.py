@@ -1,19 +1,17 @@
 import base64
 
 
-def get_percentage(all_obj: list, perc_obj: list) -> float:
-    """Percentsge for index.html jinja variables calculated in app/views/main.py
+def get_percentage(total: int, part: int) -> float:
+    """Percentage for index.html jinja variables calculated in app/views/main.py
 
     Args:
-        all_obj (list): list of all sqla computer object
-        perc_obj (list): list of some sqla computer object based on some condition
+        total (int): number of all objects
+        part (int): number of objects based on some condition
 
     Returns:
-        int: Percentage for jinja variables
+        float: Percentage for jinja variables
     """
-    percentage: float = (
-        0 if len(all_obj) == 0 else round((len(perc_obj) / len(all_obj)) * 100, 1)
-    )
+    percentage: float = 0 if total == 0 else round((part / total) * 100, 1)
     return percentage
 
 
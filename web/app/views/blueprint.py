@@ -1,11 +1,104 @@
+from flask import g, has_app_context, jsonify, request, Response
 from flask_openapi3 import APIBlueprint
 import os
 
+from app import db
+from app.logger import logger
+
 
 class BlueprintApi(APIBlueprint):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        unit_of_work: bool = False,
+        admission: dict[str, str] | None = None,
+        **kwargs,
+    ):
+        """API blueprint
+
+        Args:
+            unit_of_work (bool, optional): handle every request as one unit of work - model helpers
+                only flush changes, commit is done once when the request ends
+                and everything is rolled back on error. Defaults to False.
+            admission (dict[str, str] | None, optional): agent endpoints admission control:
+                view function name -> endpoint class ("critical" or "telemetry").
+                Requests over the class limit are rejected before any work is done.
+                Defaults to None (not limited).
+        """
 
         if "url_prefix" not in kwargs:
             kwargs["url_prefix"] = os.environ.get("API_ROOT", "")
 
         super().__init__(*args, **kwargs)
+
+        self.admission = admission or {}
+        if self.admission:
+            # Registered first - rejected requests don't start the unit of work
+            self.before_request(self._acquire_admission)
+            self.after_request(self._release_admission)
+            self.teardown_request(self._end_admission)
+
+        if unit_of_work:
+            self.before_request(self._begin_unit_of_work)
+            self.after_request(self._commit_unit_of_work)
+            self.teardown_request(self._end_unit_of_work)
+
+    def _acquire_admission(self):
+        from app.controllers import acquire_admission, get_retry_after
+        from app.controllers.admission import CRITICAL
+
+        endpoint_class = self.admission.get(request.endpoint.rsplit(".", 1)[-1])
+        if not endpoint_class:
+            return None
+
+        token = acquire_admission(endpoint_class)
+        if token:
+            g.admission = (endpoint_class, token)
+            return None
+
+        logger.warning("Agent request {} is rejected: server is busy", request.path)
+        response = jsonify(status="fail", message="Server is busy. Retry later.")
+        # 503 - server can't handle status-critical calls now, 429 - telemetry is shed
+        response.status_code = 503 if endpoint_class == CRITICAL else 429
+        response.headers["Retry-After"] = str(get_retry_after(endpoint_class))
+        return response
+
+    @staticmethod
+    def _release_admission(response: Response):
+        from app.controllers import release_admission
+
+        if g.get("admission"):
+            release_admission(*g.admission)
+            g.admission = None
+        return response
+
+    @staticmethod
+    def _end_admission(exc: BaseException | None):
+        from app.controllers import release_admission
+
+        if has_app_context() and g.get("admission"):
+            # after_request was not reached - unhandled exception
+            release_admission(*g.admission)
+            g.admission = None
+
+    @staticmethod
+    def _begin_unit_of_work():
+        g.unit_of_work = True
+
+    @staticmethod
+    def _commit_unit_of_work(response: Response):
+        # Errors are not committed (views return them with 4xx/5xx codes)
+        if response.status_code >= 400:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        g.unit_of_work = False
+        return response
+
+    @staticmethod
+    def _end_unit_of_work(exc: BaseException | None):
+        if has_app_context() and g.get("unit_of_work", False):
+            # after_request was not reached - unhandled exception
+            logger.warning("Request unit of work is rolled back. Error: {}", exc)
+            db.session.rollback()
+            g.unit_of_work = False
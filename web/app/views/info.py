@@ -1,9 +1,23 @@
 from datetime import datetime, timedelta
-from flask import render_template, Blueprint, request, abort, current_app
+from flask import (
+    render_template,
+    Blueprint,
+    request,
+    abort,
+    current_app,
+    jsonify,
+    Response,
+)
 from flask_login import login_required, current_user
 
 from app import models as m, db
-from app.controllers import create_pagination, backup_log_on_request_to_view
+from app.controllers import (
+    create_pagination,
+    get_chart_days,
+    get_availability_chart,
+    get_availability_chart_etag,
+    load_computers_status,
+)
 
 from .utils import has_access_to_company, has_access_to_computer, has_access_to_location
 
@@ -30,10 +44,7 @@ def computer_info(computer_id):
     # Check if user has access to computer information
     if not has_access_to_computer(current_user, computer):
         abort(403, "You don't have access to this computer information.")
-
-    # Update the last computer log information
-    if computer.logs_enabled:
-        backup_log_on_request_to_view(computer)
+    load_computers_status([computer])
 
     # Paginated logs for table
     computer_logs_query = m.BackupLog.query.filter(
@@ -59,66 +70,8 @@ def computer_info(computer_id):
         .all()
     )
 
-    # Logs information for chart
-    chart_days = request.args.get("chart_days", 7, type=int)
-
-    logs_for_chart = (
-        m.BackupLog.query.filter(
-            m.BackupLog.computer_id == computer_id,
-            m.BackupLog.end_time >= datetime.utcnow() - timedelta(days=chart_days),
-        )
-        .order_by(m.BackupLog.start_time.asc())
-        .all()
-    )
-
-    # List objects with different data for chart.
-    labels = []
-    notes = []
-    chart_green_data = []
-    chart_yellow_data = []
-    chart_red_data = []
-
-    if logs_for_chart:
-        # Set the start time for the chart (eastern time - chart_days)
-        log_time = CFG.offset_to_est(
-            datetime.utcnow().replace(minute=0, second=0, microsecond=0), True
-        ) - timedelta(days=chart_days)
-        log_to_use_index = 0
-
-        current_log_type = None
-
-        # Fill all the list objects with data for every hour
-        while log_time < CFG.offset_to_est(datetime.utcnow(), True):
-            labels.append(log_time)
-            notes.append(logs_for_chart[log_to_use_index].notes)
-
-            # Check if the current log_time is in the range of the current log
-            if (
-                log_time < logs_for_chart[log_to_use_index].est_start_time
-                or log_time > logs_for_chart[log_to_use_index].est_end_time
-            ):
-                current_log_type = None
-            elif not logs_for_chart[log_to_use_index].error:
-                current_log_type = "green"
-            elif (
-                logs_for_chart[log_to_use_index].error
-                == "Longer than 1 hour without a backup"
-            ):
-                current_log_type = "yellow"
-            else:
-                current_log_type = "red"
-
-            chart_green_data.append(1 if current_log_type == "green" else None)
-            chart_yellow_data.append(1 if current_log_type == "yellow" else None)
-            chart_red_data.append(1 if current_log_type == "red" else None)
-
-            log_time += timedelta(hours=1)
-
-            if (
-                log_time > logs_for_chart[log_to_use_index].est_end_time
-                and (log_to_use_index + 1) <= len(logs_for_chart) - 1
-            ):
-                log_to_use_index += 1
+    # Chart data is loaded by the page from computer_chart
+    chart_days = get_chart_days(request.args.get("chart_days", 7, type=int))
 
     return render_template(
         "info/computer.html",
@@ -127,15 +80,38 @@ def computer_info(computer_id):
         logs=logs,
         page=pagination,
         chart_days=chart_days,
-        labels=labels,
-        chart_notes=notes,
-        chart_green_data=chart_green_data,
-        chart_yellow_data=chart_yellow_data,
-        chart_red_data=chart_red_data,
+        chart_days_options=[
+            days
+            for days in (1, 3, 7, 10, 30, 90)
+            if days <= CFG.AVAILABILITY_CHART_MAX_DAYS
+        ],
         computers_search_params=computers_search_params,
     )
 
 
+@info_blueprint.route("/computer/<int:computer_id>/chart", methods=["GET"])
+@login_required
+def computer_chart(computer_id):
+    computer = m.Computer.query.filter_by(id=computer_id).first_or_404()
+
+    if not has_access_to_computer(current_user, computer):
+        abort(403, "You don't have access to this computer information.")
+
+    chart_days = get_chart_days(request.args.get("chart_days", 7, type=int))
+
+    # Chart data changes only every hour or when computer backup periods change
+    chart_etag = get_availability_chart_etag(computer_id, chart_days)
+    if chart_etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(get_availability_chart(computer_id, chart_days).dict())
+
+    response.set_etag(chart_etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 @info_blueprint.route("/system-log", methods=["GET"])
 @login_required
 def system_log_info():
@@ -241,10 +217,13 @@ def location_info(location_id):
     if not has_access_to_location(current_user, location):
         abort(403, "You don't have access to this location information.")
 
+    computers: list[m.Computer] = location.computers
+    load_computers_status(computers)
+
     return render_template(
         "info/location.html",
         location=location,
-        computers=location.computers,
+        computers=computers,
     )
 
 
@@ -259,6 +238,9 @@ def company_info(company_id):
 
     # get locations online and offline and in percentages
 
+    # Locations computers below are the same objects (session identity map)
+    load_computers_status(company.computers)
+
     return render_template(
         "info/company.html",
         company=company,
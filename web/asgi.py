@@ -0,0 +1,7 @@
+#!/user/bin/env python
+from app.ingest import create_ingest_app
+
+
+# Agent telemetry endpoints, run with:
+# gunicorn -w 4 -k uvicorn.workers.UvicornWorker -b 0.0.0.0:5001 "asgi:app"
+app = create_ingest_app()
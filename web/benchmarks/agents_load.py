@@ -0,0 +1,155 @@
+"""Load test of the agent endpoints: how many concurrent agents the server sustains.
+
+Every simulated agent sends /last_time heartbeats (and /download_status from time to time)
+in a loop, like the desktop agent does, with the heartbeat period compressed to --interval.
+The number of agents is increased step by step until requests start failing
+or p95 latency exceeds --max-p95.
+
+Compare the Flask app and the ingestion app:
+    gunicorn -w 4 -b 0.0.0.0:5000 "wsgi:app"
+    gunicorn -w 4 -k uvicorn.workers.UvicornWorker -b 0.0.0.0:5001 "asgi:app"
+
+    python -m benchmarks.agents_load --url http://localhost:5000
+    python -m benchmarks.agents_load --url http://localhost:5001
+
+Agents use identifier keys of the existing (not deleted) computers from the app database.
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import statistics
+import time
+
+import httpx
+
+
+async def run_agent(
+    client: httpx.AsyncClient,
+    computer: tuple[str, str],
+    interval: float,
+    stop_at: float,
+    latencies: list[float],
+    errors: list[str],
+):
+    computer_name, identifier_key = computer
+    # Agents are not synchronized
+    await asyncio.sleep(random.uniform(0, interval))
+
+    while time.monotonic() < stop_at:
+        now = datetime.datetime.now().isoformat()
+        if random.random() < 0.1:
+            url = "/download_status"
+            data = dict(
+                company_name="",
+                location_name="",
+                download_status="downloading",
+                last_time_online=now,
+                identifier_key=identifier_key,
+            )
+        else:
+            url = "/last_time"
+            data = dict(
+                computer_name=computer_name,
+                identifier_key=identifier_key,
+                last_time_online=now,
+            )
+
+        started_at = time.monotonic()
+        try:
+            response = await client.post(url, json=data)
+            if response.status_code != 200:
+                errors.append(f"{url}: {response.status_code}")
+            else:
+                latencies.append(time.monotonic() - started_at)
+        except httpx.HTTPError as err:
+            errors.append(f"{url}: {type(err).__name__}")
+
+        await asyncio.sleep(max(interval - (time.monotonic() - started_at), 0))
+
+
+async def run_step(
+    url: str,
+    computers: list[tuple[str, str]],
+    agents: int,
+    interval: float,
+    duration: float,
+) -> dict:
+    latencies: list[float] = []
+    errors: list[str] = []
+    stop_at = time.monotonic() + duration
+
+    limits = httpx.Limits(max_connections=agents, max_keepalive_connections=agents)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        await asyncio.gather(
+            *[
+                run_agent(
+                    client,
+                    computers[i % len(computers)],
+                    interval,
+                    stop_at,
+                    latencies,
+                    errors,
+                )
+                for i in range(agents)
+            ]
+        )
+
+    latencies.sort()
+    return dict(
+        agents=agents,
+        requests=len(latencies) + len(errors),
+        rps=(len(latencies) + len(errors)) / duration,
+        errors=len(errors),
+        p50=statistics.median(latencies) if latencies else None,
+        p95=latencies[int(len(latencies) * 0.95)] if latencies else None,
+        p99=latencies[int(len(latencies) * 0.99)] if latencies else None,
+    )
+
+
+def get_computers() -> list[tuple[str, str]]:
+    from app import create_app
+    from app.models import Computer
+
+    with create_app().app_context():
+        return [
+            (computer.computer_name, computer.identifier_key)
+            for computer in Computer.query.filter(Computer.identifier_key.is_not(None))
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--start", type=int, default=50, help="agents on the first step")
+    parser.add_argument("--max-agents", type=int, default=5000)
+    parser.add_argument("--interval", type=float, default=1.0, help="heartbeat period, s")
+    parser.add_argument("--duration", type=float, default=20.0, help="step duration, s")
+    parser.add_argument("--max-p95", type=float, default=1.0, help="max p95 latency, s")
+    args = parser.parse_args()
+
+    computers = get_computers()
+    if not computers:
+        raise SystemExit("There are no computers with identifier key in the database")
+
+    sustained = 0
+    agents = args.start
+    while agents <= args.max_agents:
+        result = asyncio.run(
+            run_step(args.url, computers, agents, args.interval, args.duration)
+        )
+        print(
+            "agents: {agents:5} requests: {requests:6} rps: {rps:8.1f} errors: {errors:5} "
+            "p50: {p50} p95: {p95} p99: {p99}".format(**result)
+        )
+        if result["errors"] or not result["p95"] or result["p95"] > args.max_p95:
+            break
+
+        sustained = agents
+        agents *= 2
+
+    print(f"Sustained agents (heartbeat every {args.interval}s): {sustained}")
+
+
+if __name__ == "__main__":
+    main()
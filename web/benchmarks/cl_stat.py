@@ -0,0 +1,105 @@
+"""Benchmark of the companies and locations statistics update (update_cl_stat task).
+
+Fills the TESTING database (TEST_DATABASE_URL, it is recreated) with companies, locations
+and computers and measures update_companies_locations_statistic at every fleet size.
+The number of queries and the runtime should stay roughly flat as the fleet grows.
+
+    python -m benchmarks.cl_stat --computers 1000 10000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+COMPUTERS_PER_LOCATION = 4
+LOCATIONS_PER_COMPANY = 10
+
+
+def fill_database(computers_number: int):
+    from app import db, models as m
+    from config import BaseConfig as CFG
+
+    db.drop_all()
+    db.create_all()
+
+    locations_number = max(computers_number // COMPUTERS_PER_LOCATION, 1)
+    companies_number = max(locations_number // LOCATIONS_PER_COMPANY, 1)
+    current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+
+    db.session.execute(
+        insert(m.Company.__table__),
+        [dict(id=i + 1, name=f"company_{i}") for i in range(companies_number)],
+    )
+    db.session.execute(
+        insert(m.Location.__table__),
+        [
+            dict(id=i + 1, name=f"location_{i}", company_id=i % companies_number + 1)
+            for i in range(locations_number)
+        ],
+    )
+    db.session.execute(
+        insert(m.Computer.__table__),
+        [
+            dict(
+                computer_name=f"computer_{i}",
+                location_id=i % locations_number + 1,
+                company_id=i % locations_number % companies_number + 1,
+                device_role=random.choice(list(m.DeviceRole)),
+                activated=random.random() < 0.95,
+                # About a half is online (downloaded less than 1.5 hours ago)
+                last_download_time=current_east_time
+                - timedelta(hours=random.uniform(0, 3))
+                if random.random() < 0.95
+                else None,
+            )
+            for i in range(computers_number)
+        ],
+    )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--computers", type=int, nargs="+", default=[1000, 10000], help="fleet sizes"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.controllers import update_companies_locations_statistic
+
+    app = create_app(environment="testing")
+    with app.app_context():
+        queries = []
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *_: queries.append(1),
+        )
+
+        for computers_number in args.computers:
+            fill_database(computers_number)
+
+            timings = []
+            for run in range(args.runs):
+                # The first run updates all the rows, next ones - only the changed ones
+                queries.clear()
+                started_at = time.perf_counter()
+                updated = update_companies_locations_statistic()
+                timings.append(time.perf_counter() - started_at)
+                print(
+                    f"computers: {computers_number:6} run: {run + 1} "
+                    f"time: {timings[-1]:.3f}s queries: {len(queries)} updated rows: {updated}"
+                )
+
+            print(f"computers: {computers_number:6} best time: {min(timings):.3f}s")
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
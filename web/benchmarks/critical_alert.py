@@ -0,0 +1,135 @@
+"""Benchmark of the offline locations alerts (critical_alert_email task).
+
+Fills the TESTING database (TEST_DATABASE_URL, it is recreated) with companies, locations,
+computers and users, makes a part of the locations offline and measures send_critical_alert
+at every fleet size (emails are not sent in the testing mode). The number of queries depends
+on the number of alerted locations, not on the fleet size.
+
+    python -m benchmarks.critical_alert --locations 1000 5000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+COMPUTERS_PER_LOCATION = 3
+LOCATIONS_PER_COMPANY = 10
+
+
+def fill_database(locations_number: int, offline_share: float):
+    from app import db, models as m
+    from app.models.user import users_to_location
+    from config import BaseConfig as CFG
+
+    db.drop_all()
+    db.create_all()
+
+    companies_number = max(locations_number // LOCATIONS_PER_COMPANY, 1)
+    offline_every = max(round(1 / offline_share), 1)
+    current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+
+    db.session.execute(
+        insert(m.Company.__table__),
+        [dict(id=i + 1, name=f"company_{i}") for i in range(companies_number)],
+    )
+    db.session.execute(
+        insert(m.Location.__table__),
+        [
+            dict(id=i + 1, name=f"location_{i}", company_id=i % companies_number + 1)
+            for i in range(locations_number)
+        ],
+    )
+    db.session.execute(
+        insert(m.Computer.__table__),
+        [
+            dict(
+                computer_name=f"computer_{i}",
+                location_id=i % locations_number + 1,
+                company_id=i % locations_number % companies_number + 1,
+                device_role=m.DeviceRole.PRIMARY
+                if i < locations_number
+                else m.DeviceRole.ALTERNATE,
+                # Offline locations are alerted at this hour (2.5 hours without backups)
+                last_download_time=current_east_time
+                - (
+                    timedelta(hours=2, minutes=30)
+                    if i % locations_number % offline_every == 0
+                    else timedelta(minutes=10)
+                ),
+            )
+            for i in range(locations_number * COMPUTERS_PER_LOCATION)
+        ],
+    )
+    # A company level user per company and a location level user per location
+    db.session.execute(
+        insert(m.User.__table__),
+        [
+            dict(
+                id=i + 1,
+                username=f"user_{i}",
+                email=f"user_{i}@test.com",
+                password_hash="-",
+                company_id=i % companies_number + 1,
+            )
+            for i in range(companies_number + locations_number)
+        ],
+    )
+    db.session.execute(
+        insert(users_to_location),
+        [
+            dict(user_id=companies_number + i + 1, location_id=i + 1)
+            for i in range(locations_number)
+        ],
+    )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--locations", type=int, nargs="+", default=[1000, 5000], help="fleet sizes"
+    )
+    parser.add_argument(
+        "--offline", type=float, default=0.02, help="share of offline locations"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from app import create_app, db, mail
+    from app.controllers import send_critical_alert
+    from config import BaseConfig as CFG
+
+    CFG.MAIL_DEFAULT_SENDER = CFG.MAIL_DEFAULT_SENDER or "benchmark@test.com"
+    app = create_app(environment="testing")
+    with app.test_request_context():
+        queries = []
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *_: queries.append(1),
+        )
+
+        for locations_number in args.locations:
+            fill_database(locations_number, args.offline)
+
+            timings = []
+            for run in range(args.runs):
+                queries.clear()
+                with mail.record_messages() as outbox:
+                    started_at = time.perf_counter()
+                    send_critical_alert()
+                    timings.append(time.perf_counter() - started_at)
+                print(
+                    f"locations: {locations_number:6} run: {run + 1} "
+                    f"time: {timings[-1]:.3f}s queries: {len(queries)} alerts: {len(outbox)}"
+                )
+
+            print(f"locations: {locations_number:6} best time: {min(timings):.3f}s")
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark of the agent heartbeats: ingestion app vs the Flask endpoints.
+
+Fills the TESTING database (TEST_DATABASE_URL, it is recreated) with the test data and sends
+--agents concurrent agents x --requests /last_time heartbeats in process to:
+"flask" - the Flask app served by --workers threads, like gunicorn sync workers,
+"ingest" - the ingestion app (identity lookup in the async pool, writes in
+INGEST_SYNC_WORKERS threads), like the uvicorn worker.
+Latency is measured from sending the request, so it includes waiting for a free worker.
+
+    python -m benchmarks.ingest --agents 200 --requests 5 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+
+
+def heartbeat(computer: tuple[str, str]) -> dict:
+    computer_name, identifier_key = computer
+    return dict(
+        computer_name=computer_name,
+        identifier_key=identifier_key,
+        last_time_online=str(datetime.now()),
+    )
+
+
+def get_computers() -> list[tuple[str, str]]:
+    from app import db, models as m
+    from app.controllers import init_db
+
+    db.drop_all()
+    db.create_all()
+    init_db(True)
+
+    return [
+        (computer.computer_name, computer.identifier_key)
+        for computer in m.Computer.query.filter(
+            m.Computer.identifier_key.is_not(None), m.Computer.is_deleted.is_(False)
+        )
+    ]
+
+
+def run_flask(app, computers: list[tuple[str, str]], args) -> list[float]:
+    def send(computer: tuple[str, str], sent_at: float) -> float:
+        with app.test_client() as client:
+            response = client.post("/last_time", json=heartbeat(computer))
+        assert response.status_code == 200, response.json
+        return time.perf_counter() - sent_at
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(send, computers[i % len(computers)], time.perf_counter())
+            for _ in range(args.requests)
+            for i in range(args.agents)
+        ]
+        return [future.result() for future in futures]
+
+
+async def run_ingest(app, computers: list[tuple[str, str]], args) -> list[float]:
+    from app.ingest import create_ingest_app
+
+    ingest_app = create_ingest_app(app)
+    latencies = []
+
+    async def run_agent(client: httpx.AsyncClient, computer: tuple[str, str]):
+        for _ in range(args.requests):
+            sent_at = time.perf_counter()
+            response = await client.post("/last_time", json=heartbeat(computer))
+            assert response.status_code == 200, response.json()
+            latencies.append(time.perf_counter() - sent_at)
+
+    # ASGITransport doesn't run the lifespan (database pool, limiter)
+    async with ingest_app.router.lifespan_context(ingest_app):
+        transport = httpx.ASGITransport(app=ingest_app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://ingest"
+        ) as client:
+            await asyncio.gather(
+                *[
+                    run_agent(client, computers[i % len(computers)])
+                    for i in range(args.agents)
+                ]
+            )
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=200, help="concurrent agents")
+    parser.add_argument("--requests", type=int, default=5, help="heartbeats per agent")
+    parser.add_argument("--workers", type=int, default=4, help="Flask app workers")
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    app = create_app(environment="testing")
+
+    with app.app_context():
+        computers = get_computers()
+        db.session.remove()
+
+    for name in ("flask", "ingest"):
+        started_at = time.perf_counter()
+        if name == "flask":
+            latencies = run_flask(app, computers, args)
+        else:
+            latencies = asyncio.run(run_ingest(app, computers, args))
+        duration = time.perf_counter() - started_at
+
+        latencies.sort()
+        print(
+            f"{name:6} {len(latencies) / duration:8.1f} rps "
+            f"p50 {statistics.median(latencies) * 1000:8.1f} ms "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:8.1f} ms"
+        )
+
+    with app.app_context():
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark of the MSI installers storage: blob store vs the legacy content column.
+
+Fills the TESTING database (TEST_DATABASE_URL, it is recreated) with the test data and
+desktop clients with --size MiB installers, then measures /last_time requests and loading
+of all the desktop clients (time and peak traced memory) for both layouts:
+"column" - installers are in the content column loaded with the row (before the blob store),
+"store" - installers are in the blob store (BLOB_STORE_DIR is a temporary directory).
+
+    python -m benchmarks.msi_blobs --size 20 --requests 30
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy.orm import undefer
+
+LAYOUTS = ("column", "store")
+
+
+def fill_database(layout: str, clients_number: int, size: int):
+    from app import db, models as m
+    from app.controllers import init_db, invalidate_desktop_clients_cache
+
+    db.drop_all()
+    db.create_all()
+    init_db(True)
+
+    for i in range(clients_number):
+        content = os.urandom(size * 1024 * 1024)
+        desktop_client = m.DesktopClient(
+            mimetype="application/octet-stream",
+            filename=f"benchmark_{i}.msi",
+            size=len(content),
+            name=f"benchmark_{i}",
+            version=f"1.0.{i}.1",
+        )
+        if layout == "store":
+            desktop_client.blob = content
+        else:
+            desktop_client.blob_data = content
+        db.session.add(desktop_client)
+    db.session.commit()
+
+    invalidate_desktop_clients_cache()
+
+
+def measure(func: Callable, runs: int) -> tuple[float, float]:
+    """Average time of the run (ms) and peak traced memory (MiB)"""
+    from app import db
+
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    for _ in range(runs):
+        func()
+        # Next run loads the rows again
+        db.session.expunge_all()
+    duration = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return duration / runs * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=20, help="installer size (MiB)")
+    parser.add_argument("--clients", type=int, default=2, help="desktop clients")
+    parser.add_argument("--requests", type=int, default=30, help="/last_time requests")
+    parser.add_argument("--loads", type=int, default=5, help="desktop clients loads")
+    args = parser.parse_args()
+
+    from app import create_app, db, models as m
+    from config import BaseConfig as CFG
+
+    CFG.BLOB_STORE_DIR = tempfile.mkdtemp(prefix="blobs_")
+    app = create_app(environment="testing")
+
+    with app.app_context(), app.test_client() as client:
+        for layout in LAYOUTS:
+            fill_database(layout, args.clients, args.size)
+
+            def last_time():
+                response = client.post(
+                    "/last_time",
+                    json=dict(
+                        identifier_key="comp1_identifier_key",
+                        computer_name="comp1_intime",
+                        last_time_online=str(datetime.now()),
+                    ),
+                )
+                assert response.status_code == 200
+
+            def load_desktop_clients():
+                query = m.DesktopClient.query
+                if layout == "column":
+                    # Content column was a regular (not deferred) column
+                    query = query.options(undefer(m.DesktopClient.blob_data))
+                query.all()
+
+            for name, func, runs in (
+                ("/last_time", last_time, args.requests),
+                ("desktop clients load", load_desktop_clients, args.loads),
+            ):
+                ms_per_run, peak = measure(func, runs)
+                print(
+                    f"{layout:6} {name:20} {ms_per_run:8.1f} ms/run "
+                    f"peak traced memory {peak:6.1f} MiB"
+                )
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
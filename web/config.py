@@ -128,6 +128,88 @@ class BaseConfig(object):
     )
     LOG_EVENT_DELETION_PERIOD = int(os.environ.get("LOG_EVENT_DELETION_PERIOD", 10))
 
+    # Redis shared between the app workers. If not set - in-process storage is used
+    REDIS_URL = os.environ.get("REDIS_URL")
+
+    # Agent log events stream (used only with Redis): max stream length (the stream isn't trimmed,
+    # when consumers are that far behind new events are saved to the db directly) and insert batch size
+    LOG_EVENTS_STREAM_MAXLEN = int(os.environ.get("LOG_EVENTS_STREAM_MAXLEN", 1000000))
+    LOG_EVENTS_BATCH_SIZE = int(os.environ.get("LOG_EVENTS_BATCH_SIZE", 1000))
+
+    # Content-addressed store (files named by SHA-256) for uploaded files, e.g. MSI installers
+    BLOB_STORE_DIR = os.environ.get("BLOB_STORE_DIR", os.path.join(base_dir, "blobs"))
+
+    # If set - MSI files are served by nginx: internal location with this prefix must point to BLOB_STORE_DIR
+    MSI_X_ACCEL_REDIRECT_PREFIX = os.environ.get("MSI_X_ACCEL_REDIRECT_PREFIX")
+
+    # Desktop clients versions cache is reloaded at least every N seconds
+    # (it is invalidated on every change made from the admin views)
+    DESKTOP_CLIENTS_CACHE_MAX_AGE = int(
+        os.environ.get("DESKTOP_CLIENTS_CACHE_MAX_AGE", 300)
+    )
+
+    # Agent identity cache (identifier_key -> computer id and flags) time to live in seconds
+    COMPUTER_IDENTITY_CACHE_TTL = int(os.environ.get("COMPUTER_IDENTITY_CACHE_TTL", 60))
+
+    # Agent ingestion ASGI app (asgi.py): async database pool size and number of threads
+    # running the (sync) controllers logic
+    INGEST_DATABASE_POOL_SIZE = int(os.environ.get("INGEST_DATABASE_POOL_SIZE", 20))
+    INGEST_SYNC_WORKERS = int(os.environ.get("INGEST_SYNC_WORKERS", 8))
+
+    # Agent scheduled tasks are spread over the period by server assigned slots:
+    # heartbeat task period and the part of the hour used for the downloads (seconds).
+    # Agents scale the slots down to a quarter of the task period, so the wait for the slot
+    # doesn't hold the scheduled task run for long
+    AGENT_HEARTBEAT_PERIOD = int(os.environ.get("AGENT_HEARTBEAT_PERIOD", 300))
+    AGENT_DOWNLOAD_WINDOW = int(os.environ.get("AGENT_DOWNLOAD_WINDOW", 2700))
+    # Agent requests arrivals per minute histogram is kept for N hours,
+    # one of N requests is counted (with weight N)
+    AGENT_ARRIVALS_HISTORY_HOURS = int(os.environ.get("AGENT_ARRIVALS_HISTORY_HOURS", 48))
+    AGENT_ARRIVALS_SAMPLE_RATE = int(os.environ.get("AGENT_ARRIVALS_SAMPLE_RATE", 10))
+
+    # Agent requests admission control: max requests in flight (for all app workers, 0 - no limit)
+    # of the status-critical and telemetry endpoints. Telemetry limit counts critical requests too,
+    # so telemetry is rejected first. Rejected requests get 503 (critical) / 429 (telemetry)
+    # with Retry-After (seconds)
+    AGENT_ADMISSION_CRITICAL_LIMIT = int(os.environ.get("AGENT_ADMISSION_CRITICAL_LIMIT", 64))
+    AGENT_ADMISSION_TELEMETRY_LIMIT = int(os.environ.get("AGENT_ADMISSION_TELEMETRY_LIMIT", 32))
+    AGENT_ADMISSION_CRITICAL_RETRY_AFTER = int(
+        os.environ.get("AGENT_ADMISSION_CRITICAL_RETRY_AFTER", 10)
+    )
+    AGENT_ADMISSION_TELEMETRY_RETRY_AFTER = int(
+        os.environ.get("AGENT_ADMISSION_TELEMETRY_RETRY_AFTER", 60)
+    )
+    # Requests in flight longer than N seconds (e.g. killed worker) are not counted
+    AGENT_ADMISSION_REQUEST_TIMEOUT = int(os.environ.get("AGENT_ADMISSION_REQUEST_TIMEOUT", 60))
+
+    # Backup logs sweep (extends offline periods of all computers) handles N computers at once
+    BACKUP_LOGS_SWEEP_BATCH_SIZE = int(
+        os.environ.get("BACKUP_LOGS_SWEEP_BATCH_SIZE", 1000)
+    )
+
+    # Main page counters are cached per permission scope for N seconds
+    DASHBOARD_CACHE_TTL = int(os.environ.get("DASHBOARD_CACHE_TTL", 30))
+
+    # Computer status transitions detector handles N due computers at once
+    COMPUTER_STATUS_BATCH_SIZE = int(
+        os.environ.get("COMPUTER_STATUS_BATCH_SIZE", 1000)
+    )
+
+    # Computer info availability chart: max range (days), max number of bars (longer ranges are
+    # downsampled to buckets of several hours) and cache time to live of the chart data (seconds)
+    AVAILABILITY_CHART_MAX_DAYS = int(os.environ.get("AVAILABILITY_CHART_MAX_DAYS", 90))
+    AVAILABILITY_CHART_BUCKETS = int(os.environ.get("AVAILABILITY_CHART_BUCKETS", 240))
+    AVAILABILITY_CHART_CACHE_TTL = int(
+        os.environ.get("AVAILABILITY_CHART_CACHE_TTL", 3600)
+    )
+
+    # Per computer locks (backup logs updates): waits longer than N seconds are counted
+    # as contended / slow (slow ones are logged)
+    COMPUTER_LOCK_CONTENDED_WAIT = float(
+        os.environ.get("COMPUTER_LOCK_CONTENDED_WAIT", 0.005)
+    )
+    COMPUTER_LOCK_SLOW_WAIT = float(os.environ.get("COMPUTER_LOCK_SLOW_WAIT", 1))
+
     MAX_LOCATION_ACTIVE_COMPUTERS_LITE = int(
         os.environ.get("MAX_LOCATION_ACTIVE_COMPUTERS_LITE", 1)
     )
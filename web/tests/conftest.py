@@ -2,7 +2,7 @@ import pytest
 from datetime import datetime, timedelta
 
 from app import db, create_app, models as m
-from app.controllers import init_db
+from app.controllers import init_db, flush_heartbeats
 from config import BaseConfig as CFG
 
 app = create_app(environment="testing")
@@ -18,6 +18,7 @@ def client():
         db.create_all()
         init_db(True)
         yield client
+        flush_heartbeats()
         db.session.remove()
         db.drop_all()
         app_ctx.pop()
@@ -32,6 +33,7 @@ def test_db():
         db.create_all()
         init_db(True)
         yield db
+        flush_heartbeats()
         db.session.remove()
         db.drop_all()
         app_ctx.pop()
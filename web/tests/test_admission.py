@@ -0,0 +1,56 @@
+import datetime
+
+from app.controllers import acquire_admission, release_admission
+
+from config import BaseConfig as CFG
+
+
+def test_admission_control(client, monkeypatch):
+    monkeypatch.setattr(CFG, "AGENT_ADMISSION_CRITICAL_LIMIT", 2)
+    monkeypatch.setattr(CFG, "AGENT_ADMISSION_TELEMETRY_LIMIT", 2)
+    body = dict(
+        identifier_key="comp3_identifier_key",
+        computer_name="comp3_test",
+        last_time_online=str(datetime.datetime.now()),
+    )
+    printer_info = dict(
+        identifier_key="comp3_identifier_key",
+        computer_name="comp3_test",
+        printer_info={},
+    )
+
+    # One status-critical request in flight - telemetry still has room
+    critical_token = acquire_admission("critical")
+    assert critical_token
+    response = client.post("/printer_info", json=printer_info)
+    assert response.status_code != 429
+
+    # Telemetry limit counts critical requests too: telemetry is shed first
+    telemetry_token = acquire_admission("telemetry")
+    assert telemetry_token
+    response = client.post("/printer_info", json=printer_info)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(
+        CFG.AGENT_ADMISSION_TELEMETRY_RETRY_AFTER
+    )
+
+    # ... while status-critical calls are admitted up to their own limit
+    response = client.post("/last_time", json=body)
+    assert response.status_code == 200
+
+    second_critical_token = acquire_admission("critical")
+    assert second_critical_token
+    response = client.post("/last_time", json=body)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(
+        CFG.AGENT_ADMISSION_CRITICAL_RETRY_AFTER
+    )
+
+    release_admission("critical", second_critical_token)
+    release_admission("critical", critical_token)
+    release_admission("telemetry", telemetry_token)
+
+    # Finished requests release their admission
+    for _ in range(3):
+        assert client.post("/last_time", json=body).status_code == 200
+    assert client.post("/printer_info", json=printer_info).status_code != 429
@@ -0,0 +1,58 @@
+import datetime
+
+from app.controllers import get_agent_arrivals
+from app.controllers.agent_schedule import get_slot
+
+from config import BaseConfig as CFG
+
+
+def per_minute(slots: list[int]) -> list[int]:
+    minutes = [0] * 60
+    for slot in slots:
+        minutes[slot // 60] += 1
+    return minutes
+
+
+def test_agent_slots_spread():
+    window = 3600
+
+    slots = [get_slot(computer_id, window) for computer_id in range(1, 1001)]
+    assert all(0 <= slot < window for slot in slots)
+    # Evenly spread: ~17 agents per minute, no top of the hour spike
+    assert max(per_minute(slots)) <= 2 * min(per_minute(slots))
+
+    # Fleet grows almost twice: the slots of the existing computers don't move
+    grown = [get_slot(computer_id, window) for computer_id in range(1, 1901)]
+    assert grown[:1000] == slots
+    assert max(per_minute(grown)) <= 2 * min(per_minute(grown))
+
+    # Fleet doubles: the new computers fill the gaps, load is still flat
+    doubled = [get_slot(computer_id, window) for computer_id in range(1, 2001)]
+    assert doubled[:1000] == slots
+    assert max(per_minute(doubled)) <= 2 * min(per_minute(doubled))
+
+
+def test_last_time_slots_and_arrivals(client, monkeypatch):
+    # Count every request
+    monkeypatch.setattr(CFG, "AGENT_ARRIVALS_SAMPLE_RATE", 1)
+    before = get_agent_arrivals(hours=1)
+    body = dict(
+        identifier_key="comp3_identifier_key",
+        computer_name="comp3_test",
+        last_time_online=str(datetime.datetime.now()),
+    )
+
+    response = client.post("/last_time", json=body)
+    assert response.status_code == 200
+    assert 0 <= response.json["heartbeat_slot"] < CFG.AGENT_HEARTBEAT_PERIOD
+    assert 0 <= response.json["download_slot"] < CFG.AGENT_DOWNLOAD_WINDOW
+
+    response = client.post("/get_credentials", json=body)
+    assert response.status_code == 200
+    assert response.json["download_slot"] == client.post(
+        "/last_time", json=body
+    ).json["download_slot"]
+
+    after = get_agent_arrivals(hours=1)
+    assert sum(after["heartbeat"]) - sum(before["heartbeat"]) == 2
+    assert sum(after["credentials"]) - sum(before["credentials"]) == 1
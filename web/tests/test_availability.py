@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+
+from app import models as m
+from app.controllers import (
+    get_availability_chart,
+    get_availability_chart_etag,
+    get_chart_days,
+    get_computer_availability,
+    get_est_hours,
+    get_last_week_uptime,
+    on_backup_event,
+    rebuild_availability,
+)
+from app.schema import BackupEvent, BackupEventType
+from config import BaseConfig as CFG
+
+
+DAY = datetime(2024, 3, 1)
+
+
+def send_events(computer: m.Computer):
+    computer.last_time_logs_enabled = DAY - timedelta(days=1)
+    # Downloads till 23:00, offline over midnight, downloads again at 01:00
+    for event_type, hours, minutes in (
+        (BackupEventType.DOWNLOAD_SUCCESS, 21, 10),
+        (BackupEventType.DOWNLOAD_SUCCESS, 22, 10),
+        (BackupEventType.SWEEP, 23, 40),
+        (BackupEventType.SWEEP, 24, 40),
+        (BackupEventType.DOWNLOAD_SUCCESS, 25, 10),
+    ):
+        on_backup_event(
+            computer,
+            BackupEvent(
+                event_type=event_type,
+                time=DAY + timedelta(hours=hours, minutes=minutes),
+            ),
+        )
+
+
+def test_availability_follows_backup_logs(test_db):
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    send_events(computer)
+
+    start_time = DAY + timedelta(hours=21)
+    availability = get_computer_availability(
+        computer.id, start_time, start_time + timedelta(hours=4, minutes=30)
+    )
+    assert availability.hours == 5
+    assert availability.series(availability.green) == [1, 1, None, None, 1]
+    assert availability.series(availability.yellow) == [None] * 5
+    assert availability.series(availability.red) == [None, None, 1, 1, None]
+    assert availability.notes[2:4] == ["Device is offline"] * 2
+    assert availability.online_hours == 3
+    assert availability.offline_hours == 2
+    assert availability.offline_periods == 1
+    assert availability.uptime == 60
+
+    # Days kept up to date by backup events are the same as rebuilt from the backup logs
+    days = [
+        (row.day, row.green, row.yellow, row.red)
+        for row in m.ComputerAvailability.query.order_by(m.ComputerAvailability.day)
+    ]
+    rebuild_availability(computer.id)
+    test_db.session.commit()
+    assert days == [
+        (row.day, row.green, row.yellow, row.red)
+        for row in m.ComputerAvailability.query.order_by(m.ComputerAvailability.day)
+    ]
+    assert len(days) == 2
+
+    # Logs were not enabled yet
+    empty = get_computer_availability(
+        computer.id, DAY - timedelta(days=3), DAY - timedelta(days=2)
+    )
+    assert empty.hours == 25
+    assert not empty.logged
+    assert empty.uptime is None
+
+
+def test_est_hours():
+    # Daylight saving time starts at 2024-03-10 02:00 EST
+    start_time = datetime(2024, 3, 10, 5)
+    assert get_est_hours(start_time, 3) == [
+        datetime(2024, 3, 10, 0),
+        datetime(2024, 3, 10, 1),
+        datetime(2024, 3, 10, 3),
+    ]
+    assert get_est_hours(DAY, 2) == [
+        datetime(2024, 2, 29, 19),
+        datetime(2024, 2, 29, 20),
+    ]
+
+
+def test_availability_chart(test_db, monkeypatch):
+    monkeypatch.setattr(CFG, "AVAILABILITY_CHART_BUCKETS", 24)
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    send_events(computer)
+    now = DAY + timedelta(days=1, hours=1, minutes=20)
+
+    # 25 hours fit the buckets
+    chart = get_availability_chart(computer.id, 1, now)
+    assert chart.bucket_hours == 2
+    assert len(chart.labels) == len(chart.green) == len(chart.notes) == 13
+    assert chart.labels[0] == "2024-02-29 20:00:00"
+    # 21:00 - 01:00 UTC hours are buckets 10 - 12
+    assert chart.green[10:] == [1, None, 0.5]
+    assert chart.red[10:] == [None, 1, None]
+    assert chart.notes[10:] == ["", "Device is offline", ""]
+    assert chart.uptime == 60
+    assert chart.offline_periods == 1
+
+    # Cached till the availability changes
+    etag = get_availability_chart_etag(computer.id, 1, now)
+    test_db.session.query(m.ComputerAvailability).delete()
+    test_db.session.commit()
+    assert get_availability_chart(computer.id, 1, now) == chart
+    assert get_availability_chart_etag(computer.id, 1, now) == etag
+
+    rebuild_availability(computer.id)
+    test_db.session.commit()
+    assert get_availability_chart_etag(computer.id, 1, now) != etag
+    assert get_availability_chart(computer.id, 1, now) == chart
+    # Next hour
+    assert get_availability_chart_etag(
+        computer.id, 1, now + timedelta(hours=1)
+    ) != get_availability_chart_etag(computer.id, 1, now)
+
+    # Range is limited
+    assert get_chart_days(1000) == CFG.AVAILABILITY_CHART_MAX_DAYS
+    assert get_chart_days(-1) == 1
+
+
+def test_last_week_uptime(test_db):
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    computer.logs_enabled = True
+    send_events(computer)
+    on_backup_event(
+        computer,
+        BackupEvent(
+            event_type=BackupEventType.DOWNLOAD_ERROR,
+            time=DAY + timedelta(hours=25, minutes=30),
+            message="Timeout",
+        ),
+    )
+
+    uptime_days = [
+        (
+            row.day,
+            row.online_seconds // 3600,
+            row.offline_seconds // 3600,
+            row.offline_occurrences,
+            row.download_errors,
+        )
+        for row in m.ComputerDailyUptime.query.order_by(m.ComputerDailyUptime.day)
+    ]
+    assert uptime_days == [
+        (DAY.date(), 2, 1, 1, 0),
+        ((DAY + timedelta(days=1)).date(), 1, 1, 1, 1),
+    ]
+
+    # Offline period over midnight is counted once
+    now = DAY + timedelta(days=2)
+    uptime = get_last_week_uptime([computer.id], now)[computer.id]
+    assert uptime.logged
+    assert uptime.offline_occurrences == 1
+    assert uptime.offline_time == timedelta(hours=2)
+    assert uptime.online_time == timedelta(hours=3)
+    assert uptime.download_errors == 1
+    assert uptime.first_backup_at == DAY + timedelta(hours=21)
+    assert uptime.last_backup_at == DAY + timedelta(hours=25, minutes=59, seconds=59)
+
+    # Rebuild keeps the same rollup
+    rebuild_availability(computer.id)
+    test_db.session.commit()
+    assert get_last_week_uptime([computer.id], now)[computer.id] == uptime
+
+    # The first day is 7 days ago, only 7 days are summed up
+    week_later = get_last_week_uptime([computer.id], now + timedelta(days=5, hours=12))
+    assert week_later[computer.id].online_time == timedelta(hours=1)
+    assert week_later[computer.id].download_errors == 1
+
+    computer.last_week_uptime = uptime
+    assert computer.last_week_offline_occurrences == 1
+    assert computer.last_week_offline_time == timedelta(hours=2)
+
+    # No backup periods during the last week
+    computer.last_week_uptime = get_last_week_uptime(
+        [computer.id], now + timedelta(days=30)
+    )[computer.id]
+    assert computer.last_week_offline_occurrences == 1
+    assert computer.last_week_offline_time == timedelta(days=7)
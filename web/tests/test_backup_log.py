@@ -0,0 +1,304 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models as m
+from app.controllers import (
+    apply_backup_event,
+    create_log_event,
+    log_event,
+    replay_backup_logs,
+    sweep_backup_logs,
+)
+from app.controllers.backup_log import (
+    BackupLogError,
+    is_merged,
+    replay_backup_events,
+)
+from app.controllers.log_event import LogEventsLagError
+from app.schema import BackupEvent, BackupEventType
+from config import BaseConfig as CFG
+
+
+DAY = datetime(2024, 3, 1)
+
+
+def event(event_type: BackupEventType, hour: int, minute: int = 10, message=""):
+    return BackupEvent(
+        event_type=event_type,
+        time=DAY + timedelta(hours=hour, minutes=minute),
+        message=message,
+    )
+
+
+def periods_view(periods):
+    return [
+        (
+            period.backup_log_type,
+            period.start_time.hour,
+            period.end_time.hour,
+            period.error,
+            period.notes,
+        )
+        for period in periods
+    ]
+
+
+def test_apply_backup_event():
+    enabled_at = DAY - timedelta(days=1)
+
+    # Downloads in consecutive hours extend the period
+    updated, created = apply_backup_event(
+        None, enabled_at, None, event(BackupEventType.DOWNLOAD_SUCCESS, 8)
+    )
+    assert updated is None
+    assert periods_view(created) == [
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 8, 8, "", "")
+    ]
+
+    updated, created = apply_backup_event(
+        created[0], enabled_at, None, event(BackupEventType.DOWNLOAD_SUCCESS, 9)
+    )
+    assert not created
+    assert (updated.start_time.hour, updated.end_time.hour) == (8, 9)
+
+    # Download error in the hour with a backup changes nothing
+    assert apply_backup_event(
+        updated, enabled_at, None, event(BackupEventType.DOWNLOAD_ERROR, 9, 30)
+    ) == (None, [])
+
+    # Gap - computer was offline
+    _, created = apply_backup_event(
+        updated, enabled_at, None, event(BackupEventType.DOWNLOAD_SUCCESS, 13)
+    )
+    assert periods_view(created) == [
+        (
+            m.BackupLogType.NO_DOWNLOADS_PERIOD,
+            10,
+            12,
+            BackupLogError.TWO_HOURS.value,
+            "Device is offline",
+        ),
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 13, 13, "", ""),
+    ]
+
+
+def test_download_errors_are_merged():
+    enabled_at = DAY - timedelta(days=1)
+    events = [
+        event(BackupEventType.DOWNLOAD_SUCCESS, 8),
+        event(BackupEventType.DOWNLOAD_ERROR, 9, message="Disk is full"),
+        event(BackupEventType.DOWNLOAD_ERROR, 10, message="Disk is full"),
+        event(BackupEventType.DOWNLOAD_ERROR, 11, message="Timeout"),
+        event(BackupEventType.DOWNLOAD_SUCCESS, 12),
+    ]
+
+    updated, created = replay_backup_events(None, enabled_at, None, events)
+    assert updated is None
+    assert periods_view(created) == [
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 8, 8, "", ""),
+        (
+            m.BackupLogType.NO_DOWNLOADS_PERIOD,
+            9,
+            11,
+            BackupLogError.TWO_HOURS.value,
+            "Timeout",
+        ),
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 12, 12, "", ""),
+    ]
+
+
+def test_download_after_error_of_the_same_hour():
+    enabled_at = DAY - timedelta(days=1)
+    _, (with_downloads,) = apply_backup_event(
+        None, enabled_at, None, event(BackupEventType.DOWNLOAD_SUCCESS, 8)
+    )
+    _, (no_downloads,) = apply_backup_event(
+        with_downloads, enabled_at, None, event(BackupEventType.DOWNLOAD_ERROR, 9, 5)
+    )
+    assert (no_downloads.start_time.hour, no_downloads.end_time.hour) == (9, 9)
+
+    # The hour is merged into the previous period instead of a second WITH_DOWNLOADS one
+    updated, created = apply_backup_event(
+        no_downloads,
+        enabled_at,
+        None,
+        event(BackupEventType.DOWNLOAD_SUCCESS, 9, 30),
+        with_downloads,
+    )
+    assert not created
+    assert is_merged(no_downloads, updated)
+    assert periods_view([updated]) == [
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 8, 9, "", "")
+    ]
+
+    updated, created = replay_backup_events(
+        None,
+        enabled_at,
+        None,
+        [
+            event(BackupEventType.DOWNLOAD_SUCCESS, 8),
+            event(BackupEventType.DOWNLOAD_ERROR, 9, 5),
+            event(BackupEventType.DOWNLOAD_SUCCESS, 9, 30),
+            event(BackupEventType.DOWNLOAD_SUCCESS, 10),
+        ],
+    )
+    assert updated is None
+    assert periods_view(created) == [
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 8, 10, "", "")
+    ]
+
+
+def test_logs_disabled_time_is_skipped():
+    _, (last_period,) = apply_backup_event(
+        None, DAY, None, event(BackupEventType.DOWNLOAD_SUCCESS, 8)
+    )
+
+    # Logs were disabled at 11:20 and enabled at 15:40
+    disabled_at = DAY + timedelta(hours=11, minutes=20)
+    enabled_at = DAY + timedelta(hours=15, minutes=40)
+
+    _, created = apply_backup_event(
+        last_period,
+        enabled_at,
+        disabled_at,
+        event(BackupEventType.SWEEP, 17),
+    )
+    assert [(p.start_time.hour, p.end_time.hour) for p in created] == [
+        (9, 10),
+        (15, 17),
+    ]
+
+
+def test_replay_backup_logs(test_db):
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    computer.last_time_logs_enabled = datetime.utcnow() - timedelta(days=30)
+    start = datetime.utcnow().replace(minute=5, second=0, microsecond=0) - timedelta(
+        hours=10
+    )
+
+    # Downloads for 4 hours, then 2 hours of errors and downloads again
+    for hour, log_type in enumerate(
+        [m.LogType.BACKUP_DOWNLOAD] * 4
+        + [m.LogType.CLIENT_ERROR] * 2
+        + [m.LogType.BACKUP_DOWNLOAD] * 4
+    ):
+        test_db.session.add(
+            m.LogEvent(
+                computer_id=computer.id,
+                log_type=log_type,
+                created_at=CFG.offset_to_est(start + timedelta(hours=hour), True),
+                data="Error" if log_type == m.LogType.CLIENT_ERROR else "",
+            )
+        )
+    # Wrong periods to repair
+    test_db.session.add(
+        m.BackupLog(
+            computer_id=computer.id,
+            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
+            start_time=start.replace(minute=0),
+            end_time=start.replace(minute=0) + timedelta(hours=10),
+        )
+    )
+    test_db.session.commit()
+
+    now = start + timedelta(hours=9, minutes=20)
+    assert replay_backup_logs(computer, now=now) == 3
+    # Replay is idempotent
+    assert replay_backup_logs(computer, now=now) == 3
+
+    backup_logs = m.BackupLog.query.order_by(m.BackupLog.start_time).all()
+    assert [
+        (log.backup_log_type, log.duration // timedelta(hours=1) + 1, log.notes)
+        for log in backup_logs
+    ] == [
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 4, ""),
+        (m.BackupLogType.NO_DOWNLOADS_PERIOD, 2, "Error"),
+        (m.BackupLogType.WITH_DOWNLOADS_PERIOD, 4, ""),
+    ]
+    # Download errors are counted from the log events
+    assert sum(row.download_errors for row in m.ComputerDailyUptime.query.all()) == 2
+
+
+def test_sweep_backup_logs(test_db):
+    now = datetime.utcnow().replace(minute=40, second=0, microsecond=0)
+    hour = now.replace(minute=0)
+    computers = m.Computer.query.order_by(m.Computer.id).all()
+    offline, with_no_period, not_activated = computers[:3]
+    for computer in computers:
+        computer.logs_enabled = computer in (offline, with_no_period, not_activated)
+        computer.activated = computer is not not_activated
+        computer.last_time_logs_enabled = now - timedelta(days=30)
+        computer.last_time_logs_disabled = None
+
+    # Last backup was 5 hours ago
+    test_db.session.add(
+        m.BackupLog(
+            computer_id=offline.id,
+            backup_log_type=m.BackupLogType.WITH_DOWNLOADS_PERIOD,
+            start_time=hour - timedelta(hours=8),
+            end_time=hour - timedelta(hours=4, seconds=1),
+        )
+    )
+    # Computer is offline for 3 hours already
+    test_db.session.add(
+        m.BackupLog(
+            computer_id=with_no_period.id,
+            backup_log_type=m.BackupLogType.NO_DOWNLOADS_PERIOD,
+            start_time=hour - timedelta(hours=3),
+            end_time=hour - timedelta(hours=1, seconds=1),
+        )
+    )
+    test_db.session.commit()
+
+    assert sweep_backup_logs(now) == 2
+    # Nothing to change till the next hour
+    assert sweep_backup_logs(now) == 0
+
+    offline_logs = (
+        m.BackupLog.query.filter_by(computer_id=offline.id)
+        .order_by(m.BackupLog.start_time)
+        .all()
+    )
+    assert [
+        (log.backup_log_type, log.start_time, log.end_time) for log in offline_logs
+    ] == [
+        (
+            m.BackupLogType.WITH_DOWNLOADS_PERIOD,
+            hour - timedelta(hours=8),
+            hour - timedelta(hours=4, seconds=1),
+        ),
+        (
+            m.BackupLogType.NO_DOWNLOADS_PERIOD,
+            hour - timedelta(hours=4),
+            hour + timedelta(minutes=59, seconds=59),
+        ),
+    ]
+
+    (no_period,) = m.BackupLog.query.filter_by(computer_id=with_no_period.id).all()
+    assert no_period.start_time == hour - timedelta(hours=3)
+    assert no_period.end_time == hour + timedelta(minutes=59, seconds=59)
+
+    assert not m.BackupLog.query.filter_by(computer_id=not_activated.id).all()
+
+
+@pytest.mark.skipif(not CFG.REDIS_URL, reason="Redis is not configured")
+def test_replay_drains_log_events_stream(test_db, monkeypatch):
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    computer.last_time_logs_enabled = datetime.utcnow() - timedelta(days=30)
+    test_db.session.commit()
+    created_at = CFG.offset_to_est(datetime.utcnow() - timedelta(hours=2), True)
+
+    # The event is still in the stream
+    monkeypatch.setattr(log_event, "drain_log_events_stream", lambda: 0)
+    create_log_event(computer, m.LogType.BACKUP_DOWNLOAD, created_at=created_at)
+    with pytest.raises(LogEventsLagError):
+        replay_backup_logs(computer)
+
+    # It's inserted before the replay
+    monkeypatch.undo()
+    assert replay_backup_logs(computer)
+    assert m.BackupLog.query.filter_by(
+        computer_id=computer.id,
+        backup_log_type=m.BackupLogType.WITH_DOWNLOADS_PERIOD,
+    ).all()
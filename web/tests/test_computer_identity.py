@@ -0,0 +1,41 @@
+from app.models import Computer
+from app.controllers import find_agent_computer, get_computer_identity
+
+
+def test_find_agent_computer(test_db):
+    computer, computer_by_name = find_agent_computer(
+        "comp3_identifier_key", "comp1_intime"
+    )
+    assert computer.computer_name == "comp3_test"
+    assert computer_by_name.computer_name == "comp1_intime"
+
+    computer, computer_by_name = find_agent_computer(
+        "comp3_identifier_key", "comp1_intime", match_name=True
+    )
+    assert not computer
+    assert computer_by_name.computer_name == "comp1_intime"
+
+    computer, computer_by_name = find_agent_computer(
+        "comp3_identifier_key", "comp3_test", match_name=True
+    )
+    assert computer.computer_name == "comp3_test"
+    assert computer_by_name is computer
+
+    computer, computer_by_name = find_agent_computer("wrong_key", "wrong_name")
+    assert not computer
+    assert not computer_by_name
+
+
+def test_computer_identity_invalidation(test_db):
+    computer: Computer = Computer.query.filter_by(computer_name="comp3_test").first()
+
+    identity = get_computer_identity("comp3_identifier_key")
+    assert identity.computer_id == computer.id
+    assert identity.msi_version == computer.msi_version
+
+    computer.msi_version = "latest"
+    computer.update()
+    assert get_computer_identity("comp3_identifier_key").msi_version == "latest"
+
+    computer.delete()
+    assert not get_computer_identity("comp3_identifier_key")
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db, models as m
+from app.controllers import (
+    backup_log_on_download_success,
+    get_computer_lock_metrics,
+    on_backup_event,
+    rebuild_availability,
+)
+from app.schema import BackupEvent, BackupEventType
+
+
+def test_concurrent_backup_events(test_db):
+    app = current_app._get_current_object()
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=6
+    )
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    computer.last_time_logs_enabled = start - timedelta(days=1)
+    test_db.session.commit()
+    computer_id = computer.id
+    acquired_before = get_computer_lock_metrics()["acquired"]
+
+    def send_event(event: BackupEvent):
+        with app.app_context():
+            computer = db.session.get(m.Computer, computer_id)
+            if event.event_type == BackupEventType.DOWNLOAD_SUCCESS:
+                backup_log_on_download_success(computer, event.time)
+            else:
+                on_backup_event(computer, event)
+            db.session.remove()
+
+    # /last_time and /download_status of the same computer arrive at the same time
+    events_count = 0
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for hour in range(6):
+            events = [
+                BackupEvent(
+                    event_type=event_type,
+                    time=start + timedelta(hours=hour, minutes=minute),
+                )
+                for minute in range(0, 40, 5)
+                for event_type in (
+                    BackupEventType.DOWNLOAD_SUCCESS
+                    if hour % 3
+                    else BackupEventType.DOWNLOAD_ERROR,
+                    BackupEventType.DOWNLOAD_ERROR,
+                )
+            ]
+            list(executor.map(send_event, events))
+            events_count += len(events)
+
+    backup_logs = (
+        m.BackupLog.query.filter_by(computer_id=computer_id)
+        .order_by(m.BackupLog.start_time)
+        .all()
+    )
+    # Every hour is covered by exactly one period
+    assert backup_logs[0].start_time == start
+    assert backup_logs[-1].end_time == start + timedelta(
+        hours=5, minutes=59, seconds=59
+    )
+    for previous, backup_log in zip(backup_logs, backup_logs[1:]):
+        assert backup_log.start_time == previous.end_time + timedelta(seconds=1)
+    assert [log.backup_log_type for log in backup_logs] == [
+        m.BackupLogType.NO_DOWNLOADS_PERIOD,
+        m.BackupLogType.WITH_DOWNLOADS_PERIOD,
+        m.BackupLogType.NO_DOWNLOADS_PERIOD,
+        m.BackupLogType.WITH_DOWNLOADS_PERIOD,
+    ]
+
+    metrics = get_computer_lock_metrics()
+    assert metrics["acquired"] - acquired_before == events_count
+    assert metrics["wait_seconds_total"] >= 0
+
+    # Availability days were updated in the same order as the backup logs
+    availability = [
+        (row.day, row.green, row.yellow, row.red)
+        for row in m.ComputerAvailability.query.order_by(m.ComputerAvailability.day)
+    ]
+    rebuild_availability(computer_id)
+    test_db.session.commit()
+    assert availability == [
+        (row.day, row.green, row.yellow, row.red)
+        for row in m.ComputerAvailability.query.order_by(m.ComputerAvailability.day)
+    ]
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import models as m
+from app.controllers import (
+    buffer_heartbeat,
+    detect_status_transitions,
+    load_computers_status,
+)
+from config import BaseConfig as CFG
+
+
+def test_detect_status_transitions(test_db):
+    now = datetime.utcnow()
+    current_east_time = CFG.offset_to_est(now, True)
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    for other_computer in m.Computer.query.all():
+        other_computer.activated = other_computer is computer
+    computer.last_download_time = current_east_time - timedelta(minutes=85)
+    computer.last_time_online = current_east_time
+    test_db.session.commit()
+
+    detect_status_transitions(now)
+    # First evaluation of the status is not logged
+    assert not m.LogEvent.query.filter_by(computer_id=computer.id).all()
+    assert computer.current_status == m.ComputerStatus.ONLINE
+    assert computer.status_deadline == computer.last_download_time + timedelta(
+        minutes=90, seconds=1
+    )
+    # Statuses of all computers are the same as Computer.status
+    for other_computer in m.Computer.query.all():
+        assert other_computer.current_status == other_computer.status
+
+    # Nothing is due
+    assert detect_status_transitions(now + timedelta(minutes=1)) == 0
+
+    # No download for 90 minutes, then no heartbeat for 10 minutes
+    assert detect_status_transitions(now + timedelta(minutes=5, seconds=30)) == 1
+    assert computer.current_status == m.ComputerStatus.ONLINE_NO_BACKUP
+    assert detect_status_transitions(now + timedelta(minutes=11)) == 1
+    assert computer.current_status == m.ComputerStatus.OFFLINE_NO_BACKUP
+    assert not m.Computer.query.filter(
+        m.Computer.current_status == m.ComputerStatus.OFFLINE_NO_BACKUP,
+        m.Computer.status_deadline.is_not(None),
+    ).all()
+
+    # Buffered heartbeat makes the computer due
+    buffer_heartbeat(
+        computer, None, CFG.offset_to_est(now + timedelta(minutes=11), True)
+    )
+    assert detect_status_transitions(now + timedelta(minutes=12)) == 1
+    assert computer.current_status == m.ComputerStatus.ONLINE_NO_BACKUP
+
+    log_events = (
+        m.LogEvent.query.filter_by(computer_id=computer.id)
+        .order_by(m.LogEvent.id)
+        .all()
+    )
+    assert [(log_event.log_type, log_event.data) for log_event in log_events] == [
+        (m.LogType.STATUS_YELLOW, "ONLINE -> ONLINE_NO_BACKUP"),
+        (m.LogType.STATUS_RED, "ONLINE_NO_BACKUP -> OFFLINE_NO_BACKUP"),
+        (m.LogType.STATUS_YELLOW, "OFFLINE_NO_BACKUP -> ONLINE_NO_BACKUP"),
+    ]
+
+
+def test_status_deadline_on_times_set(test_db):
+    current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+    deadline = current_east_time + timedelta(hours=1)
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    computer.activated = True
+    computer.last_download_time = current_east_time - timedelta(minutes=30)
+    computer.last_time_online = current_east_time - timedelta(minutes=30)
+    computer.current_status = m.ComputerStatus.ONLINE
+    computer.status_deadline = deadline
+
+    # Newer times can't change ONLINE status right away
+    computer.last_time_online = current_east_time
+    computer.last_download_time = current_east_time
+    assert computer.status_deadline == deadline
+
+    # Time moved back
+    computer.last_download_time = current_east_time - timedelta(hours=2)
+    assert computer.status_deadline <= CFG.offset_to_est(datetime.utcnow(), True)
+
+    # Heartbeat of the offline computer
+    computer.current_status = m.ComputerStatus.OFFLINE_NO_BACKUP
+    computer.status_deadline = None
+    computer.last_time_online = current_east_time + timedelta(minutes=1)
+    assert computer.status_deadline <= CFG.offset_to_est(datetime.utcnow(), True)
+    test_db.session.rollback()
+
+
+def test_status_events_of_disabled_logs(test_db):
+    now = datetime.utcnow()
+    current_east_time = CFG.offset_to_est(now, True)
+    computer = m.Computer.query.filter_by(computer_name="comp3_test").first()
+    for other_computer in m.Computer.query.all():
+        other_computer.activated = other_computer is computer
+    computer.logs_enabled = False
+    computer.last_download_time = None
+    computer.last_time_online = current_east_time
+    test_db.session.commit()
+    detect_status_transitions(now)
+    assert computer.current_status == m.ComputerStatus.ONLINE_NO_BACKUP
+
+    # Status is updated, but not logged
+    assert detect_status_transitions(now + timedelta(minutes=11)) == 1
+    assert computer.current_status == m.ComputerStatus.OFFLINE_NO_BACKUP
+    assert not m.LogEvent.query.filter_by(
+        computer_id=computer.id, log_type=m.LogType.STATUS_RED
+    ).all()
+
+
+def test_load_computers_status(test_db):
+    computers = m.Computer.query.all()
+    statuses = load_computers_status(computers)
+    assert statuses == {computer.id: computer.status for computer in computers}
+
+    queries = []
+
+    def count_query(*_):
+        queries.append(1)
+
+    event.listen(test_db.engine, "before_cursor_execute", count_query)
+    # Statuses of all the computers are evaluated with the same current time
+    load_computers_status(computers, datetime.utcnow() + timedelta(days=1))
+    assert {computer.status for computer in computers} <= {
+        m.ComputerStatus.OFFLINE_NO_BACKUP,
+        m.ComputerStatus.NOT_ACTIVATED,
+    }
+    event.remove(test_db.engine, "before_cursor_execute", count_query)
+    assert not queries
+
+    # Changed computer is evaluated again
+    computers[0].activated = True
+    computers[0].last_time_online = CFG.offset_to_est(datetime.utcnow(), True)
+    assert computers[0].status != m.ComputerStatus.OFFLINE_NO_BACKUP
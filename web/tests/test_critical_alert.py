@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from app import mail, models as m
+from app.controllers import send_critical_alert
+from config import BaseConfig as CFG
+
+from .conftest import app
+
+
+def test_send_critical_alert(test_db, monkeypatch):
+    monkeypatch.setattr(CFG, "MAIL_DEFAULT_SENDER", "alerts@test.com")
+    current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+    for company in m.Company.query.all():
+        company.activated = True
+        company.is_trial = False
+    for location in m.Location.query.all():
+        location.activated = True
+    maywood = m.Location.query.filter_by(name="Maywood").first()
+    for computer in m.Computer.query.all():
+        computer.activated = True
+        computer.last_download_time = current_east_time
+    test_db.session.commit()
+
+    def set_offline(period: timedelta):
+        for computer in maywood.computers:
+            computer.last_download_time = current_east_time - period
+        test_db.session.commit()
+
+    def send() -> list:
+        with app.test_request_context(), mail.record_messages() as outbox:
+            send_critical_alert()
+        return outbox
+
+    # Online locations are not alerted
+    assert not send()
+
+    # Offline for an odd number of hours - alerted every 2 hours only
+    set_offline(timedelta(hours=3, minutes=30))
+    assert not send()
+
+    # Offline less than 4 hours - only location level users are alerted
+    set_offline(timedelta(hours=2, minutes=30))
+    outbox = send()
+    assert [message.subject for message in outbox] == [
+        "ALERT! Location Maywood is offline"
+    ]
+    location_users = {
+        user.email
+        for user in m.User.query.filter_by(company_id=maywood.company_id)
+        if user.permission == m.UserPermissionLevel.LOCATION
+        and user.location[0].id == maywood.id
+    }
+    assert set(outbox[0].recipients) == location_users
+    assert (
+        m.AlertEvent.query.filter_by(
+            location_id=maywood.id, alert_type=m.AlertEventType.CRITICAL_ALERT
+        ).count()
+        == 1
+    )
+
+    # Offline more than 4 hours - company level users are alerted too
+    set_offline(timedelta(hours=4, minutes=30))
+    outbox = send()
+    assert len(outbox) == 1
+    company_users = {
+        user.email
+        for user in m.User.query.filter_by(
+            company_id=maywood.company_id, activated=True
+        )
+        if user.permission == m.UserPermissionLevel.COMPANY
+    }
+    assert company_users
+    assert set(outbox[0].recipients) == location_users | company_users
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta
+
+from app import models as m
+from app.controllers import (
+    check_dashboard_snapshots,
+    count_dashboard_counters,
+    get_dashboard_counters,
+    update_companies_locations_statistic,
+)
+from app.controllers import dashboard
+from app.schema import DashboardCounters
+from app.utils import delete_cached
+from config import BaseConfig as CFG
+
+
+def computers_view(computers: list[m.Computer]) -> dict:
+    activated = [c for c in computers if c.activated]
+    online = [c for c in activated if c.status == m.ComputerStatus.ONLINE]
+    offline = [c for c in activated if c.status != m.ComputerStatus.ONLINE]
+    primary, alternate = m.DeviceRole.PRIMARY, m.DeviceRole.ALTERNATE
+    return dict(
+        total_computers=len(computers),
+        activated_computers=len(activated),
+        computers_online=len(online),
+        computers_offline=len(offline),
+        activated_primary=len([c for c in activated if c.device_role == primary]),
+        primary_online=len([c for c in online if c.device_role == primary]),
+        primary_offline=len([c for c in offline if c.device_role == primary]),
+        activated_alternate=len([c for c in activated if c.device_role == alternate]),
+        alternate_online=len([c for c in online if c.device_role == alternate]),
+        alternate_offline=len([c for c in offline if c.device_role == alternate]),
+    )
+
+
+def test_dashboard_counters(test_db):
+    current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+    for i, computer in enumerate(m.Computer.query.order_by(m.Computer.id).all()):
+        computer.activated = i != 1
+        computer.device_role = m.DeviceRole.PRIMARY if i % 2 else m.DeviceRole.ALTERNATE
+        computer.last_download_time = current_east_time - timedelta(hours=i)
+    test_db.session.commit()
+    update_companies_locations_statistic()
+
+    # Global scope
+    counters = count_dashboard_counters(m.UserPermissionLevel.GLOBAL)
+    assert counters.dict(include=set(computers_view([]))) == computers_view(
+        m.Computer.query.all()
+    )
+    locations = m.Location.query.filter(m.Location.computers_per_location > 0).all()
+    assert counters.total_locations == len(locations)
+    assert counters.locations_online == len(
+        [loc for loc in locations if loc.status == m.LocationStatus.ONLINE]
+    )
+
+    # Company scope
+    company = m.Company.query.filter_by(name="Atlas").first()
+    counters = count_dashboard_counters(m.UserPermissionLevel.COMPANY, company.id)
+    assert counters.dict(include=set(computers_view([]))) == computers_view(
+        m.Computer.query.filter_by(company_id=company.id).all()
+    )
+    assert counters.total_locations == len(
+        [loc for loc in locations if loc.company_id == company.id]
+    )
+
+    # Location scope
+    location = m.Location.query.filter_by(name="Maywood").first()
+    counters = count_dashboard_counters(m.UserPermissionLevel.LOCATION, location.id)
+    assert counters.dict(include=set(computers_view([]))) == computers_view(
+        location.computers
+    )
+
+
+def test_dashboard_counters_cache(test_db):
+    viewer = m.User.query.filter_by(username="test_user_company").first()
+    counters = get_dashboard_counters(viewer)
+    assert counters.total_computers
+
+    # Counters are cached for the scope
+    for computer in m.Computer.query.all():
+        computer.delete()
+    assert get_dashboard_counters(viewer) == counters
+    assert not count_dashboard_counters(
+        m.UserPermissionLevel.COMPANY, viewer.company_id
+    ).total_computers
+
+
+def test_dashboard_snapshots(test_db):
+    company = m.Company.query.filter_by(name="Atlas").first()
+    group = m.LocationGroup(
+        name="Group", company_id=company.id, locations=company.locations[:1]
+    )
+    group.save()
+    current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+    for i, computer in enumerate(m.Computer.query.order_by(m.Computer.id).all()):
+        computer.device_role = m.DeviceRole.PRIMARY if i % 2 else m.DeviceRole.ALTERNATE
+        computer.last_download_time = current_east_time - timedelta(hours=i)
+    test_db.session.commit()
+    update_companies_locations_statistic()
+
+    # Every scope has a snapshot equal to the live counters
+    for level, scope_id in [
+        (m.UserPermissionLevel.GLOBAL, None),
+        (m.UserPermissionLevel.COMPANY, company.id),
+        (m.UserPermissionLevel.LOCATION_GROUP, group.id),
+        (m.UserPermissionLevel.LOCATION, company.locations[0].id),
+    ]:
+        scope = f"{level.value.lower()}:{scope_id}" if scope_id else "global"
+        snapshot = m.DashboardSnapshot.query.filter_by(scope=scope).first()
+        assert snapshot
+        assert DashboardCounters.from_orm(snapshot) == count_dashboard_counters(
+            level, scope_id
+        )
+    assert m.DashboardSnapshot.query.count() == (
+        1
+        + m.Company.query.count()
+        + m.LocationGroup.query.count()
+        + m.Location.query.count()
+    )
+    assert not check_dashboard_snapshots()
+
+    # The main page reads the snapshot of the viewer scope
+    viewer = m.User.query.filter_by(username="test_user_company").first()
+    delete_cached(dashboard.DASHBOARD_KEY.format(f"company:{viewer.company_id}"))
+    snapshot = m.DashboardSnapshot.query.filter_by(
+        scope=f"company:{viewer.company_id}"
+    ).first()
+    snapshot.total_computers += 1
+    snapshot.save()
+    assert get_dashboard_counters(viewer).total_computers == snapshot.total_computers
+    assert check_dashboard_snapshots() == [
+        f"company:{viewer.company_id}: total_computers "
+        f"{snapshot.total_computers} != {snapshot.total_computers - 1}"
+    ]
+
+    # Changed snapshots are fixed by the next refresh, deleted scopes are removed
+    group.delete()
+    update_companies_locations_statistic()
+    assert not check_dashboard_snapshots()
+    assert not m.DashboardSnapshot.query.filter_by(
+        scope=f"location_group:{group.id}"
+    ).first()
@@ -0,0 +1,44 @@
+from sqlalchemy import event
+
+from app import db
+from app.models import DesktopClient
+from app.controllers import (
+    get_desktop_client_id,
+    get_msi_version,
+    invalidate_desktop_clients_cache,
+)
+
+
+def test_desktop_clients_cache(test_db):
+    stable: DesktopClient = DesktopClient.query.filter_by(flag_name="stable").first()
+
+    assert get_msi_version("stable") == stable.version
+    assert get_desktop_client_id("stable") == stable.id
+    assert get_msi_version("1.0.9.110769") == "1.0.9.110769"
+    assert get_msi_version("latest") is None
+    assert get_msi_version("0.0.0.1") is None
+
+    # Cached values are resolved without queries
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        get_msi_version("stable")
+        get_desktop_client_id("1.0.9.110769")
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert not statements
+
+    new_client: DesktopClient = DesktopClient.query.filter_by(
+        version="1.0.9.110769"
+    ).first()
+    new_client.flag_name = "stable"
+    stable.flag_id = None
+    test_db.session.commit()
+
+    invalidate_desktop_clients_cache()
+    assert get_msi_version("stable") == "1.0.9.110769"
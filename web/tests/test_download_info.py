@@ -76,6 +76,27 @@ def test_get_credentials(client):
     assert response.status_code == 422
 
 
+def test_get_credentials_not_modified(client):
+    body = dict(identifier_key="comp4_identifier_key", computer_name="comp4_test")
+    response = client.post("/get_credentials", json=body)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.post("/get_credentials", json=body, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert not response.data
+
+    # Credentials changed - new ETag
+    computer: Computer = Computer.query.filter_by(computer_name="comp4_test").first()
+    computer.sftp_password = "new_password"
+    computer.update()
+
+    response = client.post("/get_credentials", json=body, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["sftp_password"] == "new_password"
+    assert response.headers["ETag"] != etag
+
+
 def test_download_status(client):
     response = client.post(
         "/download_status",
@@ -156,6 +177,84 @@ def test_files_checksum(client):
     assert response.status_code == 422
 
 
+def test_files_checksum_delta(client):
+    identifier_key = "comp3_identifier_key"
+    files_checksum = {"./a/backup.zip": "100-Jan-1-10:00", "./b/backup.zip": "200-Jan-1-10:00"}
+
+    response = client.post(
+        "/files_checksum",
+        json=dict(
+            last_time_online=str(datetime.datetime.now()),
+            identifier_key=identifier_key,
+            files_checksum=files_checksum,
+        ),
+    )
+    assert response.status_code == 200
+    digest = response.json["files_checksum_digest"]
+    assert digest
+
+    # Credentials without the whole files checksum, only its digest
+    response = client.post(
+        "/get_credentials",
+        json=dict(
+            computer_name="comp3_test",
+            identifier_key=identifier_key,
+            with_files_checksum=False,
+        ),
+    )
+    assert response.status_code == 200
+    assert response.json["files_checksum_digest"] == digest
+    assert response.json["files_checksum"] is None
+    etag = response.headers["ETag"]
+
+    response = client.post(
+        "/files_checksum",
+        json=dict(
+            last_time_online=str(datetime.datetime.now()),
+            identifier_key=identifier_key,
+            changed={"./b/backup.zip": "300-Jan-2-10:00", "./c/backup.zip": "1-Jan-2-10:00"},
+            removed=["./a/backup.zip"],
+            base_digest=digest,
+        ),
+    )
+    assert response.status_code == 200
+    new_digest = response.json["files_checksum_digest"]
+    assert new_digest != digest
+
+    # Files checksum upload doesn't change the credentials
+    response = client.post(
+        "/get_credentials",
+        json=dict(
+            computer_name="comp3_test",
+            identifier_key=identifier_key,
+            with_files_checksum=False,
+        ),
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+    response = client.get(f"/files_checksum?identifier_key={identifier_key}")
+    assert response.status_code == 200
+    assert response.json["files_checksum_digest"] == new_digest
+    assert response.json["files_checksum"] == {
+        "./b/backup.zip": "300-Jan-2-10:00",
+        "./c/backup.zip": "1-Jan-2-10:00",
+    }
+
+    # Delta made against outdated files checksum is rejected
+    response = client.post(
+        "/files_checksum",
+        json=dict(
+            last_time_online=str(datetime.datetime.now()),
+            identifier_key=identifier_key,
+            removed=["./b/backup.zip"],
+            base_digest=digest,
+        ),
+    )
+    assert response.status_code == 409
+    assert response.json["files_checksum_digest"] == new_digest
+
+
 def test_check_msi_version(client):
     computer_old_msi: Computer = Computer.query.filter_by(
         computer_name="comp1_intime"
@@ -176,3 +275,37 @@ def test_check_msi_version(client):
 
     assert last_download_old > last_download_new
     assert last_online_old > last_online_new
+
+
+def test_agent_sync(client):
+    response = client.post(
+        "/agent_sync",
+        json=dict(
+            identifier_key="comp3_identifier_key",
+            computer_name="comp3_test",
+            last_time_online=str(datetime.datetime.now()),
+            printer_info=dict(PrinterStatus=0, Name="test_printer"),
+            download_status=dict(download_status="downloading"),
+        ),
+    )
+
+    assert response.status_code == 200
+    assert response.json["status"] == "success"
+    assert response.json["agent_sync"]
+    assert "send_printer_info" in response.json
+    assert response.json["msi_version"] == "1.0.9.110769"
+
+    computer: Computer = Computer.query.filter_by(computer_name="comp3_test").first()
+    assert computer.printer_name == "test_printer"
+    assert computer.download_status == "downloading"
+
+    response = client.post(
+        "/agent_sync",
+        json=dict(
+            identifier_key="wrong_identifier_key",
+            computer_name="wrong_name",
+            last_time_online=str(datetime.datetime.now()),
+        ),
+    )
+    assert response.status_code == 400
+    assert response.json["rmcreds"] == "rmcreds"
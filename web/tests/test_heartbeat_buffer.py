@@ -0,0 +1,180 @@
+import datetime
+
+import pytest
+
+from app import db
+from app.models import Computer, ComputerStatus
+from app.controllers import (
+    flush_heartbeats,
+    get_pending_heartbeat,
+    load_computers_status,
+)
+from app.controllers import heartbeat_buffer
+
+from config import BaseConfig as CFG
+
+# Heartbeats are buffered only in Redis
+with_redis = pytest.mark.skipif(not CFG.REDIS_URL, reason="Redis is not configured")
+
+
+@with_redis
+def test_last_time_buffers_heartbeat(client):
+    computer: Computer = Computer.query.filter_by(computer_name="comp2_late").first()
+    computer_id = computer.id
+    db_last_time_online = computer.last_time_online
+    assert computer.status == ComputerStatus.OFFLINE_NO_BACKUP
+
+    response = client.post(
+        "/last_time",
+        json=dict(
+            identifier_key="comp2_identifier_key",
+            computer_name="comp2_late",
+            last_time_online=str(datetime.datetime.now()),
+            last_download_time=str(datetime.datetime.now()),
+        ),
+        headers={"X-Forwarded-For": "10.0.0.2"},
+    )
+    assert response.status_code == 200
+
+    # Heartbeat is buffered, computer row is not updated yet
+    assert get_pending_heartbeat(computer_id)
+    row = db.session.execute(
+        db.select(Computer.last_time_online).where(Computer.id == computer_id)
+    ).scalar_one()
+    assert row == db_last_time_online
+
+    # Loaded computers don't query the buffer, pages merge it in with one round trip
+    db.session.expunge_all()
+    computer = Computer.query.filter_by(id=computer_id).first()
+    assert computer.last_time_online == db_last_time_online
+    load_computers_status([computer])
+    assert computer.last_time_online > db_last_time_online
+    assert computer.computer_ip == "10.0.0.2"
+    assert computer.status == ComputerStatus.ONLINE
+
+    # Next heartbeat without download keeps buffered download time
+    client.post(
+        "/last_time",
+        json=dict(
+            identifier_key="comp2_identifier_key",
+            computer_name="comp2_late",
+            last_time_online=str(datetime.datetime.now()),
+        ),
+        headers={"X-Forwarded-For": "10.0.0.2"},
+    )
+    assert get_pending_heartbeat(computer_id).last_download_time
+
+    assert flush_heartbeats() >= 1
+    assert not get_pending_heartbeat(computer_id)
+
+    row = db.session.execute(
+        db.select(
+            Computer.last_time_online,
+            Computer.last_download_time,
+            Computer.computer_ip,
+        ).where(Computer.id == computer_id)
+    ).one()
+    current_east_time = CFG.offset_to_est(datetime.datetime.utcnow(), True)
+    assert current_east_time - row.last_time_online < datetime.timedelta(minutes=1)
+    assert current_east_time - row.last_download_time < datetime.timedelta(minutes=1)
+    assert row.computer_ip == "10.0.0.2"
+
+
+@with_redis
+def test_flush_does_not_move_time_back(client):
+    computer: Computer = Computer.query.filter_by(computer_name="comp3_test").first()
+    computer_id = computer.id
+
+    client.post(
+        "/last_time",
+        json=dict(
+            identifier_key="comp3_identifier_key",
+            computer_name="comp3_test",
+            last_time_online=str(datetime.datetime.now()),
+        ),
+    )
+    buffered_time = get_pending_heartbeat(computer_id).last_time_online
+
+    # Newer time written directly (e.g. by /download_status)
+    newer_time = buffered_time + datetime.timedelta(minutes=5)
+    computer = Computer.query.filter_by(id=computer_id).first()
+    computer.last_time_online = newer_time
+    computer.update()
+
+    flush_heartbeats()
+
+    row = db.session.execute(
+        db.select(Computer.last_time_online).where(Computer.id == computer_id)
+    ).scalar_one()
+    assert row == newer_time
+
+
+@pytest.mark.skipif(bool(CFG.REDIS_URL), reason="Redis is configured")
+def test_heartbeat_written_through_without_redis(client):
+    computer: Computer = Computer.query.filter_by(computer_name="comp2_late").first()
+    computer_id = computer.id
+
+    for url in ("/last_time", "/get_credentials"):
+        response = client.post(
+            url,
+            json=dict(
+                identifier_key="comp2_identifier_key",
+                computer_name="comp2_late",
+                last_time_online=str(datetime.datetime.now()),
+            ),
+            headers={"X-Forwarded-For": "10.0.0.2"},
+        )
+        assert response.status_code == 200
+
+        # Nothing is buffered - computer row is updated by the request
+        assert not get_pending_heartbeat(computer_id)
+        assert not flush_heartbeats()
+        row = db.session.execute(
+            db.select(Computer.last_time_online, Computer.computer_ip).where(
+                Computer.id == computer_id
+            )
+        ).one()
+        current_east_time = CFG.offset_to_est(datetime.datetime.utcnow(), True)
+        assert current_east_time - row.last_time_online < datetime.timedelta(minutes=1)
+        assert row.computer_ip == "10.0.0.2"
+
+        # Next request has to update the row again
+        db.session.execute(
+            db.update(Computer)
+            .where(Computer.id == computer_id)
+            .values(last_time_online=None, computer_ip=None)
+        )
+        db.session.commit()
+
+
+@with_redis
+def test_failed_flush_keeps_heartbeats(client, monkeypatch):
+    computer: Computer = Computer.query.filter_by(computer_name="comp3_test").first()
+    computer_id = computer.id
+    client.post(
+        "/last_time",
+        json=dict(
+            identifier_key="comp3_identifier_key",
+            computer_name="comp3_test",
+            last_time_online=str(datetime.datetime.now()),
+        ),
+    )
+
+    def write_heartbeats(records):
+        raise ConnectionError("Database is gone")
+
+    # Flush is killed after the buffer is taken
+    monkeypatch.setattr(heartbeat_buffer, "_write_heartbeats", write_heartbeats)
+    with pytest.raises(ConnectionError):
+        flush_heartbeats()
+    assert get_pending_heartbeat(computer_id)
+
+    # The next flush writes them
+    monkeypatch.undo()
+    assert flush_heartbeats() >= 1
+    assert not get_pending_heartbeat(computer_id)
+    row = db.session.execute(
+        db.select(Computer.last_time_online).where(Computer.id == computer_id)
+    ).scalar_one()
+    current_east_time = CFG.offset_to_est(datetime.datetime.utcnow(), True)
+    assert current_east_time - row < datetime.timedelta(minutes=1)
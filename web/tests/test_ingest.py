@@ -0,0 +1,118 @@
+import datetime
+
+import pytest
+
+from app import db
+from app.models import Computer, LogEvent, LogType
+
+from .conftest import app
+
+starlette_testclient = pytest.importorskip("starlette.testclient")
+
+
+@pytest.fixture
+def ingest_client(test_db):
+    from app.ingest import create_ingest_app
+
+    with starlette_testclient.TestClient(create_ingest_app(app)) as client:
+        yield client
+
+
+def test_ingest_last_time(ingest_client):
+    response = ingest_client.post(
+        "/last_time",
+        json=dict(
+            identifier_key="comp3_identifier_key",
+            computer_name="comp3_test",
+            last_time_online=str(datetime.datetime.now()),
+            last_download_time=str(datetime.datetime.now()),
+        ),
+    )
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+    assert response.json()["msi_version"] == "1.0.9.110769"
+
+    db.session.expire_all()
+    computer: Computer = Computer.query.filter_by(computer_name="comp3_test").first()
+    assert computer.last_download_time
+    assert LogEvent.query.filter_by(
+        computer_id=computer.id, log_type=LogType.BACKUP_DOWNLOAD
+    ).first()
+
+    response = ingest_client.post(
+        "/last_time",
+        json=dict(
+            identifier_key="WRONG_identifier_key",
+            computer_name="comp3_test",
+            last_time_online=str(datetime.datetime.now()),
+        ),
+    )
+    assert response.status_code == 400
+    assert "rmcreds" not in response.json()
+
+    response = ingest_client.post(
+        "/last_time",
+        json=dict(
+            identifier_key="WRONG_identifier_key",
+            computer_name="WRONG_name",
+            last_time_online=str(datetime.datetime.now()),
+        ),
+    )
+    assert response.status_code == 400
+    assert response.json()["rmcreds"] == "rmcreds"
+
+    response = ingest_client.post("/last_time", json=dict(computer_name="comp3_test"))
+    assert response.status_code == 422
+
+
+def test_ingest_agent_data(ingest_client):
+    now = str(datetime.datetime.now())
+
+    response = ingest_client.post(
+        "/download_status",
+        json=dict(
+            company_name="Test",
+            location_name="Test",
+            download_status="downloading",
+            last_time_online=now,
+            identifier_key="comp3_identifier_key",
+        ),
+    )
+    assert response.status_code == 200
+
+    response = ingest_client.post(
+        "/files_checksum",
+        json=dict(
+            last_time_online=now,
+            identifier_key="comp3_identifier_key",
+            files_checksum={"./backup.zip": "1-Jan-1-10:00"},
+        ),
+    )
+    assert response.status_code == 200
+    assert response.json()["files_checksum_digest"]
+
+    response = ingest_client.post(
+        "/printer_info",
+        json=dict(
+            identifier_key="comp3_identifier_key",
+            printer_info=dict(PrinterStatus=0, Name="printer"),
+        ),
+    )
+    assert response.status_code == 200
+
+    response = ingest_client.post(
+        "/special_status",
+        json=dict(
+            identifier_key="comp3_identifier_key",
+            computer_name="WRONG_name",
+            special_status="red - ip blacklisted",
+        ),
+    )
+    assert response.status_code == 404
+
+    db.session.expire_all()
+    computer: Computer = Computer.query.filter_by(computer_name="comp3_test").first()
+    assert computer.download_status == "downloading"
+    assert computer.printer_name == "printer"
+    assert computer.files_checksum_digest
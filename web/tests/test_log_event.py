@@ -1,5 +1,16 @@
+from datetime import datetime
+
+import pytest
+
 from app.models import Computer, LogType, LogEvent
-from app.controllers import create_log_event
+from app.controllers import (
+    create_log_event,
+    bulk_insert_log_events,
+    drain_log_events_stream,
+)
+from app.controllers.log_event import LOG_EVENTS_DEAD_LETTERS, LOG_EVENTS_STREAM
+from app.utils import get_redis
+from config import BaseConfig as CFG
 
 
 def test_create_log_event(test_db):
@@ -27,3 +38,82 @@ def test_create_log_event(test_db):
     )
     assert len(upgrade_logs) == 1
     assert upgrade_logs[0].data == data
+
+
+def test_bulk_insert_log_events(test_db):
+    test_computer = (
+        test_db.session.query(Computer).filter_by(computer_name="comp3_test").first()
+    )
+
+    inserted = bulk_insert_log_events(
+        [
+            dict(
+                computer_id=test_computer.id,
+                log_type=LogType.HEARTBEAT,
+                created_at=datetime.utcnow(),
+                data="",
+            )
+            for _ in range(5)
+        ]
+    )
+
+    assert inserted == 5
+    assert (
+        test_db.session.query(LogEvent)
+        .filter_by(computer_id=test_computer.id, log_type=LogType.HEARTBEAT)
+        .count()
+        == 5
+    )
+
+
+@pytest.mark.skipif(not CFG.REDIS_URL, reason="Redis is not configured")
+def test_drain_log_events_stream_dead_letters(test_db):
+    test_computer = (
+        test_db.session.query(Computer).filter_by(computer_name="comp3_test").first()
+    )
+    redis_client = get_redis()
+    redis_client.delete(LOG_EVENTS_STREAM, LOG_EVENTS_DEAD_LETTERS)
+
+    create_log_event(test_computer, LogType.HEARTBEAT)
+    # Entry which can't be inserted doesn't block the others
+    redis_client.xadd(
+        LOG_EVENTS_STREAM,
+        dict(
+            computer_id=test_computer.id,
+            log_type="UNKNOWN",
+            created_at=datetime.utcnow().isoformat(),
+            data="",
+        ),
+    )
+    create_log_event(test_computer, LogType.HEARTBEAT)
+
+    assert drain_log_events_stream(max_seconds=5) == 2
+    assert (
+        test_db.session.query(LogEvent)
+        .filter_by(computer_id=test_computer.id, log_type=LogType.HEARTBEAT)
+        .count()
+        == 2
+    )
+    assert not redis_client.xlen(LOG_EVENTS_STREAM)
+    [(_, dead_letter)] = redis_client.xrange(LOG_EVENTS_DEAD_LETTERS)
+    assert dead_letter["log_type"] == "UNKNOWN"
+    assert dead_letter["error"]
+
+
+@pytest.mark.skipif(not CFG.REDIS_URL, reason="Redis is not configured")
+def test_full_log_events_stream(test_db, monkeypatch):
+    monkeypatch.setattr(CFG, "LOG_EVENTS_STREAM_MAXLEN", 1)
+    test_computer = (
+        test_db.session.query(Computer).filter_by(computer_name="comp3_test").first()
+    )
+    redis_client = get_redis()
+    redis_client.delete(LOG_EVENTS_STREAM)
+
+    # Undelivered events are not trimmed, new ones are saved to the db directly
+    create_log_event(test_computer, LogType.HEARTBEAT)
+    create_log_event(test_computer, LogType.CLIENT_UPGRADE)
+    [(_, entry)] = redis_client.xrange(LOG_EVENTS_STREAM)
+    assert entry["log_type"] == LogType.HEARTBEAT.value
+    assert [log_event.log_type for log_event in test_computer.log_events] == [
+        LogType.CLIENT_UPGRADE
+    ]
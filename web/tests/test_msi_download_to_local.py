@@ -1,3 +1,11 @@
+import os
+import hashlib
+
+import sqlalchemy as sa
+
+from app.models import DesktopClient
+
+
 def test_download_msi(client):
     response = client.get("/download/1")
 
@@ -53,3 +61,46 @@ def test_lid_msi(client):
     assert response.status_code == 200
     # ensure that the filename is correct
     assert "_lid_1.msi" in response.headers["Content-Disposition"]
+
+
+def test_msi_blob_store(client):
+    msi: DesktopClient = DesktopClient.query.filter_by(version="1.0.1.1").first()
+
+    # Content is kept in the blob store, not in the table
+    assert msi.blob_sha256 == hashlib.sha256(b"test_bytes").hexdigest()
+    assert os.path.exists(msi.blob_path)
+    assert "blob_data" in sa.inspect(msi).unloaded
+    assert msi.blob == b"test_bytes"
+
+
+def test_msi_download_conditional_and_range(client):
+    query = dict(
+        name="test_version",
+        version="1.0.1.1",
+        flag="stable",
+        identifier_key="comp3_identifier_key",
+    )
+    response = client.get("/msi_download_to_local", query_string=query)
+
+    assert response.status_code == 200
+    assert response.data == b"test_bytes"
+    assert response.headers["Content-disposition"] == (
+        "attachment; filename=test_version.msi"
+    )
+    etag = response.headers["ETag"]
+    assert etag == '"{}"'.format(hashlib.sha256(b"test_bytes").hexdigest())
+
+    # Resume download
+    response = client.get(
+        "/msi_download_to_local",
+        query_string=query,
+        headers={"Range": "bytes=5-", "If-Range": etag},
+    )
+    assert response.status_code == 206
+    assert response.data == b"bytes"
+
+    # Not modified
+    response = client.get(
+        "/msi_download_to_local", query_string=query, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
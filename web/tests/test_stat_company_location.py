@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from app import models as m
+from app.controllers import update_companies_locations_statistic
+from config import BaseConfig as CFG
+
+
+def test_update_companies_locations_statistic(test_db):
+    current_east_time = CFG.offset_to_est(datetime.utcnow(), True)
+    computers = m.Computer.query.order_by(m.Computer.id).all()
+    for i, computer in enumerate(computers):
+        computer.activated = i != 1
+        computer.device_role = m.DeviceRole.PRIMARY if i % 2 else m.DeviceRole.ALTERNATE
+        computer.last_download_time = current_east_time - timedelta(hours=i)
+    test_db.session.commit()
+
+    assert update_companies_locations_statistic()
+    # Nothing changed since the last update
+    assert update_companies_locations_statistic() == 0
+
+    # Same counters as the companies and locations properties
+    for company in m.Company.query.all():
+        assert company.locations_per_company == len(company.locations)
+        assert company.total_computers == company.total_computers_counter
+        assert company.computers_offline == company.total_offline_computers
+        assert company.computers_online == (
+            company.total_computers - company.total_offline_computers
+        )
+
+    for location in m.Location.query.all():
+        assert location.computers_per_location == location.total_computers
+        assert location.computers_offline == location.total_computers_offline
+        computers_online = [
+            computer
+            for computer in location.computers
+            if computer.activated
+            and computer.status == m.ComputerStatus.ONLINE
+            and not computer.is_deleted
+        ]
+        assert location.computers_online == len(computers_online)
+        if any(c.device_role == m.DeviceRole.PRIMARY for c in computers_online):
+            assert location.status == m.LocationStatus.ONLINE
+        elif computers_online:
+            assert location.status == m.LocationStatus.ONLINE_PRIMARY_OFFLINE
+        else:
+            assert location.status == m.LocationStatus.OFFLINE
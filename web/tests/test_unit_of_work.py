@@ -0,0 +1,56 @@
+import datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.models import Computer
+
+
+def test_download_status_commits_once(client):
+    commits = []
+
+    def on_commit(session):
+        commits.append(session)
+
+    event.listen(db.session, "after_commit", on_commit)
+    try:
+        response = client.post(
+            "/download_status",
+            json=dict(
+                company_name="Atlas",
+                location_name="Maywood",
+                download_status="download_status_test",
+                last_time_online=str(datetime.datetime.now()),
+                identifier_key="comp3_identifier_key",
+                last_downloaded=str(datetime.datetime.now()),
+            ),
+        )
+    finally:
+        event.remove(db.session, "after_commit", on_commit)
+
+    assert response.status_code == 200
+    # Computer update, log event and backup log are committed together
+    assert len(commits) == 1
+
+    db.session.expire_all()
+    computer: Computer = Computer.query.filter_by(
+        identifier_key="comp3_identifier_key"
+    ).first()
+    assert computer.download_status == "download_status_test"
+
+
+def test_failed_request_is_rolled_back(client):
+    response = client.post(
+        "/download_status",
+        json=dict(
+            company_name="Atlas",
+            location_name="Maywood",
+            download_status="download_status_test",
+            last_time_online=str(datetime.datetime.now()),
+            identifier_key="WRONGgg_identifier_key",
+            last_downloaded=str(datetime.datetime.now()),
+        ),
+    )
+    assert response.status_code == 400
+    assert not db.session.dirty
+    assert not db.session.new
@@ -67,6 +67,37 @@ def setup_periodic_tasks(sender, **kwargs):
     )
     entry.save()
 
+    # Extend offline backup periods of all computers - run every 5 minutes
+    interval = crontab(minute="*/5")
+    entry = RedBeatSchedulerEntry(
+        "sweep_backup_logs", "worker.sweep_backup_logs", interval, app=app
+    )
+    entry.save()
+
+    # Write buffered computers heartbeats to db - run every minute
+    interval = crontab(minute="*")
+    entry = RedBeatSchedulerEntry(
+        "flush_heartbeats", "worker.flush_heartbeats", interval, app=app
+    )
+    entry.save()
+
+    # Update computers statuses and log their changes - run every minute
+    interval = crontab(minute="*")
+    entry = RedBeatSchedulerEntry(
+        "detect_status_transitions",
+        "worker.detect_status_transitions",
+        interval,
+        app=app,
+    )
+    entry.save()
+
+    # Insert agent log events from the stream to db - run every minute
+    interval = crontab(minute="*")
+    entry = RedBeatSchedulerEntry(
+        "drain_log_events", "worker.drain_log_events", interval, app=app
+    )
+    entry.save()
+
     # Clean old logs every midnight
     interval = crontab(hour=0, minute=0)
     entry = RedBeatSchedulerEntry(
@@ -107,6 +138,30 @@ def update_cl_stat():
     flask_proc.communicate()
 
 
+@app.task
+def sweep_backup_logs():
+    flask_proc = subprocess.Popen(["flask", "sweep-backup-logs"])
+    flask_proc.communicate()
+
+
+@app.task
+def flush_heartbeats():
+    flask_proc = subprocess.Popen(["flask", "flush-heartbeats"])
+    flask_proc.communicate()
+
+
+@app.task
+def detect_status_transitions():
+    flask_proc = subprocess.Popen(["flask", "detect-status-transitions"])
+    flask_proc.communicate()
+
+
+@app.task
+def drain_log_events():
+    flask_proc = subprocess.Popen(["flask", "drain-log-events"])
+    flask_proc.communicate()
+
+
 @app.task
 def clean_old_logs():
     flask_proc = subprocess.Popen(["flask", "clean-old-logs"])
@@ -37,6 +37,70 @@ def update_cl_stat():
     update_companies_locations_statistic()
 
 
+@app.cli.command()
+@click.option(
+    "--refresh", is_flag=True, help="Update statistics and snapshots before the check"
+)
+def check_dashboard_snapshots(refresh: bool = False):
+    """Compare dashboard snapshots with the live counters"""
+    from app.controllers import (
+        check_dashboard_snapshots,
+        update_companies_locations_statistic,
+    )
+
+    if refresh:
+        update_companies_locations_statistic()
+
+    mismatches = check_dashboard_snapshots()
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} snapshots do not match")
+
+
+@app.cli.command()
+def flush_heartbeats():
+    from app.controllers import flush_heartbeats
+
+    flush_heartbeats()
+
+
+@app.cli.command()
+@click.option("--max-seconds", type=int, default=50)
+def drain_log_events(max_seconds: int):
+    from app.controllers import drain_log_events_stream
+
+    drain_log_events_stream(max_seconds)
+
+
+@app.cli.command()
+def log_events_metrics():
+    from app.controllers import get_log_events_stream_metrics
+
+    for key, value in get_log_events_stream_metrics().items():
+        print(f"{key}: {value}")
+
+
+@app.cli.command()
+def computer_lock_metrics():
+    """Wait metrics of the per computer locks (backup logs updates)"""
+    from app.controllers import get_computer_lock_metrics
+
+    for key, value in get_computer_lock_metrics().items():
+        print(f"{key}: {value}")
+
+
+@app.cli.command()
+@click.option("--hours", type=int, default=24)
+def agent_arrivals(hours: int):
+    """Agent requests arrivals per minute of the hour (shows top of the hour spikes)"""
+    from app.controllers import get_agent_arrivals
+
+    for kind, minutes in get_agent_arrivals(hours).items():
+        print(f"{kind} (last {hours} hours):")
+        max_count = max(minutes) or 1
+        for minute, count in enumerate(minutes):
+            print(f"  :{minute:02} {count:8} {'#' * round(count / max_count * 50)}")
+
+
 @app.cli.command()
 def get_pcc_access_key():
     from app.controllers import get_pcc_2_legged_token
@@ -90,6 +154,83 @@ def gen_backup_periods_logs(computer_name: str | None = None, days: int | None =
             gen_fake_backup_periods_logs(computer, time_period)
 
 
+@app.cli.command()
+@click.option("--computer-name", type=str)
+@click.option("--days", type=int, help="Rebuild the last N days only")
+def rebuild_availability(computer_name: str | None = None, days: int | None = None):
+    """Rebuild computers availability days from their backup logs"""
+    from app.controllers import rebuild_availability
+
+    query = models.Computer.query.filter(models.Computer.is_deleted.is_(False))
+    if computer_name:
+        query = query.filter(models.Computer.computer_name == computer_name)
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+
+    computer_ids = [computer.id for computer in query.with_entities(models.Computer.id)]
+    for computer_id in computer_ids:
+        rebuild_availability(computer_id, since)
+        db.session.commit()
+
+    logger.info("Availability of {} computers rebuilt", len(computer_ids))
+
+
+@app.cli.command()
+@click.option("--computer-name", type=str)
+@click.option("--days", type=int, help="Backfill the last N days only")
+def backfill_daily_uptime(computer_name: str | None = None, days: int | None = None):
+    """Fill computers daily uptime from their backup logs and log events"""
+    from app.controllers import rebuild_availability, recount_download_errors
+
+    query = models.Computer.query.filter(models.Computer.is_deleted.is_(False))
+    if computer_name:
+        query = query.filter(models.Computer.computer_name == computer_name)
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+
+    computer_ids = [computer.id for computer in query.with_entities(models.Computer.id)]
+    for computer_id in computer_ids:
+        rebuild_availability(computer_id, since)
+        recount_download_errors(computer_id, since)
+        db.session.commit()
+
+    logger.info("Daily uptime of {} computers backfilled", len(computer_ids))
+
+
+@app.cli.command()
+def detect_status_transitions():
+    """Update computers statuses which reached their deadlines and log the changes"""
+    from app.controllers import detect_status_transitions
+
+    detect_status_transitions()
+
+
+@app.cli.command()
+def sweep_backup_logs():
+    """Extend offline backup periods of all computers up to now"""
+    from app.controllers import sweep_backup_logs
+
+    sweep_backup_logs()
+
+
+@app.cli.command()
+@click.option("--computer-name", type=str)
+@click.option("--days", type=int, help="Replay log events of the last N days only")
+def replay_backup_logs(computer_name: str | None = None, days: int | None = None):
+    """Rebuild computers backup logs from their log events"""
+    from app.controllers import replay_backup_logs
+
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+
+    query = models.Computer.query.filter_by(logs_enabled=True)
+    if computer_name:
+        query = query.filter_by(computer_name=computer_name)
+
+    total = 0
+    for computer in query.all():
+        total += replay_backup_logs(computer, since)
+
+    print(f"Backup logs written: {total}")
+
+
 @app.cli.command()
 @click.argument("scan_record_id", type=int)
 def scan_pcc_activations(scan_record_id: int):